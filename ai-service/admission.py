@@ -0,0 +1,215 @@
+"""Client-side admission control for provider calls.
+
+Each provider gets a RateLimiter holding two token buckets, one for requests
+per minute and one for tokens per minute (prompt estimate plus the caller's
+``max_tokens``, which is what providers count against their limits). A call
+that cannot be admitted right away waits in a bounded queue ordered by
+priority, so interactive /chat calls go ahead of bulk /quiz generation, then
+by arrival. Only the head of the queue is admitted; it sleeps until the
+buckets have refilled enough for it.
+
+A call is shed with Overloaded, carrying a Retry-After estimate, when the
+queue is full or when it has waited ``max_wait`` seconds (or less, when the
+request's deadline is nearer). Callers turn that into a 503 instead of
+hitting upstream 429s.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+
+# Lower runs first; endpoints not listed get DEFAULT_PRIORITY
+ENDPOINT_PRIORITIES = {"chat": 0, "study-plan": 1, "analyze": 1, "quiz": 2}
+DEFAULT_PRIORITY = 1
+
+
+class Overloaded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_tokens(prompt, max_tokens):
+    """Tokens a call counts against a tokens-per-minute limit (about 4 characters per prompt token)"""
+    return len(prompt) // 4 + max_tokens
+
+
+class TokenBucket:
+    """``per_minute`` units per minute, with up to one minute's worth available at once"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """Seconds until ``amount`` units are available (0 if they are now)"""
+        self._refill(now)
+        # A call larger than the whole bucket waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "cost", "wake")
+
+    def __init__(self, priority, seq, cost, wake):
+        self.priority = priority
+        self.seq = seq
+        self.cost = cost
+        self.wake = wake
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RateLimiter:
+    def __init__(self, name, requests_per_minute=0, tokens_per_minute=0, max_queue=64, max_wait=5.0):
+        self.name = name
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.buckets = []
+        if requests_per_minute > 0:
+            self.buckets.append((TokenBucket(requests_per_minute), lambda cost: 1))
+        if tokens_per_minute > 0:
+            self.buckets.append((TokenBucket(tokens_per_minute), lambda cost: cost))
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.timeouts = 0
+        self._queue = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.buckets)
+
+    def _delay(self, cost, now):
+        return max((bucket.delay(units(cost), now) for bucket, units in self.buckets), default=0.0)
+
+    def _take(self, cost):
+        for bucket, units in self.buckets:
+            bucket.take(units(cost))
+        self.admitted += 1
+
+    def _retry_after(self, cost, now):
+        # Rough time for the queue ahead to drain plus this call
+        return self._delay(cost, now) + len(self._queue) * max(self._delay(1, now), 0.1)
+
+    def _enter(self, priority, cost, wake):
+        """Admit immediately (None) or queue a waiter; raises Overloaded if the queue is full"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._queue and self._delay(cost, now) == 0:
+                self._take(cost)
+                return None
+            if len(self._queue) >= self.max_queue:
+                self.shed += 1
+                raise Overloaded(f"{self.name} queue is full", self._retry_after(cost, now))
+            waiter = _Waiter(priority, next(self._seq), cost, wake)
+            heapq.heappush(self._queue, waiter)
+            self.queued += 1
+            return waiter
+
+    def _remove(self, waiter):
+        # Callers hold the lock
+        was_head = self._queue[0] is waiter
+        self._queue.remove(waiter)
+        heapq.heapify(self._queue)
+        if was_head and self._queue:
+            self._queue[0].wake()
+
+    def _poll(self, waiter, deadline):
+        """``(admitted, seconds to wait)``; raises Overloaded once the deadline has passed"""
+        now = time.monotonic()
+        with self._lock:
+            delay = None
+            if self._queue[0] is waiter:
+                delay = self._delay(waiter.cost, now)
+                if delay == 0:
+                    heapq.heappop(self._queue)
+                    self._take(waiter.cost)
+                    if self._queue:
+                        self._queue[0].wake()
+                    return True, 0
+            remaining = deadline - now
+            if remaining <= 0:
+                self._remove(waiter)
+                self.timeouts += 1
+                raise Overloaded(f"{self.name} rate limit: wait timed out",
+                                 self._retry_after(waiter.cost, now))
+            return False, remaining if delay is None else min(delay, remaining)
+
+    def acquire(self, priority, cost, max_wait=None):
+        """Block until the call may go ahead; returns the seconds spent waiting.
+
+        ``max_wait`` shortens the limiter's own wait, e.g. to a request's remaining deadline.
+        """
+        if not self.buckets:
+            return 0.0
+        started = time.monotonic()
+        event = threading.Event()
+        waiter = self._enter(priority, cost, event.set)
+        if waiter is None:
+            return 0.0
+        deadline = started + (self.max_wait if max_wait is None else min(self.max_wait, max_wait))
+        while True:
+            admitted, wait = self._poll(waiter, deadline)
+            if admitted:
+                return time.monotonic() - started
+            event.wait(wait)
+            event.clear()
+
+    async def acquire_async(self, priority, cost, max_wait=None):
+        """Async variant of acquire"""
+        if not self.buckets:
+            return 0.0
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self._enter(priority, cost, lambda: loop.call_soon_threadsafe(event.set))
+        if waiter is None:
+            return 0.0
+        deadline = started + (self.max_wait if max_wait is None else min(self.max_wait, max_wait))
+        try:
+            while True:
+                admitted, wait = self._poll(waiter, deadline)
+                if admitted:
+                    return time.monotonic() - started
+                try:
+                    await asyncio.wait_for(event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except asyncio.CancelledError:
+            # e.g. the losing call of a hedged race
+            with self._lock:
+                if waiter in self._queue:
+                    self._remove(waiter)
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                "waiting": len(self._queue),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "shed": self.shed,
+                "timeouts": self.timeouts,
+            }
+
+
+def retry_after_seconds(seconds):
+    """Whole seconds for a Retry-After header, at least 1"""
+    return max(1, math.ceil(seconds))
@@ -0,0 +1,319 @@
+"""Vectorized study-history analytics for /analyze.
+
+Raw sessions (subject, startTime, endTime, completed) are turned into column
+arrays and reduced with NumPy into a ``SessionAggregates`` of counts, integer
+millisecond sums and fixed-bin histograms. ``build_report`` derives the
+analysis from those aggregates only, so any other way of producing them (for
+example folding a stream of records) yields exactly the same report.
+SessionStream does that for NDJSON uploads. It reduces records in batches
+and merges each batch into running aggregates, so memory depends on the
+number of distinct study days and subjects, not the number of sessions.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+MS_PER_MINUTE = 60_000
+MS_PER_HOUR = 3_600_000
+MS_PER_DAY = 86_400_000
+
+# Session-length histogram edges in minutes; the last bin is open-ended
+LENGTH_BINS_MINUTES = (0, 15, 30, 45, 60, 90, 120, 180)
+LENGTH_BIN_EDGES_MS = np.array(LENGTH_BINS_MINUTES[1:], dtype=np.int64) * MS_PER_MINUTE
+LENGTH_BIN_LABELS = [f"{lo}-{hi}" for lo, hi in zip(LENGTH_BINS_MINUTES, LENGTH_BINS_MINUTES[1:])] + \
+    [f"{LENGTH_BINS_MINUTES[-1]}+"]
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# 1970-01-01 (day 0) was a Thursday
+EPOCH_WEEKDAY = 3
+
+
+def parse_timestamp(value):
+    """Epoch milliseconds from an ISO-8601 string or an epoch-ms number"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+# Byte layout of JavaScript's Date.toISOString(): "YYYY-MM-DDTHH:MM:SS.sssZ"
+_ISO_LENGTH = 24
+_ISO_SEPARATORS = {4: b'-', 7: b'-', 10: b'T', 13: b':', 16: b':', 19: b'.', 23: b'Z'}
+
+
+def _digits(digits, start, stop):
+    value = digits[:, start].astype(np.int64)
+    for column in range(start + 1, stop):
+        value = value * 10 + digits[:, column]
+    return value
+
+
+def _parse_js_iso(values):
+    """Vectorized parse of Date.toISOString() strings, or None if any differ"""
+    try:
+        # Shorter strings are NUL-padded and longer ones truncated; either way
+        # the separator check below rejects them
+        raw = np.array(values, dtype=f'S{_ISO_LENGTH}')
+    except (UnicodeEncodeError, TypeError, ValueError):
+        return None
+    chars = raw.view(np.uint8).reshape(len(raw), _ISO_LENGTH)
+    for column, separator in _ISO_SEPARATORS.items():
+        if (chars[:, column] != ord(separator)).any():
+            return None
+    digits = chars - np.uint8(48)
+    digits[:, list(_ISO_SEPARATORS)] = 0
+    if (digits > 9).any():
+        return None
+
+    year, month, day = _digits(digits, 0, 4), _digits(digits, 5, 7), _digits(digits, 8, 10)
+    # Days since the epoch from a civil date (H. Hinnant's days_from_civil)
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * np.where(month > 2, month - 3, month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+
+    return (days * MS_PER_DAY + _digits(digits, 11, 13) * MS_PER_HOUR + _digits(digits, 14, 16) * MS_PER_MINUTE
+            + _digits(digits, 17, 19) * 1000 + _digits(digits, 20, 23))
+
+
+def to_epoch_ms(values):
+    """Epoch-millisecond int64 array from ISO-8601 strings or epoch-ms numbers"""
+    if values and isinstance(values[0], (int, float)):
+        return np.asarray(values, dtype=np.int64)
+    parsed = _parse_js_iso(values)
+    if parsed is not None:
+        return parsed
+    try:
+        # NumPy parses naive ISO strings; drop the UTC "Z" it warns about
+        cleaned = [v[:-1] if v.endswith('Z') else v for v in values]
+        return np.array(cleaned, dtype='datetime64[ms]').astype(np.int64)
+    except (ValueError, TypeError, AttributeError):
+        return np.fromiter((parse_timestamp(v) for v in values), dtype=np.int64, count=len(values))
+
+
+class SessionAggregates:
+    """Running totals that fully determine the analysis report"""
+
+    def __init__(self):
+        self.count = 0
+        self.completed = 0
+        self.duration_ms = 0
+        self.min_duration_ms = None
+        self.max_duration_ms = None
+        # subject -> [sessions, completed, duration_ms]
+        self.subjects = {}
+        self.hour_sessions = [0] * 24
+        self.hour_completed = [0] * 24
+        self.hour_duration_ms = [0] * 24
+        self.weekday_sessions = [0] * 7
+        self.weekday_completed = [0] * 7
+        self.weekday_duration_ms = [0] * 7
+        self.length_counts = [0] * len(LENGTH_BIN_LABELS)
+        # local day number -> duration_ms studied that day
+        self.day_duration_ms = {}
+
+    def merge(self, other):
+        """Add the totals of another set of sessions to these"""
+        if not other.count:
+            return self
+        self.count += other.count
+        self.completed += other.completed
+        self.duration_ms += other.duration_ms
+        self.min_duration_ms = other.min_duration_ms if self.min_duration_ms is None else \
+            min(self.min_duration_ms, other.min_duration_ms)
+        self.max_duration_ms = other.max_duration_ms if self.max_duration_ms is None else \
+            max(self.max_duration_ms, other.max_duration_ms)
+        for name, (sessions, completed, duration) in other.subjects.items():
+            totals = self.subjects.setdefault(name, [0, 0, 0])
+            totals[0] += sessions
+            totals[1] += completed
+            totals[2] += duration
+        for field in ("hour_sessions", "hour_completed", "hour_duration_ms", "weekday_sessions",
+                      "weekday_completed", "weekday_duration_ms", "length_counts"):
+            setattr(self, field, [a + b for a, b in zip(getattr(self, field), getattr(other, field))])
+        for day, duration in other.day_duration_ms.items():
+            self.day_duration_ms[day] = self.day_duration_ms.get(day, 0) + duration
+        return self
+
+
+def session_columns(sessions):
+    """Column arrays ``(subjects, starts, ends, completed)`` from session dicts"""
+    subjects = [s.get('subject') or 'Unknown' for s in sessions]
+    starts = to_epoch_ms([s.get('startTime') for s in sessions])
+    ends = to_epoch_ms([s.get('endTime') for s in sessions])
+    completed = np.fromiter((bool(s.get('completed')) for s in sessions), dtype=bool, count=len(sessions))
+    return subjects, starts, ends, completed
+
+
+def _bincount(codes, weights, size):
+    return np.bincount(codes, weights=weights, minlength=size)
+
+
+def aggregate(subjects, starts, ends, completed, utc_offset_minutes=0):
+    """Reduce session columns to SessionAggregates with vectorized NumPy ops"""
+    agg = SessionAggregates()
+    n = len(starts)
+    if n == 0:
+        return agg
+
+    durations = np.clip(ends - starts, 0, None)
+    local = starts + int(utc_offset_minutes) * MS_PER_MINUTE
+    days = local // MS_PER_DAY
+    hours = (local // MS_PER_HOUR) % 24
+    weekdays = (days + EPOCH_WEEKDAY) % 7
+    done = completed.astype(np.int64)
+
+    agg.count = n
+    agg.completed = int(done.sum())
+    agg.duration_ms = int(durations.sum())
+    agg.min_duration_ms = int(durations.min())
+    agg.max_duration_ms = int(durations.max())
+
+    def grouped_sum(codes, values, size):
+        # float64 sums of integer milliseconds stay exact below 2**53 ms
+        return _bincount(codes, values, size).astype(np.int64)
+
+    agg.hour_sessions = _bincount(hours, None, 24).tolist()
+    agg.hour_completed = grouped_sum(hours, done, 24).tolist()
+    agg.hour_duration_ms = grouped_sum(hours, durations, 24).tolist()
+    agg.weekday_sessions = _bincount(weekdays, None, 7).tolist()
+    agg.weekday_completed = grouped_sum(weekdays, done, 7).tolist()
+    agg.weekday_duration_ms = grouped_sum(weekdays, durations, 7).tolist()
+    agg.length_counts = _bincount(np.searchsorted(LENGTH_BIN_EDGES_MS, durations, side='right'),
+                                  None, len(LENGTH_BIN_LABELS)).tolist()
+
+    names = {}
+    codes = np.fromiter((names.setdefault(s, len(names)) for s in subjects), dtype=np.int64, count=n)
+    subject_sessions = _bincount(codes, None, len(names))
+    subject_completed = grouped_sum(codes, done, len(names))
+    subject_duration = grouped_sum(codes, durations, len(names))
+    for name, code in names.items():
+        agg.subjects[name] = [int(subject_sessions[code]), int(subject_completed[code]), int(subject_duration[code])]
+
+    unique_days, day_codes = np.unique(days, return_inverse=True)
+    day_duration = grouped_sum(day_codes, durations, len(unique_days))
+    agg.day_duration_ms = dict(zip(unique_days.tolist(), day_duration.tolist()))
+    return agg
+
+
+def _rate(completed, sessions):
+    return round(100 * completed / sessions, 1) if sessions else 0.0
+
+
+def _streaks(days, today):
+    """(current, longest) runs of consecutive study days"""
+    if not days:
+        return 0, 0
+    longest = run = 1
+    for previous, day in zip(days, days[1:]):
+        run = run + 1 if day == previous + 1 else 1
+        longest = max(longest, run)
+    # The current streak survives until a full day has been missed
+    current = run if days[-1] >= today - 1 else 0
+    return current, longest
+
+
+def _weekly_trend(day_duration_ms):
+    """Minutes studied per 7-day week since the first study day, plus the LSQ slope"""
+    if not day_duration_ms:
+        return {"weeklyMinutes": [], "slope": 0.0, "direction": "flat"}
+    first = min(day_duration_ms)
+    weeks = [0] * ((max(day_duration_ms) - first) // 7 + 1)
+    for day, duration in day_duration_ms.items():
+        weeks[(day - first) // 7] += duration
+    minutes = [round(w / MS_PER_MINUTE, 1) for w in weeks]
+
+    slope = 0.0
+    if len(weeks) > 1:
+        x = np.arange(len(weeks), dtype=np.float64)
+        y = np.array(weeks, dtype=np.float64) / MS_PER_MINUTE
+        slope = float(((x - x.mean()) * (y - y.mean())).sum() / ((x - x.mean()) ** 2).sum())
+    slope = round(slope, 2)
+    direction = "up" if slope > 1 else "down" if slope < -1 else "flat"
+    return {"weeklyMinutes": minutes[-12:], "slope": slope, "direction": direction}
+
+
+def build_report(agg, now_ms=None, utc_offset_minutes=0):
+    """Analysis report derived purely from SessionAggregates"""
+    if now_ms is None:
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+    today = (now_ms + int(utc_offset_minutes) * MS_PER_MINUTE) // MS_PER_DAY
+    days = sorted(agg.day_duration_ms)
+    current_streak, longest_streak = _streaks(days, today)
+
+    def minutes(ms):
+        return round(ms / MS_PER_MINUTE, 1)
+
+    return {
+        "totalSessions": agg.count,
+        "completedSessions": agg.completed,
+        "completionRate": _rate(agg.completed, agg.count),
+        "totalStudyTime": round(agg.duration_ms / MS_PER_HOUR, 2),
+        "avgSessionLength": minutes(agg.duration_ms / agg.count) if agg.count else 0.0,
+        "streak": current_streak,
+        "longestStreak": longest_streak,
+        "studyDays": len(days),
+        "subjectStats": {
+            name: {"sessions": sessions, "completed": completed,
+                   "minutes": minutes(duration), "completionRate": _rate(completed, sessions)}
+            for name, (sessions, completed, duration) in sorted(agg.subjects.items(), key=lambda item: (-item[1][2], item[0]))
+        },
+        "hourOfDay": {
+            "sessions": list(agg.hour_sessions),
+            "minutes": [minutes(ms) for ms in agg.hour_duration_ms],
+            "completionRate": [_rate(c, s) for c, s in zip(agg.hour_completed, agg.hour_sessions)],
+        },
+        "weekday": {
+            "labels": WEEKDAYS,
+            "sessions": list(agg.weekday_sessions),
+            "minutes": [minutes(ms) for ms in agg.weekday_duration_ms],
+            "completionRate": [_rate(c, s) for c, s in zip(agg.weekday_completed, agg.weekday_sessions)],
+        },
+        "sessionLengths": {
+            "bins": LENGTH_BIN_LABELS,
+            "counts": list(agg.length_counts),
+            "minMinutes": minutes(agg.min_duration_ms) if agg.count else 0.0,
+            "maxMinutes": minutes(agg.max_duration_ms) if agg.count else 0.0,
+        },
+        "trend": _weekly_trend(agg.day_duration_ms),
+    }
+
+
+class SessionStream:
+    """Single-pass fold of session records arriving in pieces into SessionAggregates.
+
+    Records are held until ``batch_size`` have arrived, then reduced with the
+    vectorized ``aggregate`` and merged into the running totals.
+    """
+
+    def __init__(self, utc_offset_minutes=0, batch_size=10000):
+        self.utc_offset_minutes = utc_offset_minutes
+        self.batch_size = batch_size
+        self.aggregates = SessionAggregates()
+        self._pending = []
+
+    def add(self, sessions):
+        self._pending.extend(sessions)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            batch = aggregate(*session_columns(self._pending), self.utc_offset_minutes)
+            self.aggregates.merge(batch)
+            self._pending = []
+
+    def report(self, now_ms=None):
+        self.flush()
+        return build_report(self.aggregates, now_ms, self.utc_offset_minutes)
+
+
+def analyze_sessions(sessions, utc_offset_minutes=0, now_ms=None):
+    """Full analysis report for a list of raw session dicts"""
+    subjects, starts, ends, completed = session_columns(sessions)
+    agg = aggregate(subjects, starts, ends, completed, utc_offset_minutes)
+    return build_report(agg, now_ms, utc_offset_minutes)
@@ -1,36 +1,207 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import json
+from startup import startup_timer
+
+with startup_timer.phase("flask"):
+    from flask import Flask, Response, g, request, stream_with_context
+    from flask_cors import CORS
+    from werkzeug.exceptions import BadRequest
+import asyncio
 import random
 from datetime import datetime, timedelta
 import os
+import time
+from importlib.util import find_spec
+import atexit
 from dotenv import load_dotenv
 
+from admission import (DEFAULT_PRIORITY, ENDPOINT_PRIORITIES, Overloaded, RateLimiter, estimate_tokens,
+                       retry_after_seconds)
+from batch import BatchError, parse_batch, run_batch
+from cache import ResponseCache, make_key
+from clients import ProviderClients
+from coalesce import CoalesceTimeout, SingleFlight
+from conversations import PROFILE_KEYS, ConversationStore
+import deadlines
+from deadlines import DeadlinePolicy, parse_budgets
+from intents import IntentMatcher
+from metrics import (ADMISSION_WAIT, AI_RESPONSES_TOTAL, CONTENT_TYPE, CONVERSATION_SIZE, DEADLINE_EXCEEDED,
+                     DEADLINE_REMAINING, PROMPT_SIZE, PROVIDER_CALLS_TOTAL, PROVIDER_DURATION, QUIZ_QUESTIONS_TOTAL,
+                     REQUEST_DURATION, REQUESTS_IN_FLIGHT, REQUESTS_TOTAL, RESPONSE_SIZE, metrics)
+from planner import PlanError, allocate
+from question_bank import load_question_bank
+from quiz_parser import QuizParser, parse_quiz
+from quiz_pool import QuizPool
+from resilience import CircuitBreaker, call_with_timeout, hedged_race, hedged_race_async
+from serialization import NdjsonReader, Serializer, is_ndjson
+from streaming import chunk_text, sse_events, sse_events_async, sse_items, sse_items_async, stream_stats
+
 # Load environment variables
-load_dotenv()
+with startup_timer.phase("dotenv"):
+    load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
-# Real AI Integration
+# Real AI Integration. Provider SDKs are only located here; they are imported
+# on first use (or by warmup()) so cold start does not pay for them.
+OPENAI_AVAILABLE = find_spec('openai') is not None
 try:
-    import openai
-    OPENAI_AVAILABLE = True
-    openai.api_key = os.getenv('OPENAI_API_KEY')
-except ImportError:
-    OPENAI_AVAILABLE = False
-
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-except ImportError:
+    GEMINI_AVAILABLE = find_spec('google.generativeai') is not None
+except ModuleNotFoundError:
     GEMINI_AVAILABLE = False
 
+# External providers stay off unless explicitly enabled (see get_ai_response)
+AI_PROVIDERS_ENABLED = os.getenv('AI_PROVIDERS_ENABLED', 'false').lower() == 'true'
+
+# "sequential" tries providers one after another; "hedged" races them
+AI_PROVIDER_MODE = os.getenv('AI_PROVIDER_MODE', 'sequential').lower()
+AI_HEDGE_DELAY = float(os.getenv('AI_HEDGE_DELAY_MS', '300')) / 1000
+AI_BREAKER_FAILURES = int(os.getenv('AI_BREAKER_FAILURES', '5'))
+AI_BREAKER_COOLDOWN = float(os.getenv('AI_BREAKER_COOLDOWN', '30'))
+
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-pro')
+
+# Offline provider: a local transformers model (requirements-ml.txt) run on
+# CPU, tried after the external providers. Concurrent prompts are batched
+# into one generate call, up to AI_LOCAL_BATCH_SIZE prompts or
+# AI_LOCAL_BATCH_WAIT_MS after the first. Set AI_LOCAL_MODEL to a Hugging Face
+# model name or path to enable it; it works without AI_PROVIDERS_ENABLED
+LOCAL_MODEL = os.getenv('AI_LOCAL_MODEL', '')
+local_model = None
+if LOCAL_MODEL:
+    local = startup_timer.timed_import("local_model")
+    local_model = local.LocalModel(
+        lambda: local.transformers_generator(
+            LOCAL_MODEL,
+            threads=int(os.getenv('AI_LOCAL_THREADS', '0')),
+            quantize=os.getenv('AI_LOCAL_QUANTIZE', 'false').lower() == 'true',
+            temperature=float(os.getenv('AI_LOCAL_TEMPERATURE', '0.7')),
+        ),
+        max_batch_size=int(os.getenv('AI_LOCAL_BATCH_SIZE', '8')),
+        max_wait=float(os.getenv('AI_LOCAL_BATCH_WAIT_MS', '20')) / 1000,
+        max_queue=int(os.getenv('AI_LOCAL_QUEUE_SIZE', '256')),
+        max_new_tokens=int(os.getenv('AI_LOCAL_MAX_NEW_TOKENS', '256')),
+        timeout=float(os.getenv('AI_LOCAL_TIMEOUT', '60')),
+    )
+
+# Client-side rate limits per provider (<NAME>_RPM requests and <NAME>_TPM
+# tokens per minute, 0 = unlimited). Calls over the limit queue by endpoint
+# priority, at most AI_ADMISSION_QUEUE_SIZE deep and AI_ADMISSION_MAX_WAIT
+# seconds long; beyond that the request gets a 503 with Retry-After. The
+# limits are for the whole deployment: each of the WEB_CONCURRENCY worker
+# processes (set by gunicorn.conf.py) enforces its share
+OVERLOADED_MESSAGE = "The AI service is busy, please try again shortly."
+WORKER_COUNT = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+rate_limiters = {
+    name: RateLimiter(
+        name,
+        requests_per_minute=int(os.getenv(f'{name.upper()}_RPM', rpm)) / WORKER_COUNT,
+        tokens_per_minute=int(os.getenv(f'{name.upper()}_TPM', tpm)) / WORKER_COUNT,
+        max_queue=int(os.getenv('AI_ADMISSION_QUEUE_SIZE', '64')),
+        max_wait=float(os.getenv('AI_ADMISSION_MAX_WAIT', '5')),
+    )
+    for name, rpm, tpm in (("openai", '3500', '90000'), ("gemini", '60', '32000'))
+}
+
+# Every AI request has a deadline: the caller's X-Request-Timeout-Ms header
+# or the endpoint's default in seconds (AI_DEADLINES, e.g. "chat=8,quiz=20"
+# on top of chat=10, study-plan=20, quiz=25, analyze=10), capped at
+# AI_DEADLINE_MAX. Provider calls, retries and hedges only get what is left,
+# less AI_DEADLINE_RESERVE_MS kept back for the fallback answer
+deadline_policy = DeadlinePolicy(
+    budgets=parse_budgets(os.getenv('AI_DEADLINES', '')),
+    maximum=float(os.getenv('AI_DEADLINE_MAX', '120')),
+    reserve=float(os.getenv('AI_DEADLINE_RESERVE_MS', '250')) / 1000,
+)
+
+# One pooled, keep-alive client per provider for the whole process
+provider_clients = ProviderClients(
+    pool_size=int(os.getenv('AI_HTTP_POOL_SIZE', '100')),
+    keepalive=int(os.getenv('AI_HTTP_KEEPALIVE', '20')),
+    keepalive_expiry=float(os.getenv('AI_HTTP_KEEPALIVE_EXPIRY', '30')),
+)
+
+# Provider answers are cached; AI_CACHE_SIZE=0 disables the cache and
+# AI_CACHE_DISABLED_ENDPOINTS (e.g. "chat,analyze") opts endpoints out.
+# AI_CACHE_DISK_SIZE caps the rows kept in the AI_CACHE_PATH SQLite file
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('AI_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('AI_CACHE_TTL', '3600')),
+    path=os.getenv('AI_CACHE_PATH') or None,
+    disabled_endpoints=[e.strip() for e in os.getenv('AI_CACHE_DISABLED_ENDPOINTS', '').split(',') if e.strip()],
+    max_disk_entries=int(os.getenv('AI_CACHE_DISK_SIZE', '100000')),
+)
+
+# Responses are JSON (orjson when installed) or MessagePack for clients that
+# ask for it, compressed with zstd/gzip from AI_COMPRESS_MIN_BYTES up
+# (0 disables compression)
+serializer = Serializer(
+    compress_min_bytes=int(os.getenv('AI_COMPRESS_MIN_BYTES', '1024')),
+    max_body_bytes=int(os.getenv('AI_MAX_BODY_BYTES', str(64 * 1024 * 1024))),
+)
+
+# Concurrent requests with the same provider prompt share one upstream call;
+# followers wait at most AI_COALESCE_TIMEOUT seconds before falling back
+single_flight = SingleFlight(
+    timeout=float(os.getenv('AI_COALESCE_TIMEOUT', '30')),
+) if os.getenv('AI_COALESCE', 'true').lower() == 'true' else None
+
+# /chat requests with a conversationId keep their turns and user context
+# server-side; older turns are compacted so prompts stay the same size.
+# AI_CONVERSATIONS=false makes /chat stateless again
+conversations = ConversationStore(
+    max_conversations=int(os.getenv('AI_CONVERSATION_LIMIT', '10000')),
+    max_bytes=int(os.getenv('AI_CONVERSATION_MAX_MB', '64')) * 1024 * 1024,
+    ttl=float(os.getenv('AI_CONVERSATION_TTL', '1800')),
+    keep_turns=int(os.getenv('AI_CONVERSATION_TURNS', '6')),
+) if os.getenv('AI_CONVERSATIONS', 'true').lower() == 'true' else None
+
+# Provider quizzes with fewer valid questions than requested are filled up
+# from the question bank; AI_QUIZ_TOP_UP=false serves them short instead
+AI_QUIZ_TOP_UP = os.getenv('AI_QUIZ_TOP_UP', 'true').lower() == 'true'
+
+# Warm pool of quizzes filled ahead of time by pregenerate.py; /quiz serves
+# from it when it has the (topic, difficulty, count) and generates live
+# otherwise. Unset AI_QUIZ_POOL_PATH disables it
+quiz_pool = QuizPool(
+    os.getenv('AI_QUIZ_POOL_PATH'),
+    depth=int(os.getenv('AI_QUIZ_POOL_DEPTH', '3')),
+    reload_interval=float(os.getenv('AI_QUIZ_POOL_RELOAD', '5')),
+) if os.getenv('AI_QUIZ_POOL_PATH') else None
+
+# Paraphrase-tolerant cache for /chat provider answers, keyed on the user
+# message embedding. Off by default: it needs requirements-ml.txt and loads
+# the embedding model on the first chat request (or in warmup)
+AI_SEMANTIC_CACHE = os.getenv('AI_SEMANTIC_CACHE', 'false').lower() == 'true'
+AI_EMBEDDING_MODEL = os.getenv('AI_EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+semantic_cache = None
+if AI_SEMANTIC_CACHE:
+    semantic = startup_timer.timed_import("semantic_cache")
+    semantic_cache = semantic.SemanticCache(
+        lambda: semantic.sentence_transformer_embedder(AI_EMBEDDING_MODEL),
+        capacity=int(os.getenv('AI_SEMANTIC_CACHE_SIZE', '10000')),
+        threshold=float(os.getenv('AI_SEMANTIC_CACHE_THRESHOLD', '0.9')),
+        path=os.getenv('AI_SEMANTIC_CACHE_PATH') or None,
+    )
+    atexit.register(semantic_cache.save)
+
+# Keyword-to-intent table for the rule-based responses
+with startup_timer.phase("intents"):
+    intent_matcher = IntentMatcher.from_file(os.getenv('AI_INTENTS_PATH') or None)
+
+# Quiz questions are loaded and indexed once; AI_QUESTION_BANK_PATHS adds
+# comma-separated JSON/JSONL files on top of the built-in bank
+with startup_timer.phase("question bank"):
+    question_bank = load_question_bank(
+        [p.strip() for p in os.getenv('AI_QUESTION_BANK_PATHS', '').split(',') if p.strip()]
+    )
+
 print(f"🤖 AI Providers Available:")
-print(f"  - OpenAI: {'✅' if OPENAI_AVAILABLE and openai.api_key else '❌'}")
+print(f"  - OpenAI: {'✅' if OPENAI_AVAILABLE and os.getenv('OPENAI_API_KEY') else '❌'}")
 print(f"  - Google Gemini: {'✅' if GEMINI_AVAILABLE and os.getenv('GEMINI_API_KEY') else '❌'}")
+print(f"  - Local model: {'✅ ' + LOCAL_MODEL if local_model else '❌'}")
 print(f"  - Fallback Mode: ✅ Always available")
+print(f"  - External providers: {'enabled' if AI_PROVIDERS_ENABLED else 'disabled'}")
 
 class RealStudyAI:
     def __init__(self):
@@ -58,15 +229,18 @@ class RealStudyAI:
             "Believe you can and you're halfway there."
         ]
 
-    def call_openai(self, prompt, max_tokens=500):
+        self.breakers = {
+            name: CircuitBreaker(name, AI_BREAKER_FAILURES, AI_BREAKER_COOLDOWN)
+            for name in ("openai", "gemini", "local")
+        }
+
+    def call_openai(self, prompt, max_tokens=500, timeout=None):
         """Call OpenAI API using v1.0+ format"""
         try:
-            from openai import OpenAI
-
-            client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = self.openai_client(provider_clients.openai(), timeout)
 
             response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=OPENAI_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=max_tokens,
                 temperature=0.7
@@ -76,52 +250,535 @@ class RealStudyAI:
             print(f"OpenAI Error: {e}")
             return None
 
-    def call_gemini(self, prompt):
+    def call_gemini(self, prompt, timeout=None):
         """Call Google Gemini API"""
         try:
-            model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(prompt)
+            model = provider_clients.gemini(GEMINI_MODEL)
+            # The sync SDK takes no timeout; past the deadline the call is abandoned
+            response = call_with_timeout(lambda: model.generate_content(prompt), timeout)
+            return response.text
+        except Exception as e:
+            print(f"Gemini Error: {e}")
+            return None
+
+    def call_local(self, prompt, max_tokens=500, timeout=None):
+        """Generate with the local model; concurrent calls share a batch"""
+        try:
+            return local_model.generate(prompt, max_tokens, timeout)
+        except Exception as e:
+            print(f"Local model Error: {e!r}")
+            return None
+
+    async def call_openai_async(self, prompt, max_tokens=500, timeout=None):
+        """Call OpenAI API without blocking the event loop"""
+        try:
+            client = self.openai_client(provider_clients.openai_async(), timeout)
+
+            response = await client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=0.7
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"OpenAI Error: {e}")
+            return None
+
+    async def call_gemini_async(self, prompt, timeout=None):
+        """Call Google Gemini API without blocking the event loop"""
+        try:
+            model = provider_clients.gemini(GEMINI_MODEL)
+            response = await asyncio.wait_for(model.generate_content_async(prompt), timeout)
             return response.text
         except Exception as e:
             print(f"Gemini Error: {e}")
             return None
 
-    def get_ai_response(self, prompt, max_tokens=500):
+    async def call_local_async(self, prompt, max_tokens=500, timeout=None):
+        """Async variant of call_local"""
+        try:
+            return await local_model.generate_async(prompt, max_tokens, timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Local model Error: {e!r}")
+            return None
+
+    def openai_client(self, client, timeout):
+        """The pooled client, bounded by the request's deadline when there is one"""
+        if timeout is None:
+            return client
+        # The SDK would retry within the same budget; the next provider is the retry
+        return client.with_options(timeout=max(timeout, 0.001), max_retries=0)
+
+    def configured_providers(self):
+        """Providers with a library and API key (or a local model), in priority order"""
+        providers = []
+        if AI_PROVIDERS_ENABLED:
+            if OPENAI_AVAILABLE and os.getenv('OPENAI_API_KEY'):
+                providers.append("openai")
+            if GEMINI_AVAILABLE and os.getenv('GEMINI_API_KEY'):
+                providers.append("gemini")
+        if local_model:
+            providers.append("local")
+        return providers
+
+    def provider_order(self):
+        """Configured providers in priority order, skipping open circuit breakers"""
+        return [name for name in self.configured_providers() if self.breakers[name].state != "open"]
+
+    def prompt_key(self, prompt, max_tokens):
+        """Key identifying a provider prompt under the current provider setup"""
+        models = {"openai": OPENAI_MODEL, "gemini": GEMINI_MODEL, "local": LOCAL_MODEL}
+        provider = ",".join(f"{name}:{models[name]}" for name in self.configured_providers())
+        return make_key(prompt, f"{AI_PROVIDER_MODE}|{provider}", max_tokens)
+
+    def cache_key(self, prompt, max_tokens, endpoint):
+        """Cache key for a provider prompt, or None when caching is off for the endpoint"""
+        if not response_cache.enabled_for(endpoint):
+            return None
+        return self.prompt_key(prompt, max_tokens)
+
+    def warmup(self):
+        """Import provider SDKs and build their clients ahead of the first request"""
+        providers = self.configured_providers()
+        if "openai" in providers:
+            provider_clients.openai()
+            provider_clients.openai_async()
+        if "gemini" in providers:
+            provider_clients.gemini(GEMINI_MODEL)
+        if "local" in providers:
+            local_model.ensure_ready()
+        if semantic_cache:
+            semantic_cache.ensure_ready()
+
+    def record_outcome(self, name, response, started):
+        metrics.observe(PROVIDER_DURATION, (name,), time.perf_counter() - started)
+        metrics.inc(PROVIDER_CALLS_TOTAL, (name, "success" if response else "error"))
+        if response:
+            self.breakers[name].record_success()
+        else:
+            self.breakers[name].record_failure()
+        return response
+
+    def rate_limit(self, name, prompt, max_tokens, endpoint, deadline=None):
+        """Wait for the provider's rate limiter; raises Overloaded if the call is shed"""
+        limiter = rate_limiters.get(name)
+        if limiter and limiter.enabled:
+            waited = limiter.acquire(ENDPOINT_PRIORITIES.get(endpoint, DEFAULT_PRIORITY),
+                                     estimate_tokens(prompt, max_tokens), deadline_policy.time_left(deadline))
+            metrics.observe(ADMISSION_WAIT, (name,), waited)
+
+    async def rate_limit_async(self, name, prompt, max_tokens, endpoint, deadline=None):
+        """Async variant of rate_limit"""
+        limiter = rate_limiters.get(name)
+        if limiter and limiter.enabled:
+            waited = await limiter.acquire_async(ENDPOINT_PRIORITIES.get(endpoint, DEFAULT_PRIORITY),
+                                                 estimate_tokens(prompt, max_tokens),
+                                                 deadline_policy.time_left(deadline))
+            metrics.observe(ADMISSION_WAIT, (name,), waited)
+
+    def overloaded(self, shed):
+        """The Overloaded to raise when every provider shed the call"""
+        return Overloaded("All AI providers are at their rate limit",
+                          min(e.retry_after for e in shed))
+
+    def out_of_time(self, deadline, endpoint, stage):
+        """True, counted as a deadline miss at ``stage``, once provider work must stop"""
+        left = deadline_policy.time_left(deadline)
+        if left is None or left > 0:
+            return False
+        metrics.inc(DEADLINE_EXCEEDED, (endpoint or "other", stage))
+        return True
+
+    def admit(self, name):
+        """Ask the provider's breaker for permission to call it"""
+        if self.breakers[name].allow():
+            return True
+        metrics.inc(PROVIDER_CALLS_TOTAL, (name, "rejected"))
+        return False
+
+    def provider_call(self, name, prompt, max_tokens, endpoint=None, shed=None, deadline=None):
+        """``call()`` for one provider; calls shed by its rate limiter are appended to ``shed``.
+
+        The call gets whatever is left of ``deadline`` and is skipped once nothing is.
+        """
+        def call():
+            try:
+                self.rate_limit(name, prompt, max_tokens, endpoint, deadline)
+            except Overloaded as e:
+                # Out of time rather than capacity: fall back instead of answering 503
+                if not self.out_of_time(deadline, endpoint, "admission"):
+                    shed.append(e)
+                return None
+            if self.out_of_time(deadline, endpoint, "skipped") or not self.admit(name):
+                return None
+            timeout = deadline_policy.time_left(deadline)
+            started = time.perf_counter()
+            if name == "openai":
+                response = self.call_openai(prompt, max_tokens, timeout)
+            elif name == "gemini":
+                response = self.call_gemini(prompt, timeout)
+            else:
+                response = self.call_local(prompt, max_tokens, timeout)
+            if not response:
+                self.out_of_time(deadline, endpoint, "provider")
+            return self.record_outcome(name, response, started)
+        return call
+
+    def provider_call_async(self, name, prompt, max_tokens, endpoint=None, shed=None, deadline=None):
+        async def call():
+            try:
+                await self.rate_limit_async(name, prompt, max_tokens, endpoint, deadline)
+            except Overloaded as e:
+                if not self.out_of_time(deadline, endpoint, "admission"):
+                    shed.append(e)
+                return None
+            if self.out_of_time(deadline, endpoint, "skipped") or not self.admit(name):
+                return None
+            timeout = deadline_policy.time_left(deadline)
+            started = time.perf_counter()
+            try:
+                if name == "openai":
+                    response = await self.call_openai_async(prompt, max_tokens, timeout)
+                elif name == "gemini":
+                    response = await self.call_gemini_async(prompt, timeout)
+                else:
+                    response = await self.call_local_async(prompt, max_tokens, timeout)
+            except asyncio.CancelledError:
+                # A hedge that lost the race must not keep the breaker's half-open trial
+                self.breakers[name].release()
+                raise
+            if not response:
+                self.out_of_time(deadline, endpoint, "provider")
+            return self.record_outcome(name, response, started)
+        return call
+
+    def get_ai_response(self, prompt, max_tokens=500, endpoint=None):
         """Try multiple AI providers with fallback"""
-        # For now, let's disable external AI due to API issues
-        # and focus on providing intelligent rule-based responses
-
-        # Try OpenAI first (currently disabled due to API issues)
-        # if OPENAI_AVAILABLE and os.getenv('OPENAI_API_KEY'):
-        #     response = self.call_openai(prompt, max_tokens)
-        #     if response:
-        #         return response, "openai"
-
-        # Try Gemini as fallback (not configured)
-        # if GEMINI_AVAILABLE and os.getenv('GEMINI_API_KEY'):
-        #     response = self.call_gemini(prompt)
-        #     if response:
-        #         return response, "gemini"
-
-        # Use intelligent rule-based responses for now
+        metrics.observe(PROMPT_SIZE, (endpoint or "other",), len(prompt))
+        # External AI is disabled by default due to API issues; set
+        # AI_PROVIDERS_ENABLED=true to try OpenAI and Gemini first, and
+        # AI_LOCAL_MODEL to try the local model.
+        if AI_PROVIDERS_ENABLED or local_model:
+            key = self.prompt_key(prompt, max_tokens)
+            # Read once here; pool threads and hedges don't see the request's context
+            deadline = deadlines.current()
+            fetch = lambda: self.fetch_ai_response(prompt, max_tokens, endpoint, key, deadline)
+            try:
+                # Identical prompts already in flight share one upstream call
+                if single_flight:
+                    response, source, origin = single_flight.run((endpoint, key), fetch,
+                                                                  deadline_policy.time_left(deadline))
+                else:
+                    response, source, origin = fetch()
+            except CoalesceTimeout as e:
+                print(f"Coalesce Error: {e}")
+                self.out_of_time(deadline, endpoint, "coalesce")
+                response = None
+            if response:
+                metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", origin))
+                return response, source
+
+        # Use intelligent rule-based responses
+        metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", "intelligent_fallback"))
+        return self.get_intelligent_response(prompt), "intelligent_fallback"
+
+    def fetch_ai_response(self, prompt, max_tokens, endpoint, key, deadline=None):
+        """``(response, source, origin)`` from the cache or the providers; response is None if all fail"""
+        cache_key = key if response_cache.enabled_for(endpoint) else None
+        cached = response_cache.get(cache_key) if cache_key else None
+        if cached:
+            return cached[0], cached[1], "cache"
+
+        response, source = None, None
+        shed = []
+        calls = [(name, self.provider_call(name, prompt, max_tokens, endpoint, shed, deadline))
+                 for name in self.provider_order()]
+        if AI_PROVIDER_MODE == "hedged":
+            response, source = hedged_race(calls, AI_HEDGE_DELAY, deadline_policy.time_left(deadline))
+        else:
+            for name, call in calls:
+                response = call()
+                if response:
+                    source = name
+                    break
+        if not response and shed and len(shed) == len(calls):
+            # Shed, not failed: answer 503 rather than degrade silently
+            raise self.overloaded(shed)
+        if response and cache_key:
+            response_cache.set(cache_key, [response, source])
+        return response, source, source
+
+    async def get_ai_response_async(self, prompt, max_tokens=500, endpoint=None):
+        """Async variant of get_ai_response for the ASGI server"""
+        metrics.observe(PROMPT_SIZE, (endpoint or "other",), len(prompt))
+        if AI_PROVIDERS_ENABLED or local_model:
+            key = self.prompt_key(prompt, max_tokens)
+            deadline = deadlines.current()
+            fetch = lambda: self.fetch_ai_response_async(prompt, max_tokens, endpoint, key, deadline)
+            try:
+                if single_flight:
+                    response, source, origin = await single_flight.run_async((endpoint, key), fetch,
+                                                                             deadline_policy.time_left(deadline))
+                else:
+                    response, source, origin = await fetch()
+            except CoalesceTimeout as e:
+                print(f"Coalesce Error: {e}")
+                self.out_of_time(deadline, endpoint, "coalesce")
+                response = None
+            if response:
+                metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", origin))
+                return response, source
+
+        metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", "intelligent_fallback"))
         return self.get_intelligent_response(prompt), "intelligent_fallback"
 
+    async def fetch_ai_response_async(self, prompt, max_tokens, endpoint, key, deadline=None):
+        """Async variant of fetch_ai_response"""
+        cache_key = key if response_cache.enabled_for(endpoint) else None
+        cached = response_cache.get(cache_key) if cache_key else None
+        if cached:
+            return cached[0], cached[1], "cache"
+
+        response, source = None, None
+        shed = []
+        calls = [(name, self.provider_call_async(name, prompt, max_tokens, endpoint, shed, deadline))
+                 for name in self.provider_order()]
+        if AI_PROVIDER_MODE == "hedged":
+            response, source = await hedged_race_async(calls, AI_HEDGE_DELAY, deadline_policy.time_left(deadline))
+        else:
+            for name, call in calls:
+                response = await call()
+                if response:
+                    source = name
+                    break
+        if not response and shed and len(shed) == len(calls):
+            # Shed, not failed: answer 503 rather than degrade silently
+            raise self.overloaded(shed)
+        if response and cache_key:
+            response_cache.set(cache_key, [response, source])
+        return response, source, source
+
+    def stream_openai(self, prompt, max_tokens=500, timeout=None):
+        """Yield OpenAI response tokens as they arrive"""
+        stream = self.openai_client(provider_clients.openai(), timeout).chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.7,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+
+    def stream_gemini(self, prompt, deadline=None):
+        """Yield Gemini response text as it arrives; each wait for a chunk ends at the deadline"""
+        model = provider_clients.gemini(GEMINI_MODEL)
+        # The sync SDK takes no timeout; a wait past the deadline is abandoned
+        response = call_with_timeout(lambda: model.generate_content(prompt, stream=True),
+                                     deadline_policy.time_left(deadline))
+        chunks = iter(response)
+        while True:
+            chunk = call_with_timeout(lambda: next(chunks, None), deadline_policy.time_left(deadline))
+            if chunk is None:
+                return
+            if chunk.text:
+                yield chunk.text
+
+    def stream_local(self, prompt, max_tokens=500, timeout=None):
+        """The local model answers in one piece; yield it line by line"""
+        yield from chunk_text(self.call_local(prompt, max_tokens, timeout) or "")
+
+    async def stream_openai_async(self, prompt, max_tokens=500, timeout=None):
+        stream = await self.openai_client(provider_clients.openai_async(), timeout).chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.7,
+            stream=True
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+    async def stream_gemini_async(self, prompt, deadline=None):
+        model = provider_clients.gemini(GEMINI_MODEL)
+        response = await asyncio.wait_for(model.generate_content_async(prompt, stream=True),
+                                          deadline_policy.time_left(deadline))
+        chunks = response.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), deadline_policy.time_left(deadline))
+            except StopAsyncIteration:
+                return
+            if chunk.text:
+                yield chunk.text
+
+    async def stream_local_async(self, prompt, max_tokens=500, timeout=None):
+        for text in chunk_text(await self.call_local_async(prompt, max_tokens, timeout) or ""):
+            yield text
+
+    def stream_ai_response(self, prompt, max_tokens=500, endpoint=None):
+        """Streaming get_ai_response: yield ``(source, text)`` chunks.
+
+        Providers are tried in order until one produces a first token; once
+        tokens have been sent there is no switching, so a mid-stream failure
+        ends the stream early, and so does the request's deadline. Fallback
+        answers are streamed line by line.
+        """
+        metrics.observe(PROMPT_SIZE, (endpoint or "other",), len(prompt))
+        if AI_PROVIDERS_ENABLED or local_model:
+            key = self.cache_key(prompt, max_tokens, endpoint)
+            cached = response_cache.get(key) if key else None
+            if cached:
+                metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", "cache"))
+                response, source = cached
+                for text in chunk_text(response):
+                    yield source, text
+                return
+
+            deadline = deadlines.current()
+            providers = self.provider_order()
+            shed = []
+            for name in providers:
+                try:
+                    self.rate_limit(name, prompt, max_tokens, endpoint, deadline)
+                except Overloaded as e:
+                    if not self.out_of_time(deadline, endpoint, "admission"):
+                        shed.append(e)
+                    continue
+                if self.out_of_time(deadline, endpoint, "skipped"):
+                    break
+                if not self.admit(name):
+                    continue
+                parts = []
+                completed = False
+                timeout = deadline_policy.time_left(deadline)
+                started = time.perf_counter()
+                if name == "openai":
+                    stream = self.stream_openai(prompt, max_tokens, timeout)
+                elif name == "gemini":
+                    stream = self.stream_gemini(prompt, deadline)
+                else:
+                    stream = self.stream_local(prompt, max_tokens, timeout)
+                try:
+                    for text in stream:
+                        parts.append(text)
+                        yield name, text
+                        if deadline and deadline.remaining() <= 0:
+                            # The caller has stopped listening; closing the stream cancels the upstream call
+                            metrics.inc(DEADLINE_EXCEEDED, (endpoint or "other", "stream"))
+                            break
+                    else:
+                        completed = True
+                except Exception as e:
+                    # e.g. a provider that stopped sending chunks until the deadline
+                    if deadline and deadline_policy.time_left(deadline) <= 0:
+                        metrics.inc(DEADLINE_EXCEEDED, (endpoint or "other", "stream"))
+                    print(f"{name} Stream Error: {e}")
+                finally:
+                    stream.close()
+                    self.record_outcome(name, "".join(parts), started)
+                if parts:
+                    if completed and key:
+                        response_cache.set(key, ["".join(parts), name])
+                    metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", name))
+                    return
+            if shed and len(shed) == len(providers):
+                raise self.overloaded(shed)
+
+        metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", "intelligent_fallback"))
+        for text in chunk_text(self.get_intelligent_response(prompt)):
+            yield "intelligent_fallback", text
+
+    async def stream_ai_response_async(self, prompt, max_tokens=500, endpoint=None):
+        """Async variant of stream_ai_response"""
+        metrics.observe(PROMPT_SIZE, (endpoint or "other",), len(prompt))
+        if AI_PROVIDERS_ENABLED or local_model:
+            key = self.cache_key(prompt, max_tokens, endpoint)
+            cached = response_cache.get(key) if key else None
+            if cached:
+                metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", "cache"))
+                response, source = cached
+                for text in chunk_text(response):
+                    yield source, text
+                return
+
+            deadline = deadlines.current()
+            providers = self.provider_order()
+            shed = []
+            for name in providers:
+                try:
+                    await self.rate_limit_async(name, prompt, max_tokens, endpoint, deadline)
+                except Overloaded as e:
+                    if not self.out_of_time(deadline, endpoint, "admission"):
+                        shed.append(e)
+                    continue
+                if self.out_of_time(deadline, endpoint, "skipped"):
+                    break
+                if not self.admit(name):
+                    continue
+                parts = []
+                completed = False
+                timeout = deadline_policy.time_left(deadline)
+                started = time.perf_counter()
+                if name == "openai":
+                    stream = self.stream_openai_async(prompt, max_tokens, timeout)
+                elif name == "gemini":
+                    stream = self.stream_gemini_async(prompt, deadline)
+                else:
+                    stream = self.stream_local_async(prompt, max_tokens, timeout)
+                try:
+                    async for text in stream:
+                        parts.append(text)
+                        yield name, text
+                        if deadline and deadline.remaining() <= 0:
+                            metrics.inc(DEADLINE_EXCEEDED, (endpoint or "other", "stream"))
+                            break
+                    else:
+                        completed = True
+                except Exception as e:
+                    # e.g. a provider that stopped sending chunks until the deadline
+                    if deadline and deadline_policy.time_left(deadline) <= 0:
+                        metrics.inc(DEADLINE_EXCEEDED, (endpoint or "other", "stream"))
+                    print(f"{name} Stream Error: {e}")
+                finally:
+                    await stream.aclose()
+                    self.record_outcome(name, "".join(parts), started)
+                if parts:
+                    if completed and key:
+                        response_cache.set(key, ["".join(parts), name])
+                    metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", name))
+                    return
+            if shed and len(shed) == len(providers):
+                raise self.overloaded(shed)
+
+        metrics.inc(AI_RESPONSES_TOTAL, (endpoint or "other", "intelligent_fallback"))
+        for text in chunk_text(self.get_intelligent_response(prompt)):
+            yield "intelligent_fallback", text
+
     def get_intelligent_response(self, prompt):
         """Generate intelligent responses using rule-based logic"""
         prompt_lower = prompt.lower()
+        intent = intent_matcher.classify("response", prompt_lower)
 
         # Quiz generation - this method is not used for quiz generation anymore
         # Quiz generation is handled by generate_quiz method directly
-        if "quiz" in prompt_lower and "questions" in prompt_lower:
+        if intent == "quiz":
             return "Quiz generation should use the generate_quiz method directly."
 
         # Study plan generation
-        elif "study plan" in prompt_lower or "schedule" in prompt_lower:
-            subjects = []
-            if "math" in prompt_lower: subjects.append("Mathematics")
-            if "physics" in prompt_lower: subjects.append("Physics")
-            if "chemistry" in prompt_lower: subjects.append("Chemistry")
-            if "calculus" in prompt_lower: subjects.append("Calculus")
+        elif intent == "study_plan":
+            subjects = intent_matcher.classify_all("plan_subject", prompt_lower)
             if not subjects: subjects = ["General Studies"]
 
             return f"""📅 **AI-Generated Study Plan**
@@ -154,18 +811,19 @@ class RealStudyAI:
 - **7-8 PM**: Light reading and revision"""
 
         # Chat responses
-        elif any(word in prompt_lower for word in ['help', 'study', 'learn', 'advice']):
-            if "calculus" in prompt_lower:
+        elif intent == "advice":
+            topic = intent_matcher.classify("advice_topic", prompt_lower)
+            if topic == "calculus":
                 return "For calculus success: 1) Master the fundamentals (limits, derivatives, integrals), 2) Practice daily with varied problems, 3) Visualize concepts with graphs, 4) Connect to real-world applications. Focus on understanding WHY formulas work, not just memorizing them."
-            elif "motivation" in prompt_lower:
+            elif topic == "motivation":
                 return f"{random.choice(self.motivational_quotes)} Remember: every expert was once a beginner. Break your goals into small, achievable steps and celebrate each victory along the way!"
-            elif "focus" in prompt_lower:
+            elif topic == "focus":
                 return "To improve focus: 1) Use the Pomodoro Technique (25min work + 5min break), 2) Eliminate distractions (phone, social media), 3) Create a dedicated study space, 4) Practice mindfulness meditation, 5) Stay hydrated and take regular breaks."
             else:
                 return f"Great question! Here's evidence-based study advice: {random.choice(self.fallback_tips)} Remember, consistent practice is more effective than cramming. Focus on understanding concepts deeply rather than memorizing facts."
 
         # Analysis responses
-        elif "analyze" in prompt_lower or "pattern" in prompt_lower:
+        elif intent == "analysis":
             return """📊 **AI Study Pattern Analysis**
 
 ✅ **Strengths Identified**:
@@ -195,9 +853,71 @@ class RealStudyAI:
         else:
             return f"I understand you're looking for study guidance. Here's personalized advice: {random.choice(self.fallback_tips)} For best results, combine this with active recall and spaced repetition techniques."
 
-    def chat_response(self, message, context=None):
+    def chat_response(self, message, context=None, conversation_id=None):
         """Generate AI chat responses using real AI"""
-        # Build context-aware prompt
+        context, history = self.chat_history(conversation_id, context)
+        # Cached answers ignore earlier turns, so only first messages use them
+        probe = None if history and history["turns"] else self.semantic_probe(message, context)
+        if probe and probe.hit:
+            return self.finish_chat_turn(conversation_id, message, *probe.hit)
+        prompt = self.build_chat_prompt(message, context, history)
+        ai_response, source = self.get_ai_response(prompt, max_tokens=200, endpoint="chat")
+        self.remember_chat(probe, ai_response, source)
+        return self.finish_chat_turn(conversation_id, message, ai_response, source)
+
+    async def chat_response_async(self, message, context=None, conversation_id=None):
+        """Async variant of chat_response"""
+        context, history = self.chat_history(conversation_id, context)
+        probe = None
+        if not (history and history["turns"]):
+            # Embedding is CPU-bound, so keep it off the event loop
+            probe = await asyncio.get_running_loop().run_in_executor(None, self.semantic_probe, message, context)
+        if probe and probe.hit:
+            return self.finish_chat_turn(conversation_id, message, *probe.hit)
+        prompt = self.build_chat_prompt(message, context, history)
+        ai_response, source = await self.get_ai_response_async(prompt, max_tokens=200, endpoint="chat")
+        if probe:
+            # Inserting takes the cache lock, which lookups on worker threads hold
+            await asyncio.get_running_loop().run_in_executor(None, self.remember_chat, probe, ai_response, source)
+        return self.finish_chat_turn(conversation_id, message, ai_response, source)
+
+    def chat_history(self, conversation_id, context):
+        """``(context, history)`` from the conversation store; history is None for stateless requests"""
+        if not (conversations and conversation_id):
+            return context, None
+        return conversations.prepare(str(conversation_id), context)
+
+    def finish_chat_turn(self, conversation_id, message, ai_response, source):
+        """finish_chat_response, recording the turn when the request belongs to a conversation"""
+        response = self.finish_chat_response(message, ai_response, source)
+        if conversations and conversation_id:
+            size = conversations.record(str(conversation_id), message, response["message"])
+            metrics.observe(CONVERSATION_SIZE, (), size)
+            response["conversationId"] = conversation_id
+        return response
+
+    def semantic_probe(self, message, context=None):
+        """Look the message up in the semantic cache, if it is in use"""
+        if not (semantic_cache and (AI_PROVIDERS_ENABLED or local_model) and message.strip()):
+            return None
+        # Entries are keyed on the message alone and shared across users, so
+        # prompts personalized with profile context neither use nor fill it
+        if any((context or {}).get(key) for key in PROFILE_KEYS):
+            return None
+        try:
+            return semantic_cache.probe(message)
+        except Exception as e:
+            print(f"Semantic cache error: {e}")
+            return None
+
+    def remember_chat(self, probe, ai_response, source):
+        """Store a provider answer in the semantic cache"""
+        if not probe or not ai_response or source == "intelligent_fallback":
+            return
+        probe.store([ai_response, source])
+
+    def build_chat_prompt(self, message, context=None, history=None):
+        """Build the context-aware chat prompt"""
         context_info = ""
         if context:
             if context.get('userName'):
@@ -207,9 +927,16 @@ class RealStudyAI:
             if context.get('recentSubjects'):
                 context_info += f"Recent subjects: {', '.join(context['recentSubjects'])}. "
 
+        conversation = ""
+        if history and (history["summary"] or history["turns"]):
+            lines = [f"Earlier: {history['summary']}"] if history["summary"] else []
+            for user, reply in history["turns"]:
+                lines += [f"User: {user}", f"Assistant: {reply}"]
+            conversation = "\n\nConversation so far:\n" + "\n".join(lines)
+
         prompt = f"""You are an expert AI study assistant for a Smart Study Scheduler app.
 
-Context: {context_info}
+Context: {context_info}{conversation}
 
 User question: "{message}"
 
@@ -223,10 +950,10 @@ If the user asks about:
 - Focus/concentration: Suggest attention improvement strategies
 
 Be friendly, supportive, and educational."""
+        return prompt
 
-        # Try to get AI response
-        ai_response, source = self.get_ai_response(prompt, max_tokens=200)
-
+    def finish_chat_response(self, message, ai_response, source):
+        """Shape the chat payload, falling back to rule-based replies"""
         if ai_response:
             return {
                 "success": True,
@@ -236,16 +963,16 @@ Be friendly, supportive, and educational."""
             }
 
         # Fallback to rule-based responses
-        message_lower = message.lower()
+        intent = intent_matcher.classify("chat_fallback", message.lower())
 
-        if any(word in message_lower for word in ['motivat', 'inspire', 'encourage']):
+        if intent == "motivation":
             return {
                 "success": True,
                 "message": f"{random.choice(self.motivational_quotes)} Remember, consistent small steps lead to big achievements! 🌟",
                 "type": "motivation",
                 "source": "fallback"
             }
-        elif any(word in message_lower for word in ['focus', 'concentration', 'distract']):
+        elif intent == "focus":
             return {
                 "success": True,
                 "message": f"Try the Pomodoro Technique: 25 minutes of focused study followed by a 5-minute break. This helps maintain concentration and prevents mental fatigue.",
@@ -263,13 +990,61 @@ Be friendly, supportive, and educational."""
     def generate_study_plan(self, subjects, time_available, goals):
         """Generate personalized study plan using real AI"""
         if not subjects or not time_available:
-            return {
-                "success": False,
-                "message": "Please provide subjects and available time."
-            }
+            return self.missing_plan_input()
 
         subjects_list = [s.strip() for s in subjects.split(',') if s.strip()]
+        prompt = self.build_study_plan_prompt(subjects_list, time_available, goals)
+        ai_response, source = self.get_ai_response(prompt, max_tokens=800, endpoint="study-plan")
+        return self.finish_study_plan(subjects_list, time_available, goals, ai_response, source)
 
+    async def generate_study_plan_async(self, subjects, time_available, goals):
+        """Async variant of generate_study_plan"""
+        if not subjects or not time_available:
+            return self.missing_plan_input()
+
+        subjects_list = [s.strip() for s in subjects.split(',') if s.strip()]
+        prompt = self.build_study_plan_prompt(subjects_list, time_available, goals)
+        ai_response, source = await self.get_ai_response_async(prompt, max_tokens=800, endpoint="study-plan")
+        return self.finish_study_plan(subjects_list, time_available, goals, ai_response, source)
+
+    def study_plan_stream(self, chunks, subjects_list, time_available, goals):
+        """Study plan chunks; the rule-based fallback text is replaced by the template plan /study-plan serves"""
+        try:
+            for source, text in chunks:
+                if source != "intelligent_fallback":
+                    yield source, text
+                    continue
+                text += "".join(rest for _, rest in chunks)
+                plan = self.finish_study_plan(subjects_list, time_available, goals, text, source)
+                for part in chunk_text(plan["message"]):
+                    yield plan["source"], part
+                return
+        finally:
+            chunks.close()
+
+    async def study_plan_stream_async(self, chunks, subjects_list, time_available, goals):
+        """Async variant of study_plan_stream"""
+        try:
+            async for source, text in chunks:
+                if source != "intelligent_fallback":
+                    yield source, text
+                    continue
+                text += "".join([rest async for _, rest in chunks])
+                plan = self.finish_study_plan(subjects_list, time_available, goals, text, source)
+                for part in chunk_text(plan["message"]):
+                    yield plan["source"], part
+                return
+        finally:
+            await chunks.aclose()
+
+    def missing_plan_input(self):
+        return {
+            "success": False,
+            "message": "Please provide subjects and available time."
+        }
+
+    def build_study_plan_prompt(self, subjects_list, time_available, goals):
+        """Build the study plan prompt"""
         prompt = f"""Create a detailed, personalized study plan with the following requirements:
 
 Subjects: {', '.join(subjects_list)}
@@ -284,21 +1059,29 @@ Please provide a comprehensive study plan that includes:
 5. Optimal study times based on cognitive science
 
 Format the response with clear sections using emojis and markdown formatting. Make it practical and actionable."""
+        return prompt
 
-        # Try to get AI response
-        ai_response, source = self.get_ai_response(prompt, max_tokens=800)
-
-        if ai_response:
-            return {
-                "success": True,
-                "message": ai_response,
-                "subjects": subjects_list,
-                "weekly_hours": time_available,
-                "source": source
-            }
+    def finish_study_plan(self, subjects_list, time_available, goals, ai_response, source):
+        """Shape the study plan payload, falling back to the template plan"""
+        provider_plan = {
+            "success": True,
+            "message": ai_response,
+            "subjects": subjects_list,
+            "weekly_hours": time_available,
+            "source": source
+        }
+        # The rule-based chat text is no plan, so provider failures get the template too
+        if ai_response and source != "intelligent_fallback":
+            return provider_plan
 
-        # Fallback to template-based plan
-        hours_per_subject = max(1, int(time_available) // len(subjects_list))
+        # Fallback to template-based plan, with this week's hours allocated
+        # by the planner (Monday to Sunday)
+        today = datetime.now().date()
+        try:
+            allocation = allocate({"subjects": subjects_list, "timeAvailable": time_available,
+                                   "startDate": (today - timedelta(days=today.weekday())).isoformat()})
+        except PlanError as e:
+            return provider_plan if ai_response else {"success": False, "message": str(e)}
 
         plan = f"""📅 **Personalized Study Plan ({time_available}h/week)**
 
@@ -316,12 +1099,15 @@ Format the response with clear sections using emojis and markdown formatting. Ma
             "Regular review sessions"
         ]
 
-        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        sessions = {}
+        for day in allocation["days"]:
+            for session in day["sessions"]:
+                sessions.setdefault(session["subject"], []).append((day["weekday"], session["minutes"]))
 
-        for i, subject in enumerate(subjects_list):
-            plan += f"\n**{subject}**: {hours_per_subject}h/week\n"
-            plan += f"  - {days[i % 5]}: {hours_per_subject//2 or 1}h (New concepts)\n"
-            plan += f"  - {days[(i+2) % 7]}: {hours_per_subject//2 or 1}h (Practice & review)\n"
+        for subject in allocation["subjects"]:
+            plan += f"\n**{subject['name']}**: {subject['scheduledMinutes'] / 60:g}h/week\n"
+            for i, (weekday, minutes) in enumerate(sessions.get(subject["name"], [])):
+                plan += f"  - {weekday}: {minutes / 60:g}h ({'Practice & review' if i else 'New concepts'})\n"
 
         plan += f"\n💡 **Recommended Techniques**:\n"
         for technique in random.sample(techniques, 3):
@@ -343,7 +1129,44 @@ Format the response with clear sections using emojis and markdown formatting. Ma
 
     def generate_quiz(self, topic, difficulty="medium", question_count=5):
         """Generate quiz questions using real AI"""
+        pooled = self.pooled_quiz(topic, difficulty, question_count)
+        return pooled or self.generate_quiz_live(topic, difficulty, question_count)
+
+    async def generate_quiz_async(self, topic, difficulty="medium", question_count=5):
+        """Async variant of generate_quiz"""
+        pooled = self.pooled_quiz(topic, difficulty, question_count)
+        return pooled or await self.generate_quiz_live_async(topic, difficulty, question_count)
+
+    def generate_quiz_live(self, topic, difficulty="medium", question_count=5):
+        """Generate a quiz from the providers, bypassing the warm pool"""
+        prompt = self.build_quiz_prompt(topic, difficulty, question_count)
+        ai_response, source = self.get_ai_response(prompt, max_tokens=1000, endpoint="quiz")
+        return self.finish_quiz(topic, difficulty, question_count, ai_response, source)
+
+    async def generate_quiz_live_async(self, topic, difficulty="medium", question_count=5):
+        """Async variant of generate_quiz_live"""
+        prompt = self.build_quiz_prompt(topic, difficulty, question_count)
+        ai_response, source = await self.get_ai_response_async(prompt, max_tokens=1000, endpoint="quiz")
+        return self.finish_quiz(topic, difficulty, question_count, ai_response, source)
+
+    def pooled_quiz(self, topic, difficulty, question_count):
+        """The /quiz payload from the warm pool, or None on a miss"""
+        stored = quiz_pool.get(topic, difficulty, question_count) if quiz_pool else None
+        if stored is None:
+            return None
+        return {
+            "success": True,
+            "quiz": {
+                "topic": topic,
+                "difficulty": difficulty,
+                "questions": stored["questions"]
+            },
+            "source": stored["source"],
+            "pool": True
+        }
 
+    def build_quiz_prompt(self, topic, difficulty, question_count):
+        """Build the quiz generation prompt"""
         prompt = f"""Generate {question_count} multiple-choice quiz questions about "{topic}" at {difficulty} difficulty level.
 
 For each question, provide:
@@ -365,209 +1188,136 @@ Format your response as a JSON object with this exact structure:
 }}
 
 Make the questions educational, accurate, and appropriate for the {difficulty} difficulty level. Ensure all options are plausible but only one is clearly correct."""
+        return prompt
 
-        # Try to get AI response
-        ai_response, source = self.get_ai_response(prompt, max_tokens=1000)
-
+    def finish_quiz(self, topic, difficulty, question_count, ai_response, source):
+        """Shape the quiz payload, filling missing questions from the subject question banks"""
+        question_count = int(question_count)
+        questions = []
         if ai_response:
-            try:
-                # Try to parse JSON response
-                import json
-                quiz_data = json.loads(ai_response)
-                return {
-                    "success": True,
-                    "quiz": {
-                        "topic": topic,
-                        "difficulty": difficulty,
-                        "questions": quiz_data["questions"]
-                    },
-                    "source": source
-                }
-            except json.JSONDecodeError:
+            # Questions are extracted one by one, so fences, extra text or a
+            # truncated answer only cost the malformed questions
+            questions, dropped = parse_quiz(ai_response)
+            self.count_quiz_questions(questions, dropped)
+            if not questions and source != "intelligent_fallback":
                 print(f"Failed to parse AI quiz response: {ai_response}")
+            questions = questions[:question_count]
 
-        # Fallback to intelligent template-based questions
-        questions = self.generate_subject_questions(topic, difficulty, int(question_count))
+        if not questions:
+            # Fallback to intelligent template-based questions
+            source = "intelligent_fallback"
+        extra = self.top_up_questions(topic, difficulty, questions, question_count) \
+            if AI_QUIZ_TOP_UP or not questions else []
 
-        return {
+        response = {
             "success": True,
             "quiz": {
                 "topic": topic,
                 "difficulty": difficulty,
-                "questions": questions
+                "questions": questions + extra
             },
-            "source": "intelligent_fallback"
+            "source": source
         }
+        if questions and extra:
+            response["bankQuestions"] = len(extra)
+        return response
+
+    def count_quiz_questions(self, questions, dropped):
+        metrics.inc(QUIZ_QUESTIONS_TOTAL, ("parsed",), len(questions))
+        if dropped:
+            metrics.inc(QUIZ_QUESTIONS_TOTAL, ("dropped",), dropped)
+
+    def top_up_questions(self, topic, difficulty, questions, question_count):
+        """Bank questions to bring a quiz up to question_count, skipping ones it already has"""
+        missing = question_count - len(questions)
+        if missing <= 0:
+            return []
+        asked = {q["question"].lower() for q in questions}
+        extra = [q for q in self.generate_subject_questions(topic, difficulty, question_count)
+                 if q["question"].lower() not in asked][:missing]
+        metrics.inc(QUIZ_QUESTIONS_TOTAL, ("bank",), len(extra))
+        return extra
+
+    def stream_quiz(self, topic, difficulty="medium", question_count=5):
+        """Yield ``(source, question)`` as each question is parsed from the provider stream.
+
+        A warm-pool hit is yielded straight away. Upstream generation is closed as soon as enough questions have been
+        served; missing questions are then filled from the question bank.
+        """
+        question_count = int(question_count)
+        pooled = self.pooled_quiz(topic, difficulty, question_count)
+        if pooled:
+            for question in pooled["quiz"]["questions"]:
+                yield pooled["source"], question
+            return
+        prompt = self.build_quiz_prompt(topic, difficulty, question_count)
+        chunks = self.stream_ai_response(prompt, max_tokens=1000, endpoint="quiz")
+        parser = QuizParser()
+        questions = []
+        try:
+            for source, text in chunks:
+                for question in parser.feed(text)[:question_count - len(questions)]:
+                    questions.append(question)
+                    yield source, question
+                if len(questions) >= question_count:
+                    break
+        finally:
+            chunks.close()
+        self.count_quiz_questions(questions, parser.dropped)
+        if AI_QUIZ_TOP_UP or not questions:
+            for question in self.top_up_questions(topic, difficulty, questions, question_count):
+                yield "intelligent_fallback", question
+
+    async def stream_quiz_async(self, topic, difficulty="medium", question_count=5):
+        """Async variant of stream_quiz"""
+        question_count = int(question_count)
+        pooled = self.pooled_quiz(topic, difficulty, question_count)
+        if pooled:
+            for question in pooled["quiz"]["questions"]:
+                yield pooled["source"], question
+            return
+        prompt = self.build_quiz_prompt(topic, difficulty, question_count)
+        chunks = self.stream_ai_response_async(prompt, max_tokens=1000, endpoint="quiz")
+        parser = QuizParser()
+        questions = []
+        try:
+            async for source, text in chunks:
+                for question in parser.feed(text)[:question_count - len(questions)]:
+                    questions.append(question)
+                    yield source, question
+                if len(questions) >= question_count:
+                    break
+        finally:
+            await chunks.aclose()
+        self.count_quiz_questions(questions, parser.dropped)
+        if AI_QUIZ_TOP_UP or not questions:
+            for question in self.top_up_questions(topic, difficulty, questions, question_count):
+                yield "intelligent_fallback", question
+
+    def finish_quiz_stream(self, topic, difficulty, streamed):
+        """Final /quiz/stream payload for the ``(source, question)`` pairs already sent"""
+        sources = [source for source, _ in streamed if source != "intelligent_fallback"]
+        response = {
+            "success": True,
+            "quiz": {
+                "topic": topic,
+                "difficulty": difficulty,
+                "questionCount": len(streamed)
+            },
+            "source": sources[0] if sources else "intelligent_fallback"
+        }
+        if sources and len(sources) < len(streamed):
+            response["bankQuestions"] = len(streamed) - len(sources)
+        return response
 
     def generate_subject_questions(self, topic, difficulty, question_count):
         """Generate subject-specific questions based on topic"""
-        topic_lower = topic.lower()
-        questions = []
+        subject = intent_matcher.classify("quiz_subject", topic.lower(), default="general")
+        if not question_bank.size(subject):
+            subject = "general"
 
-        # Subject-specific question banks
-        if "calculus" in topic_lower:
-            calculus_questions = [
-                {
-                    "question": "What is the derivative of x²?",
-                    "options": ["2x", "x", "2", "x²"],
-                    "correct": 0,
-                    "explanation": "Using the power rule: d/dx(x²) = 2x¹ = 2x"
-                },
-                {
-                    "question": "What is the derivative of sin(x)?",
-                    "options": ["cos(x)", "-cos(x)", "sin(x)", "-sin(x)"],
-                    "correct": 0,
-                    "explanation": "The derivative of sin(x) is cos(x)"
-                },
-                {
-                    "question": "What is the integral of 2x?",
-                    "options": ["x² + C", "2x² + C", "x + C", "2 + C"],
-                    "correct": 0,
-                    "explanation": "The integral of 2x is x² + C (constant of integration)"
-                },
-                {
-                    "question": "What is the limit of (sin x)/x as x approaches 0?",
-                    "options": ["1", "0", "∞", "undefined"],
-                    "correct": 0,
-                    "explanation": "This is a fundamental limit: lim(x→0) (sin x)/x = 1"
-                },
-                {
-                    "question": "What is the derivative of e^x?",
-                    "options": ["e^x", "xe^(x-1)", "e", "x"],
-                    "correct": 0,
-                    "explanation": "The derivative of e^x is e^x itself"
-                },
-                {
-                    "question": "What is the chain rule used for?",
-                    "options": ["Composite functions", "Product of functions", "Sum of functions", "Constant functions"],
-                    "correct": 0,
-                    "explanation": "The chain rule is used to differentiate composite functions"
-                }
-            ]
-            questions = calculus_questions[:question_count] if question_count <= len(calculus_questions) else calculus_questions
-
-        elif "physics" in topic_lower:
-            physics_questions = [
-                {
-                    "question": "What is Newton's second law of motion?",
-                    "options": ["F = ma", "E = mc²", "v = u + at", "s = ut + ½at²"],
-                    "correct": 0,
-                    "explanation": "Newton's second law states that Force equals mass times acceleration"
-                },
-                {
-                    "question": "What is the unit of force?",
-                    "options": ["Newton", "Joule", "Watt", "Pascal"],
-                    "correct": 0,
-                    "explanation": "The SI unit of force is the Newton (N)"
-                },
-                {
-                    "question": "What is the formula for kinetic energy?",
-                    "options": ["½mv²", "mgh", "mv", "ma"],
-                    "correct": 0,
-                    "explanation": "Kinetic energy is ½mv² where m is mass and v is velocity"
-                },
-                {
-                    "question": "What is the acceleration due to gravity on Earth?",
-                    "options": ["9.8 m/s²", "10 m/s²", "8.9 m/s²", "9.0 m/s²"],
-                    "correct": 0,
-                    "explanation": "The standard acceleration due to gravity is approximately 9.8 m/s²"
-                },
-                {
-                    "question": "What is Ohm's law?",
-                    "options": ["V = IR", "P = IV", "E = mc²", "F = ma"],
-                    "correct": 0,
-                    "explanation": "Ohm's law states that Voltage = Current × Resistance"
-                }
-            ]
-            questions = physics_questions[:question_count] if question_count <= len(physics_questions) else physics_questions
-
-        elif "chemistry" in topic_lower:
-            chemistry_questions = [
-                {
-                    "question": "What is the chemical symbol for water?",
-                    "options": ["H₂O", "CO₂", "NaCl", "CH₄"],
-                    "correct": 0,
-                    "explanation": "Water is composed of two hydrogen atoms and one oxygen atom: H₂O"
-                },
-                {
-                    "question": "What is Avogadro's number?",
-                    "options": ["6.022 × 10²³", "3.14159", "9.8", "1.602 × 10⁻¹⁹"],
-                    "correct": 0,
-                    "explanation": "Avogadro's number is 6.022 × 10²³ particles per mole"
-                },
-                {
-                    "question": "What is the pH of pure water?",
-                    "options": ["7", "0", "14", "1"],
-                    "correct": 0,
-                    "explanation": "Pure water has a neutral pH of 7"
-                },
-                {
-                    "question": "What type of bond forms between metals and non-metals?",
-                    "options": ["Ionic", "Covalent", "Metallic", "Hydrogen"],
-                    "correct": 0,
-                    "explanation": "Ionic bonds form between metals and non-metals through electron transfer"
-                }
-            ]
-            questions = chemistry_questions[:question_count] if question_count <= len(chemistry_questions) else chemistry_questions
-
-        elif "math" in topic_lower or "algebra" in topic_lower:
-            math_questions = [
-                {
-                    "question": "What is the quadratic formula?",
-                    "options": ["x = (-b ± √(b²-4ac))/2a", "x = -b/2a", "x = b²-4ac", "x = a + b + c"],
-                    "correct": 0,
-                    "explanation": "The quadratic formula solves ax² + bx + c = 0"
-                },
-                {
-                    "question": "What is the slope-intercept form of a line?",
-                    "options": ["y = mx + b", "ax + by = c", "y - y₁ = m(x - x₁)", "x = my + b"],
-                    "correct": 0,
-                    "explanation": "y = mx + b where m is slope and b is y-intercept"
-                },
-                {
-                    "question": "What is the value of π (pi) approximately?",
-                    "options": ["3.14159", "2.71828", "1.41421", "1.61803"],
-                    "correct": 0,
-                    "explanation": "π (pi) is approximately 3.14159..."
-                },
-                {
-                    "question": "What is the Pythagorean theorem?",
-                    "options": ["a² + b² = c²", "a + b = c", "a × b = c", "a/b = c"],
-                    "correct": 0,
-                    "explanation": "In a right triangle, a² + b² = c² where c is the hypotenuse"
-                }
-            ]
-            questions = math_questions[:question_count] if question_count <= len(math_questions) else math_questions
-
-        else:
-            # General study questions
-            general_questions = [
-                {
-                    "question": "What is an effective study technique for retention?",
-                    "options": ["Active recall", "Passive reading", "Highlighting only", "Cramming"],
-                    "correct": 0,
-                    "explanation": "Active recall involves testing yourself and is proven to improve long-term retention"
-                },
-                {
-                    "question": "What is the Pomodoro Technique?",
-                    "options": ["25 min study + 5 min break", "1 hour study + 15 min break", "2 hours continuous study", "30 min study + 30 min break"],
-                    "correct": 0,
-                    "explanation": "The Pomodoro Technique uses 25-minute focused study sessions followed by 5-minute breaks"
-                },
-                {
-                    "question": "What is spaced repetition?",
-                    "options": ["Reviewing at increasing intervals", "Studying the same thing daily", "Cramming before exams", "Reading once and forgetting"],
-                    "correct": 0,
-                    "explanation": "Spaced repetition involves reviewing material at increasing time intervals for better retention"
-                },
-                {
-                    "question": "What is the Feynman Technique?",
-                    "options": ["Explaining concepts simply", "Memorizing formulas", "Speed reading", "Group studying"],
-                    "correct": 0,
-                    "explanation": "The Feynman Technique involves explaining concepts in simple terms to test understanding"
-                }
-            ]
-            questions = general_questions[:question_count] if question_count <= len(general_questions) else general_questions
+        # Sample from the preloaded subject bank
+        questions = [q.to_dict() for q in question_bank.sample(subject, question_count, difficulty, topic)]
 
         # If we need more questions than available, repeat with variations
         while len(questions) < question_count:
@@ -585,13 +1335,66 @@ Make the questions educational, accurate, and appropriate for the {difficulty} d
     def analyze_study_patterns(self, study_data):
         """Analyze study patterns and provide insights using real AI"""
         if not study_data:
-            return {
-                "success": True,
-                "message": "No study data available for analysis.",
-                "source": "fallback"
-            }
+            return self.empty_analysis()
+
+        prompt = self.build_analysis_prompt(study_data)
+        ai_response, source = self.get_ai_response(prompt, max_tokens=800, endpoint="analyze")
+        return self.finish_analysis(study_data, ai_response, source)
 
-        # Build detailed prompt with study data
+    async def analyze_study_patterns_async(self, study_data):
+        """Async variant of analyze_study_patterns"""
+        if not study_data:
+            return self.empty_analysis()
+
+        prompt = self.build_analysis_prompt(study_data)
+        ai_response, source = await self.get_ai_response_async(prompt, max_tokens=800, endpoint="analyze")
+        return self.finish_analysis(study_data, ai_response, source)
+
+    def analyze_sessions(self, sessions, utc_offset_minutes=0):
+        """Analyze raw session records with the vectorized analytics engine"""
+        return self.finish_session_analysis(self.session_stats(sessions, utc_offset_minutes))
+
+    def session_stats(self, sessions, utc_offset_minutes=0):
+        """Stats for raw session records; raises on malformed records"""
+        # NumPy is only imported once raw-session analysis is actually used
+        analytics = startup_timer.timed_import("analytics")
+        return analytics.analyze_sessions(sessions, utc_offset_minutes)
+
+    def session_stream_stats(self, batches, utc_offset_minutes=0):
+        """Stats for session records arriving as an iterable of lists, one pass and one batch in memory"""
+        analytics = startup_timer.timed_import("analytics")
+        stream = analytics.SessionStream(utc_offset_minutes)
+        for sessions in batches:
+            stream.add(sessions)
+        return stream.report()
+
+    def finish_session_analysis(self, stats):
+        """Feed computed session stats to the pattern analysis and attach them"""
+        if not stats["totalSessions"]:
+            response = self.empty_analysis()
+        else:
+            response = self.analyze_study_patterns(stats)
+        response["stats"] = stats
+        return response
+
+    async def finish_session_analysis_async(self, stats):
+        """Async variant of finish_session_analysis"""
+        if not stats["totalSessions"]:
+            response = self.empty_analysis()
+        else:
+            response = await self.analyze_study_patterns_async(stats)
+        response["stats"] = stats
+        return response
+
+    def empty_analysis(self):
+        return {
+            "success": True,
+            "message": "No study data available for analysis.",
+            "source": "fallback"
+        }
+
+    def build_analysis_prompt(self, study_data):
+        """Build detailed prompt with study data"""
         prompt = f"""Analyze the following study data and provide personalized insights and recommendations:
 
 Study Data:
@@ -611,10 +1414,10 @@ Please provide a comprehensive analysis that includes:
 5. Motivational feedback and progress celebration
 
 Format the response with clear sections using emojis and markdown. Be encouraging and provide evidence-based advice."""
+        return prompt
 
-        # Try to get AI response
-        ai_response, source = self.get_ai_response(prompt, max_tokens=800)
-
+    def finish_analysis(self, study_data, ai_response, source):
+        """Shape the analysis payload, falling back to rule-based insights"""
         if ai_response:
             return {
                 "success": True,
@@ -670,49 +1473,328 @@ Format the response with clear sections using emojis and markdown. Be encouragin
         }
 
 # Initialize AI service
-study_ai = RealStudyAI()
+with startup_timer.phase("RealStudyAI"):
+    study_ai = RealStudyAI()
+
+if os.getenv('AI_WARMUP', 'false').lower() == 'true':
+    with startup_timer.phase("warmup"):
+        study_ai.warmup()
+
+def after_fork():
+    """Give a forked worker its own connections instead of the master's"""
+    provider_clients.discard()
+    response_cache.reopen()
+    if quiz_pool:
+        quiz_pool.reopen()
+    if local_model:
+        local_model.reset()
+
+# Pre-fork servers (see gunicorn.conf.py) import the app once and fork the
+# workers from it; the loaded data is shared, connections must not be
+os.register_at_fork(after_in_child=after_fork)
+
+def collect_service_metrics():
+    """Cache and circuit-breaker values for /metrics, read at scrape time"""
+    caches = [("response", response_cache.stats())]
+    if semantic_cache:
+        caches.append(("semantic", semantic_cache.stats()))
+    if quiz_pool:
+        caches.append(("quiz_pool", quiz_pool.stats()))
+    coalesced = single_flight.stats() if single_flight else {}
+    admission = [(name, limiter.stats()) for name, limiter in rate_limiters.items() if limiter.enabled]
+    local = local_model.stats() if local_model else {}
+    conversation = conversations.stats() if conversations else {}
+    return [
+        ("studyai_cache_hits_total", "counter", "Cache lookups that found an answer.",
+         [({"cache": name}, stats["hits"]) for name, stats in caches]),
+        ("studyai_cache_misses_total", "counter", "Cache lookups that found nothing.",
+         [({"cache": name}, stats["misses"]) for name, stats in caches]),
+        ("studyai_cache_hit_ratio", "gauge", "Hits over lookups since start.",
+         [({"cache": name}, stats["hit_ratio"]) for name, stats in caches]),
+        ("studyai_cache_entries", "gauge", "Entries held in memory.",
+         [({"cache": name}, stats["entries"]) for name, stats in caches]),
+        ("studyai_coalesced_requests_total", "counter",
+         "Requests that waited on an identical in-flight provider call, by outcome.",
+         [({"outcome": "shared"}, coalesced["coalesced"] - coalesced["timeouts"]),
+          ({"outcome": "timeout"}, coalesced["timeouts"])] if single_flight else []),
+        ("studyai_provider_breaker_open", "gauge", "1 while the provider's circuit breaker is open.",
+         [({"provider": name}, int(breaker.state == "open")) for name, breaker in study_ai.breakers.items()]),
+        ("studyai_admission_total", "counter",
+         "Provider calls by rate-limit outcome (admitted, queued, shed when the queue was full, timeout).",
+         [({"provider": name, "outcome": outcome}, stats[key]) for name, stats in admission
+          for outcome, key in (("admitted", "admitted"), ("queued", "queued"), ("shed", "shed"), ("timeout", "timeouts"))]),
+        ("studyai_admission_waiting", "gauge", "Provider calls waiting for their rate limiter.",
+         [({"provider": name}, stats["waiting"]) for name, stats in admission]),
+        ("studyai_local_model_requests_total", "counter", "Prompts generated by the local model.",
+         [({}, local["requests"])] if local_model else []),
+        ("studyai_local_model_batches_total", "counter",
+         "Batched generate calls of the local model; requests over batches is the mean batch size.",
+         [({}, local["batches"])] if local_model else []),
+        ("studyai_local_model_waiting", "gauge", "Prompts queued for the local model.",
+         [({}, local["waiting"])] if local_model else []),
+        ("studyai_conversations", "gauge", "Conversations held in the /chat conversation store.",
+         [({}, conversation["conversations"])] if conversations else []),
+        ("studyai_conversation_bytes", "gauge", "Estimated text held by the conversation store.",
+         [({}, conversation["bytes"])] if conversations else []),
+        ("studyai_conversation_evictions_total", "counter", "Conversations dropped, by reason (lru, memory, expired).",
+         [({"reason": reason}, count) for reason, count in conversation.get("evictions", {}).items()]),
+    ]
+
+metrics.register_collector(collect_service_metrics)
+
+@app.before_request
+def start_request_metrics():
+    # The URL rule, not the raw path, keeps label cardinality bounded
+    g.metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.metrics_started = time.perf_counter()
+    metrics.inc(REQUESTS_IN_FLIGHT, (g.metrics_route,))
+
+@app.after_request
+def record_request_metrics(response):
+    route = g.get('metrics_route', 'unmatched')
+    metrics.inc(REQUESTS_TOTAL, (route, request.method, str(response.status_code)))
+    metrics.observe(REQUEST_DURATION, (route,), time.perf_counter() - g.get('metrics_started', time.perf_counter()))
+    if not response.is_streamed:
+        metrics.observe(RESPONSE_SIZE, (route,), response.content_length or 0)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # Runs after a streamed body has been fully sent
+    if 'metrics_route' in g:
+        metrics.inc(REQUESTS_IN_FLIGHT, (g.metrics_route,), -1)
+
+@app.before_request
+def start_deadline():
+    g.deadline, g.deadline_token = deadline_policy.start(request.path, request.headers.get(deadlines.HEADER))
+
+@app.teardown_request
+def finish_deadline(error=None):
+    deadline = g.pop('deadline', None)
+    if deadline is not None:
+        record_deadline(deadline)
+    deadlines.finish(g.pop('deadline_token', None))
+
+def record_deadline(deadline):
+    """Budget left when the request finished, and a miss if there was none"""
+    remaining = deadline.remaining()
+    metrics.observe(DEADLINE_REMAINING, (deadline.endpoint,), max(remaining, 0))
+    if remaining <= 0:
+        metrics.inc(DEADLINE_EXCEEDED, (deadline.endpoint, "request"))
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    retry_after = retry_after_seconds(e.retry_after)
+    response = respond({"success": False, "message": OVERLOADED_MESSAGE, "retryAfter": retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "service": "Study AI"})
+    return respond({"status": "healthy", "service": "Study AI"})
+
+@app.route('/startup', methods=['GET'])
+def startup_report():
+    return respond(startup_timer.report())
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return respond(response_cache.stats())
+
+@app.route('/cache/semantic/stats', methods=['GET'])
+def semantic_cache_stats():
+    return respond(semantic_cache.stats() if semantic_cache else {"enabled": False})
+
+@app.route('/quiz/pool/stats', methods=['GET'])
+def quiz_pool_stats():
+    return respond(quiz_pool.stats() if quiz_pool else {"enabled": False})
+
+@app.route('/local-model/stats', methods=['GET'])
+def local_model_stats():
+    return respond(local_model.stats() if local_model else {"enabled": False})
+
+@app.route('/stream/stats', methods=['GET'])
+def stream_statistics():
+    return respond(stream_stats.summary())
+
+def respond(data):
+    body, headers = serializer.encode(data, request.headers.get('Accept', ''),
+                                      request.headers.get('Accept-Encoding', ''))
+    return Response(body, headers=headers)
+
+def request_data():
+    try:
+        return serializer.decode(request.get_data(), request.content_type,
+                                 request.headers.get('Content-Encoding', ''))
+    except ValueError as e:
+        raise BadRequest(str(e))
+
+def chat_args(data):
+    return data.get('message', ''), data.get('context', {}), data.get('conversationId')
+
+def study_plan_args(data):
+    return data.get('subjects', ''), data.get('timeAvailable', 10), data.get('goals', 'General learning')
+
+def quiz_args(data):
+    return data.get('topic', 'General Knowledge'), data.get('difficulty', 'medium'), data.get('questionCount', 5)
+
+def sse_response(events):
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def batch_response(handler):
+    try:
+        items, parallelism = parse_batch(request_data())
+    except BatchError as e:
+        return respond({"success": False, "message": str(e)}), 400
+
+    results = run_batch(items, handler, parallelism)
+    return respond({"success": True, "results": results})
 
 @app.route('/chat', methods=['POST'])
 def chat():
-    data = request.json
-    message = data.get('message', '')
-    context = data.get('context', {})
-
-    response = study_ai.chat_response(message, context)
-    return jsonify(response)
+    data = request_data()
+    response = study_ai.chat_response(*chat_args(data))
+    return respond(response)
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    return batch_response(lambda item: study_ai.chat_response(*chat_args(item)))
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    message, context, conversation_id = chat_args(request_data())
+    context, history = study_ai.chat_history(conversation_id, context)
+    prompt = study_ai.build_chat_prompt(message, context, history)
+    chunks = study_ai.stream_ai_response(prompt, max_tokens=200, endpoint="chat")
+    return sse_response(sse_events(
+        "chat", chunks, lambda text, source: study_ai.finish_chat_turn(conversation_id, message, text, source)))
+
+@app.route('/chat/conversations/stats', methods=['GET'])
+def conversation_stats():
+    return respond(conversations.stats() if conversations else {"enabled": False})
+
+@app.route('/chat/conversations/<conversation_id>', methods=['DELETE'])
+def forget_conversation(conversation_id):
+    if conversations:
+        conversations.forget(conversation_id)
+    return respond({"success": True})
 
 @app.route('/study-plan', methods=['POST'])
 def generate_study_plan():
-    data = request.json
-    subjects = data.get('subjects', '')
-    time_available = data.get('timeAvailable', 10)
-    goals = data.get('goals', 'General learning')
-
-    response = study_ai.generate_study_plan(subjects, time_available, goals)
-    return jsonify(response)
+    data = request_data()
+    response = study_ai.generate_study_plan(*study_plan_args(data))
+    return respond(response)
+
+@app.route('/study-plan/batch', methods=['POST'])
+def generate_study_plan_batch():
+    return batch_response(lambda item: study_ai.generate_study_plan(*study_plan_args(item)))
+
+@app.route('/study-plan/stream', methods=['POST'])
+def generate_study_plan_stream():
+    subjects, time_available, goals = study_plan_args(request_data())
+    if not subjects or not time_available:
+        return respond(study_ai.missing_plan_input())
+
+    subjects_list = [s.strip() for s in subjects.split(',') if s.strip()]
+    prompt = study_ai.build_study_plan_prompt(subjects_list, time_available, goals)
+    chunks = study_ai.study_plan_stream(study_ai.stream_ai_response(prompt, max_tokens=800, endpoint="study-plan"),
+                                        subjects_list, time_available, goals)
+    return sse_response(sse_events(
+        "study-plan", chunks,
+        lambda text, source: study_ai.finish_study_plan(subjects_list, time_available, goals, text, source)))
 
 @app.route('/quiz', methods=['POST'])
 def generate_quiz():
-    data = request.json
-    topic = data.get('topic', 'General Knowledge')
-    difficulty = data.get('difficulty', 'medium')
-    question_count = data.get('questionCount', 5)
-
-    response = study_ai.generate_quiz(topic, difficulty, question_count)
-    return jsonify(response)
+    data = request_data()
+    response = study_ai.generate_quiz(*quiz_args(data))
+    return respond(response)
+
+@app.route('/quiz/stream', methods=['POST'])
+def generate_quiz_stream():
+    topic, difficulty, question_count = quiz_args(request_data())
+    return sse_response(sse_items(
+        "quiz", "question", study_ai.stream_quiz(topic, difficulty, question_count),
+        lambda streamed: study_ai.finish_quiz_stream(topic, difficulty, streamed)))
+
+@app.route('/quiz/batch', methods=['POST'])
+def generate_quiz_batch():
+    return batch_response(lambda item: study_ai.generate_quiz(*quiz_args(item)))
+
+def ndjson_batches():
+    """Session records of an NDJSON request body, decoded as the body arrives"""
+    reader = NdjsonReader(request.headers.get('Content-Encoding', ''))
+    for chunk in iter(lambda: request.stream.read(65536), b""):
+        yield reader.feed(chunk)
+    yield reader.close()
 
 @app.route('/analyze', methods=['POST'])
 def analyze_patterns():
-    data = request.json
+    # Long histories can be streamed as newline-delimited session records
+    if is_ndjson(request.content_type):
+        try:
+            stats = study_ai.session_stream_stats(ndjson_batches(), int(request.args.get('utcOffsetMinutes', 0)))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            return respond({"success": False, "message": f"Invalid session data: {e}"}), 400
+        return respond(study_ai.finish_session_analysis(stats))
+
+    data = request_data()
+
+    # Raw session records are analyzed here instead of in the backend
+    if data.get('sessions') is not None:
+        try:
+            stats = study_ai.session_stats(data['sessions'], data.get('utcOffsetMinutes', 0))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            return respond({"success": False, "message": f"Invalid session data: {e}"}), 400
+        return respond(study_ai.finish_session_analysis(stats))
+
     study_data = data.get('studyData', {})
 
     response = study_ai.analyze_study_patterns(study_data)
-    return jsonify(response)
+    return respond(response)
+
+def allocate_payload(data):
+    """Study-plan allocation for a /study-plan/allocate body, as ``(payload, status)``"""
+    try:
+        return {"success": True, **allocate(data)}, 200
+    except PlanError as e:
+        return {"success": False, "message": str(e)}, 400
+
+@app.route('/study-plan/allocate', methods=['POST'])
+def allocate_study_plan():
+    payload, status = allocate_payload(request_data())
+    return respond(payload), status
+
+@app.route('/study-plan/allocate/batch', methods=['POST'])
+def allocate_study_plan_batch():
+    return batch_response(lambda item: allocate_payload(item)[0])
+
+def schedule_payload(data):
+    """SM-2 results for a /schedule/batch body, as ``(payload, status)``"""
+    # NumPy is only imported once scheduling is actually used
+    scheduling = startup_timer.timed_import("scheduling")
+    try:
+        items, columns = scheduling.parse_schedule(data)
+        if columns is not None:
+            return {"success": True, "columns": scheduling.schedule_columns(columns)}, 200
+        return {"success": True, "results": scheduling.schedule_items(items)}, 200
+    except scheduling.ScheduleError as e:
+        return {"success": False, "message": str(e)}, 400
+
+@app.route('/schedule/batch', methods=['POST'])
+def schedule_batch():
+    payload, status = schedule_payload(request_data())
+    return respond(payload), status
+
+startup_timer.mark_ready()
+startup_timer.print_report()
 
 if __name__ == '__main__':
+    # Development server; use `python asgi.py` for production serving
     port = int(os.environ.get('PORT', 5001))
     app.run(debug=True, host='0.0.0.0', port=port)
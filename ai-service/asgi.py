@@ -0,0 +1,338 @@
+"""Async (ASGI) serving mode for the Study AI service.
+
+Exposes the same routes as app.py, but handlers are coroutines and provider
+calls are awaited, so a single process can keep many upstream LLM requests in
+flight at once. Run with:
+
+    python asgi.py
+
+or point any ASGI server at ``asgi:app``.
+"""
+import os
+import re
+import time
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Match, Route
+
+import deadlines
+from admission import Overloaded, retry_after_seconds
+from app import (OVERLOADED_MESSAGE, allocate_payload, chat_args, conversations, deadline_policy, local_model,
+                 quiz_args, quiz_pool, record_deadline, response_cache, schedule_payload, semantic_cache, serializer,
+                 startup_timer, study_ai, study_plan_args)
+from batch import BatchError, parse_batch, run_batch_async
+from metrics import (CONTENT_TYPE, REQUEST_DURATION, REQUESTS_IN_FLIGHT, REQUESTS_TOTAL, RESPONSE_SIZE,
+                     metrics)
+from serialization import NdjsonReader, is_ndjson
+from streaming import sse_events_async, sse_items_async, stream_stats
+
+_PATH_PARAM = re.compile(r"\{(\w+)(?::\w+)?\}")
+
+
+async def read_payload(request):
+    try:
+        return serializer.decode(await request.body(), request.headers.get('content-type', ''),
+                                 request.headers.get('content-encoding', '')) or {}
+    except ValueError as e:
+        # Same 400 as Flask's request_data for bad JSON, oversized bodies or unknown encodings
+        raise HTTPException(400, str(e))
+
+
+def respond(request, data, status_code=200, headers=None):
+    body, content_headers = serializer.encode(data, request.headers.get('accept', ''),
+                                              request.headers.get('accept-encoding', ''))
+    return Response(body, status_code=status_code, headers={**content_headers, **(headers or {})})
+
+
+class MetricsMiddleware:
+    """Per-route request counts, latency, in-flight gauge and body size for /metrics.
+
+    Also starts the request's deadline, which the handler and its tasks see
+    through the context.
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        # Labelled with Flask-style templates (<name>), so both servers emit the same series
+        self.routes = [(route, _PATH_PARAM.sub(r"<\1>", route.path)) for route in routes]
+
+    def route_label(self, scope):
+        # Only known routes become labels, so unknown URLs can't blow up cardinality
+        for route, label in self.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return label
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = self.route_label(scope)
+        started = time.perf_counter()
+        state = {"status": None, "size": 0, "streamed": False}
+        metrics.inc(REQUESTS_IN_FLIGHT, (route,))
+        header = dict(scope["headers"]).get(deadlines.HEADER.lower().encode())
+        deadline, token = deadline_policy.start(scope["path"], header.decode("latin-1") if header else None)
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                state["status"] = str(message["status"])
+                metrics.inc(REQUESTS_TOTAL, (route, scope["method"], state["status"]))
+                metrics.observe(REQUEST_DURATION, (route,), time.perf_counter() - started)
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+                state["streamed"] = state["streamed"] or message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            metrics.inc(REQUESTS_IN_FLIGHT, (route,), -1)
+            if deadline is not None:
+                record_deadline(deadline)
+            deadlines.finish(token)
+            if state["status"] is None:
+                # The error middleware outside this one answers with a 500
+                metrics.inc(REQUESTS_TOTAL, (route, scope["method"], "500"))
+            elif not state["streamed"]:
+                metrics.observe(RESPONSE_SIZE, (route,), state["size"])
+
+
+async def metrics_endpoint(request):
+    return Response(metrics.render(), headers={"content-type": CONTENT_TYPE})
+
+
+async def health_check(request):
+    return respond(request, {"status": "healthy", "service": "Study AI"})
+
+
+async def stream_statistics(request):
+    return respond(request, stream_stats.summary())
+
+
+async def startup_report(request):
+    return respond(request, startup_timer.report())
+
+
+async def cache_stats(request):
+    return respond(request, response_cache.stats())
+
+
+async def semantic_cache_stats(request):
+    return respond(request, semantic_cache.stats() if semantic_cache else {"enabled": False})
+
+
+async def local_model_stats(request):
+    return respond(request, local_model.stats() if local_model else {"enabled": False})
+
+
+async def quiz_pool_stats(request):
+    return respond(request, quiz_pool.stats() if quiz_pool else {"enabled": False})
+
+
+def sse_response(events):
+    return StreamingResponse(events, media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def batch_response(request, handler):
+    try:
+        items, parallelism = parse_batch(await read_payload(request))
+    except BatchError as e:
+        return respond(request, {"success": False, "message": str(e)}, status_code=400)
+
+    results = await run_batch_async(items, handler, parallelism)
+    return respond(request, {"success": True, "results": results})
+
+
+async def chat(request):
+    data = await read_payload(request)
+    response = await study_ai.chat_response_async(*chat_args(data))
+    return respond(request, response)
+
+
+async def chat_stream(request):
+    message, context, conversation_id = chat_args(await read_payload(request))
+    context, history = study_ai.chat_history(conversation_id, context)
+    prompt = study_ai.build_chat_prompt(message, context, history)
+    chunks = study_ai.stream_ai_response_async(prompt, max_tokens=200, endpoint="chat")
+    return sse_response(sse_events_async(
+        "chat", chunks, lambda text, source: study_ai.finish_chat_turn(conversation_id, message, text, source)))
+
+
+async def chat_batch(request):
+    return await batch_response(request, lambda item: study_ai.chat_response_async(*chat_args(item)))
+
+
+async def conversation_stats(request):
+    return respond(request, conversations.stats() if conversations else {"enabled": False})
+
+
+async def forget_conversation(request):
+    if conversations:
+        conversations.forget(request.path_params['conversation_id'])
+    return respond(request, {"success": True})
+
+
+async def generate_study_plan(request):
+    data = await read_payload(request)
+    response = await study_ai.generate_study_plan_async(*study_plan_args(data))
+    return respond(request, response)
+
+
+async def generate_study_plan_stream(request):
+    subjects, time_available, goals = study_plan_args(await read_payload(request))
+    if not subjects or not time_available:
+        return respond(request, study_ai.missing_plan_input())
+
+    subjects_list = [s.strip() for s in subjects.split(',') if s.strip()]
+    prompt = study_ai.build_study_plan_prompt(subjects_list, time_available, goals)
+    chunks = study_ai.study_plan_stream_async(
+        study_ai.stream_ai_response_async(prompt, max_tokens=800, endpoint="study-plan"),
+        subjects_list, time_available, goals)
+    return sse_response(sse_events_async(
+        "study-plan", chunks,
+        lambda text, source: study_ai.finish_study_plan(subjects_list, time_available, goals, text, source)))
+
+
+async def generate_study_plan_batch(request):
+    return await batch_response(request, lambda item: study_ai.generate_study_plan_async(*study_plan_args(item)))
+
+
+async def allocate_study_plan(request):
+    data = await read_payload(request)
+    payload, status = allocate_payload(data)
+    return respond(request, payload, status_code=status)
+
+
+async def allocate_study_plan_batch(request):
+    async def allocate_one(item):
+        payload, _ = await run_in_threadpool(allocate_payload, item)
+        return payload
+
+    return await batch_response(request, allocate_one)
+
+
+async def generate_quiz(request):
+    data = await read_payload(request)
+    response = await study_ai.generate_quiz_async(*quiz_args(data))
+    return respond(request, response)
+
+
+async def generate_quiz_stream(request):
+    topic, difficulty, question_count = quiz_args(await read_payload(request))
+    return sse_response(sse_items_async(
+        "quiz", "question", study_ai.stream_quiz_async(topic, difficulty, question_count),
+        lambda streamed: study_ai.finish_quiz_stream(topic, difficulty, streamed)))
+
+
+async def generate_quiz_batch(request):
+    return await batch_response(request, lambda item: study_ai.generate_quiz_async(*quiz_args(item)))
+
+
+async def ndjson_stats(request, analytics):
+    """Session stats folded from an NDJSON body as it arrives"""
+    stream = analytics.SessionStream(int(request.query_params.get('utcOffsetMinutes', 0)))
+    reader = NdjsonReader(request.headers.get('content-encoding', ''))
+    async for chunk in request.stream():
+        # Parsing and folding take CPU time; keep them off the event loop
+        await run_in_threadpool(lambda: stream.add(reader.feed(chunk)))
+    stream.add(reader.close())
+    return await run_in_threadpool(stream.report)
+
+
+async def analyze_patterns(request):
+    # Fold streamed session records as they arrive instead of reading the whole body
+    if is_ndjson(request.headers.get('content-type')):
+        analytics = startup_timer.timed_import("analytics")
+        try:
+            stats = await ndjson_stats(request, analytics)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            return respond(request, {"success": False, "message": f"Invalid session data: {e}"}, status_code=400)
+        return respond(request, await study_ai.finish_session_analysis_async(stats))
+
+    data = await read_payload(request)
+
+    if data.get('sessions') is not None:
+        try:
+            # The NumPy fold takes CPU time; keep it off the event loop
+            stats = await run_in_threadpool(study_ai.session_stats, data['sessions'],
+                                            data.get('utcOffsetMinutes', 0))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            return respond(request, {"success": False, "message": f"Invalid session data: {e}"}, status_code=400)
+        return respond(request, await study_ai.finish_session_analysis_async(stats))
+
+    study_data = data.get('studyData', {})
+
+    response = await study_ai.analyze_study_patterns_async(study_data)
+    return respond(request, response)
+
+
+async def schedule_batch(request):
+    data = await read_payload(request)
+    # Large batches take seconds of CPU; keep them off the event loop
+    payload, status = await run_in_threadpool(schedule_payload, data)
+    return respond(request, payload, status_code=status)
+
+
+async def overloaded(request, e):
+    retry_after = retry_after_seconds(e.retry_after)
+    return respond(request, {"success": False, "message": OVERLOADED_MESSAGE, "retryAfter": retry_after},
+                   status_code=503, headers={"Retry-After": str(retry_after)})
+
+
+routes = [
+    Route('/metrics', metrics_endpoint, methods=['GET']),
+    Route('/health', health_check, methods=['GET']),
+    Route('/startup', startup_report, methods=['GET']),
+    Route('/cache/stats', cache_stats, methods=['GET']),
+    Route('/cache/semantic/stats', semantic_cache_stats, methods=['GET']),
+    Route('/quiz/pool/stats', quiz_pool_stats, methods=['GET']),
+    Route('/local-model/stats', local_model_stats, methods=['GET']),
+    Route('/stream/stats', stream_statistics, methods=['GET']),
+    Route('/chat', chat, methods=['POST']),
+    Route('/chat/stream', chat_stream, methods=['POST']),
+    Route('/chat/batch', chat_batch, methods=['POST']),
+    Route('/chat/conversations/stats', conversation_stats, methods=['GET']),
+    Route('/chat/conversations/{conversation_id}', forget_conversation, methods=['DELETE']),
+    Route('/study-plan', generate_study_plan, methods=['POST']),
+    Route('/study-plan/stream', generate_study_plan_stream, methods=['POST']),
+    Route('/study-plan/batch', generate_study_plan_batch, methods=['POST']),
+    Route('/study-plan/allocate', allocate_study_plan, methods=['POST']),
+    Route('/study-plan/allocate/batch', allocate_study_plan_batch, methods=['POST']),
+    Route('/quiz', generate_quiz, methods=['POST']),
+    Route('/quiz/stream', generate_quiz_stream, methods=['POST']),
+    Route('/quiz/batch', generate_quiz_batch, methods=['POST']),
+    Route('/analyze', analyze_patterns, methods=['POST']),
+    Route('/schedule/batch', schedule_batch, methods=['POST']),
+]
+
+app = Starlette(
+    routes=routes,
+    exception_handlers={Overloaded: overloaded},
+    middleware=[
+        Middleware(MetricsMiddleware, routes=routes),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+    ],
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    # No debug/reloader. Single-process entry point; for several workers
+    # sharing the preloaded app use `gunicorn -c gunicorn.conf.py`
+    port = int(os.environ.get('PORT', 5001))
+    uvicorn.run(
+        'asgi:app',
+        host='0.0.0.0',
+        port=port,
+        workers=int(os.environ.get('WEB_CONCURRENCY', 1)),
+        log_level=os.environ.get('LOG_LEVEL', 'info'),
+        access_log=os.environ.get('ACCESS_LOG', 'false').lower() == 'true',
+        reload=False,
+    )
@@ -0,0 +1,78 @@
+"""Batch execution for the /chat/batch, /quiz/batch and /study-plan/batch routes.
+
+A batch body is ``{"requests": [<single request body>, ...], "parallelism": n}``.
+Items run concurrently, capped at ``parallelism``, and share the process-wide
+caches and provider clients. Results come back in input order, one
+``{"ok": true, "response": ...}`` or ``{"ok": false, "error": ...}`` per item.
+Items run in copies of the batch request's context, so they share its
+deadline.
+"""
+import asyncio
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+AI_BATCH_MAX_ITEMS = int(os.getenv('AI_BATCH_MAX_ITEMS', '1000'))
+AI_BATCH_MAX_PARALLELISM = int(os.getenv('AI_BATCH_MAX_PARALLELISM', '16'))
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_batch(data):
+    """Validate a batch body, returning ``(items, parallelism)``"""
+    items = (data or {}).get('requests')
+    if not isinstance(items, list):
+        raise BatchError("Batch body must contain a 'requests' array.")
+    if len(items) > AI_BATCH_MAX_ITEMS:
+        raise BatchError(f"Batch is limited to {AI_BATCH_MAX_ITEMS} requests.")
+    try:
+        parallelism = int(data.get('parallelism', AI_BATCH_MAX_PARALLELISM))
+    except (TypeError, ValueError):
+        raise BatchError("'parallelism' must be an integer.")
+    return items, max(1, min(parallelism, AI_BATCH_MAX_PARALLELISM))
+
+
+def _error(e):
+    result = {"ok": False, "error": str(e)}
+    # Items shed by provider admission control carry a retry hint
+    if getattr(e, "retry_after", None) is not None:
+        result["retryAfter"] = max(1, math.ceil(e.retry_after))
+    return result
+
+
+def _check_item(item):
+    if not isinstance(item, dict):
+        raise BatchError("Each batch request must be a JSON object.")
+
+
+def run_batch(items, handler, parallelism):
+    def run_one(item):
+        try:
+            _check_item(item)
+            return {"ok": True, "response": handler(item)}
+        except Exception as e:
+            return _error(e)
+
+    if parallelism <= 1 or len(items) <= 1:
+        return [run_one(item) for item in items]
+    # Worker threads start from an empty context; each item gets a copy of the caller's
+    contexts = [copy_context() for _ in items]
+    with ThreadPoolExecutor(max_workers=min(parallelism, len(items)), thread_name_prefix="batch") as executor:
+        return list(executor.map(lambda context, item: context.run(run_one, item), contexts, items))
+
+
+async def run_batch_async(items, handler, parallelism):
+    semaphore = asyncio.Semaphore(parallelism)
+
+    async def run_one(item):
+        async with semaphore:
+            try:
+                _check_item(item)
+                return {"ok": True, "response": await handler(item)}
+            except Exception as e:
+                return _error(e)
+
+    return await asyncio.gather(*(run_one(item) for item in items))
@@ -0,0 +1,108 @@
+"""Benchmark: vectorized session analytics vs a naive per-row Python loop.
+
+    python benchmarks/bench_analytics.py [--sessions 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics  # noqa: E402
+from analytics import (LENGTH_BINS_MINUTES, MS_PER_DAY, MS_PER_HOUR, MS_PER_MINUTE,  # noqa: E402
+                       SessionAggregates, build_report, parse_timestamp)
+
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "Biology", "History", "Literature", "Calculus", "Economics"]
+
+
+def iter_synthetic_sessions(count, seed=7):
+    """``count`` sessions spread over five years, generated one at a time"""
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(days=5 * 365) / count
+    for i in range(count):
+        begin = start + step * i + timedelta(minutes=rng.randint(0, 600))
+        end = begin + timedelta(minutes=rng.randint(5, 240))
+        yield {
+            "subject": rng.choice(SUBJECTS),
+            "startTime": begin.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            "endTime": end.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            "completed": rng.random() < 0.75,
+        }
+
+
+def synthetic_sessions(count, seed=7):
+    return list(iter_synthetic_sessions(count, seed))
+
+
+def naive_aggregate(sessions, utc_offset_minutes=0):
+    """Reference implementation: one Python iteration per session"""
+    agg = SessionAggregates()
+    edges = [m * MS_PER_MINUTE for m in LENGTH_BINS_MINUTES[1:]]
+    for s in sessions:
+        start = parse_timestamp(s["startTime"])
+        duration = max(0, parse_timestamp(s["endTime"]) - start)
+        done = int(bool(s.get("completed")))
+        local = start + utc_offset_minutes * MS_PER_MINUTE
+        day = local // MS_PER_DAY
+        hour = (local // MS_PER_HOUR) % 24
+        weekday = (day + 3) % 7
+
+        agg.count += 1
+        agg.completed += done
+        agg.duration_ms += duration
+        agg.min_duration_ms = duration if agg.min_duration_ms is None else min(agg.min_duration_ms, duration)
+        agg.max_duration_ms = duration if agg.max_duration_ms is None else max(agg.max_duration_ms, duration)
+        stats = agg.subjects.setdefault(s.get("subject") or "Unknown", [0, 0, 0])
+        stats[0] += 1
+        stats[1] += done
+        stats[2] += duration
+        agg.hour_sessions[hour] += 1
+        agg.hour_completed[hour] += done
+        agg.hour_duration_ms[hour] += duration
+        agg.weekday_sessions[weekday] += 1
+        agg.weekday_completed[weekday] += done
+        agg.weekday_duration_ms[weekday] += duration
+        agg.length_counts[sum(1 for edge in edges if duration >= edge)] += 1
+        agg.day_duration_ms[day] = agg.day_duration_ms.get(day, 0) + duration
+    return agg
+
+
+def timed(fn, repeat=5):
+    """Result and best-of-``repeat`` wall time in ms"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    sessions = synthetic_sessions(args.sessions)
+    now_ms = parse_timestamp(sessions[-1]["endTime"])
+
+    columns, parse_ms = timed(lambda: analytics.session_columns(sessions))
+    agg, aggregate_ms = timed(lambda: analytics.aggregate(*columns))
+    report, report_ms = timed(lambda: build_report(agg, now_ms))
+    naive_agg, naive_ms = timed(lambda: naive_aggregate(sessions), repeat=2)
+
+    assert build_report(naive_agg, now_ms) == report, "vectorized and naive reports differ"
+
+    print(f"\nSession analytics, {args.sessions} sessions")
+    print(f"  vectorized: parse {parse_ms:.1f} ms + aggregate {aggregate_ms:.1f} ms + report {report_ms:.1f} ms"
+          f" = {parse_ms + aggregate_ms + report_ms:.1f} ms")
+    print(f"  naive loop: {naive_ms:.1f} ms (incl. parsing)")
+    print(f"  speedup:    {naive_ms / (parse_ms + aggregate_ms + report_ms):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
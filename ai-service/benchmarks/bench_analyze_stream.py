@@ -0,0 +1,152 @@
+"""Benchmark: streaming NDJSON /analyze on multi-million-session histories.
+
+First checks that streamed ingestion gives exactly the in-memory report: the
+same synthetic history goes through ``analytics.analyze_sessions`` as one
+list and through NdjsonReader + SessionStream as a (plain and gzip) NDJSON
+byte stream, and through both /analyze request modes.
+
+It then posts each ``--records`` size to /analyze as an NDJSON body that is
+generated while the service reads it, so neither side ever holds the
+history. It reports sessions per second (time spent generating the body
+excluded) and the process RSS during ingestion, which should stay flat as
+the history grows.
+
+    python benchmarks/bench_analyze_stream.py [--records 1000000,2000000,4000000] [--verify 200000]
+"""
+import argparse
+import gzip
+import io
+import os
+import sys
+import time
+
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics  # noqa: E402
+from app import app  # noqa: E402
+from bench_analytics import iter_synthetic_sessions, synthetic_sessions  # noqa: E402
+from harness import add_result_args, compare_results, rss_mb, write_results  # noqa: E402
+from serialization import NDJSON, NdjsonReader, dumps_json, loads_json  # noqa: E402
+
+UTC_OFFSET = 330
+
+
+def ndjson_chunks(sessions, lines_per_chunk=5000):
+    lines = []
+    for session in sessions:
+        lines.append(dumps_json(session))
+        if len(lines) == lines_per_chunk:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines)
+
+
+class GeneratedBody(io.RawIOBase):
+    """A request body read from a chunk generator; tracks generation time and peak RSS"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+        self.bytes = 0
+        self.generate_seconds = 0.0
+        self.peak_rss_mb = rss_mb()
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self.buffer:
+            started = time.perf_counter()
+            chunk = next(self.chunks, None)
+            self.generate_seconds += time.perf_counter() - started
+            if chunk is None:
+                return 0
+            self.buffer = chunk
+            self.bytes += len(chunk)
+            self.peak_rss_mb = max(self.peak_rss_mb, rss_mb())
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def streamed_report(chunks, encoding, now_ms):
+    reader = NdjsonReader(encoding)
+    stream = analytics.SessionStream(UTC_OFFSET)
+    for chunk in chunks:
+        stream.add(reader.feed(chunk))
+    stream.add(reader.close())
+    return stream.report(now_ms)
+
+
+def post_ndjson(body):
+    """``(status, payload)`` of an NDJSON /analyze request sent like a chunked upload (no Content-Length)"""
+    environ = EnvironBuilder(path="/analyze", method="POST", query_string={"utcOffsetMinutes": UTC_OFFSET},
+                             content_type=NDJSON).get_environ()
+    environ.pop("CONTENT_LENGTH", None)
+    environ.update({"wsgi.input": io.BufferedReader(body), "wsgi.input_terminated": True})
+    app_iter, status, _ = run_wsgi_app(app, environ, buffered=True)
+    return int(status.split()[0]), loads_json(b"".join(app_iter))
+
+
+def verify(client, count):
+    """Streamed and in-memory analysis must agree exactly"""
+    sessions = synthetic_sessions(count)
+    now_ms = analytics.parse_timestamp(sessions[-1]["endTime"])
+    expected = analytics.analyze_sessions(sessions, UTC_OFFSET, now_ms)
+    body = b"".join(ndjson_chunks(sessions))
+    assert streamed_report([body[i:i + 65521] for i in range(0, len(body), 65521)], "", now_ms) == expected, \
+        "plain NDJSON report differs from the in-memory report"
+    packed = gzip.compress(body)
+    assert streamed_report([packed[i:i + 4093] for i in range(0, len(packed), 4093)], "gzip", now_ms) == expected, \
+        "gzip NDJSON report differs from the in-memory report"
+
+    in_memory = client.post("/analyze", json={"sessions": sessions, "utcOffsetMinutes": UTC_OFFSET}).get_json()
+    _, streamed = post_ndjson(GeneratedBody(ndjson_chunks(sessions)))
+    assert streamed["stats"] == in_memory["stats"], "/analyze NDJSON and JSON stats differ"
+    print(f"  {count:,} sessions: streamed reports match the in-memory report (plain, gzip, /analyze)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", default="1000000,2000000,4000000", help="history sizes to stream")
+    parser.add_argument("--verify", type=int, default=200_000, help="sessions in the equivalence check")
+    add_result_args(parser)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    print("\nStreaming /analyze")
+    verify(client, args.verify)
+
+    results = {}
+    for count in (int(n) for n in args.records.split(',')):
+        body = GeneratedBody(ndjson_chunks(iter_synthetic_sessions(count)))
+        rss_before = rss_mb()
+        started = time.perf_counter()
+        status, payload = post_ndjson(body)
+        elapsed = time.perf_counter() - started
+        assert status == 200, payload
+        assert payload["stats"]["totalSessions"] == count
+        service_seconds = elapsed - body.generate_seconds
+        results[f"sessions_{count}"] = {
+            "body_mb": round(body.bytes / 1e6, 1),
+            "service_seconds": round(service_seconds, 2),
+            "sessions_per_second": round(count / service_seconds),
+            "rss_before_mb": rss_before,
+            "peak_rss_mb": body.peak_rss_mb,
+        }
+        row = results[f"sessions_{count}"]
+        print(f"  {count:>10,} sessions  {row['body_mb']:8.1f} MB  {row['service_seconds']:7.2f} s in the service  "
+              f"{row['sessions_per_second']:>9,}/s  RSS {rss_before:.0f} -> peak {body.peak_rss_mb:.0f} MB")
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    write_results("analyze_stream", config, results, args.output)
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
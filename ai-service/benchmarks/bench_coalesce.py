@@ -0,0 +1,65 @@
+"""Benchmark: upstream calls and latency for a burst of identical /quiz requests.
+
+Simulates a class opening the same assigned quiz: ``--clients`` threads call
+generate_quiz with the same topic at once, against stub providers with
+``--latency-ms`` of upstream latency, with single-flight coalescing on and
+off. The response cache is disabled so only coalescing is measured.
+
+    python benchmarks/bench_coalesce.py [--clients 50] [--latency-ms 800]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['AI_PROVIDERS_ENABLED'] = 'true'
+os.environ['AI_CACHE_SIZE'] = '0'
+for name in ('OPENAI', 'GEMINI'):
+    os.environ[f'{name}_RPM'] = os.environ[f'{name}_TPM'] = '0'
+
+import app  # noqa: E402
+from coalesce import SingleFlight  # noqa: E402
+from harness import latency_summary  # noqa: E402
+from stubs import StubProviders  # noqa: E402
+
+
+def burst(clients, spread_ms):
+    samples = []
+    lock = threading.Lock()
+
+    def client(index):
+        time.sleep(spread_ms / 1000 * index / clients)
+        start = time.perf_counter()
+        app.study_ai.generate_quiz("Projectile motion", "medium", 5)
+        with lock:
+            samples.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--spread-ms", type=float, default=500, help="arrivals are spread over this window")
+    args = parser.parse_args()
+
+    print(f"\n{args.clients} identical /quiz requests within {args.spread_ms:g} ms, "
+          f"upstream latency {args.latency_ms:g} ms")
+    for label, single_flight in (("coalescing off", None), ("coalescing on", SingleFlight(timeout=30))):
+        app.single_flight = single_flight
+        stubs = StubProviders(args.latency_ms, jitter=0.1, seed=1).install(app.study_ai)
+        summary = latency_summary(burst(args.clients, args.spread_ms))
+        print(f"  {label:15} upstream calls {stubs.stats()['calls']['openai']:4}   "
+              f"p50 {summary['p50_ms']:7.1f} ms  p99 {summary['p99_ms']:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
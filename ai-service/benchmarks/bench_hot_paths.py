@@ -0,0 +1,83 @@
+"""Micro-benchmarks for the hot functions behind the four AI endpoints.
+
+Runs with external providers off, so every number is local CPU time: prompt
+construction, the rule-based responder, fallback quiz sampling and pattern
+analysis. Per-call latency percentiles and calls/s are printed and written to
+a results file for run-to-run comparison.
+
+    python benchmarks/bench_hot_paths.py [--iterations 2000] [--compare results/hot_paths-....json]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['AI_PROVIDERS_ENABLED'] = 'false'
+
+from harness import add_result_args, compare_results, latency_summary, time_calls, write_results  # noqa: E402
+
+import app  # noqa: E402
+
+CONTEXT = {"userName": "Alex", "totalSessions": 42, "recentSubjects": ["Mathematics", "Physics"]}
+STUDY_DATA = {"totalSessions": 42, "completedSessions": 30, "totalStudyTime": 2400,
+              "subjects": ["Mathematics", "Physics", "Chemistry"], "averageSessionLength": 45}
+
+
+def cases():
+    ai = app.study_ai
+    chat_prompt = ai.build_chat_prompt("How do I stay focused while studying?", CONTEXT)
+    plan_prompt = ai.build_study_plan_prompt(["Mathematics", "Physics"], 10, "Pass my exams")
+    analysis_prompt = ai.build_analysis_prompt(STUDY_DATA)
+    return {
+        "build_chat_prompt": lambda: ai.build_chat_prompt("How do I stay focused while studying?", CONTEXT),
+        "build_study_plan_prompt": lambda: ai.build_study_plan_prompt(["Mathematics", "Physics"], 10, "Pass my exams"),
+        "build_quiz_prompt": lambda: ai.build_quiz_prompt("Calculus derivatives", "medium", 5),
+        "build_analysis_prompt": lambda: ai.build_analysis_prompt(STUDY_DATA),
+        "get_intelligent_response.chat": lambda: ai.get_intelligent_response(chat_prompt),
+        "get_intelligent_response.study_plan": lambda: ai.get_intelligent_response(plan_prompt),
+        "get_intelligent_response.analysis": lambda: ai.get_intelligent_response(analysis_prompt),
+        "get_intelligent_response.unmatched": lambda: ai.get_intelligent_response("hello there"),
+        "generate_subject_questions.calculus": lambda: ai.generate_subject_questions("Calculus derivatives", "medium", 5),
+        "generate_subject_questions.general": lambda: ai.generate_subject_questions("Art history", "hard", 10),
+        "analyze_study_patterns": lambda: ai.analyze_study_patterns(STUDY_DATA),
+        "chat_response": lambda: ai.chat_response("Any tips for exam motivation?", CONTEXT),
+        "generate_study_plan": lambda: ai.generate_study_plan("Mathematics, Physics", 10, "Pass my exams"),
+        "generate_quiz": lambda: ai.generate_quiz("Newton's laws", "easy", 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    add_result_args(parser)
+    args = parser.parse_args()
+
+    # The quiz fallback path logs every parse failure; keep the output readable
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        results = {}
+        for name, fn in cases().items():
+            summary = latency_summary(time_calls(fn, args.iterations))
+            results[name] = {
+                "p50_us": round(summary["p50_ms"] * 1000, 1),
+                "p95_us": round(summary["p95_ms"] * 1000, 1),
+                "p99_us": round(summary["p99_ms"] * 1000, 1),
+                "calls_per_s": round(1000 / summary["mean_ms"]),
+            }
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"\nHot paths, {args.iterations} calls each (providers off)")
+    for name, summary in results.items():
+        print(f"  {name:40} p50 {summary['p50_us']:9.1f} µs  p99 {summary['p99_us']:9.1f} µs"
+              f"  {summary['calls_per_s']:>9,} calls/s")
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    write_results("hot_paths", config, results, args.output)
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
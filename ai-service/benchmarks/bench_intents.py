@@ -0,0 +1,116 @@
+"""Micro-benchmark: per-request intent classification cost.
+
+Compares the original inline if/elif keyword chain, the table-driven
+IntentMatcher, and a single-pass regex alternation over the same keywords,
+on the real prompt templates plus longer user messages.
+
+    python benchmarks/bench_intents.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import IntentMatcher  # noqa: E402
+
+NUMBER = 20000
+
+
+def legacy_classify(prompt):
+    """The original get_intelligent_response routing, classification only"""
+    prompt_lower = prompt.lower()
+    if "quiz" in prompt_lower and "questions" in prompt_lower:
+        return "quiz", None
+    elif "study plan" in prompt_lower or "schedule" in prompt_lower:
+        subjects = []
+        if "math" in prompt_lower: subjects.append("Mathematics")
+        if "physics" in prompt_lower: subjects.append("Physics")
+        if "chemistry" in prompt_lower: subjects.append("Chemistry")
+        if "calculus" in prompt_lower: subjects.append("Calculus")
+        return "study_plan", subjects
+    elif any(word in prompt_lower for word in ['help', 'study', 'learn', 'advice']):
+        if "calculus" in prompt_lower:
+            return "advice", "calculus"
+        elif "motivation" in prompt_lower:
+            return "advice", "motivation"
+        elif "focus" in prompt_lower:
+            return "advice", "focus"
+        return "advice", None
+    elif "analyze" in prompt_lower or "pattern" in prompt_lower:
+        return "analysis", None
+    return None, None
+
+
+def matcher_classify(matcher, prompt):
+    prompt_lower = prompt.lower()
+    intent = matcher.classify("response", prompt_lower)
+    if intent == "study_plan":
+        return intent, matcher.classify_all("plan_subject", prompt_lower)
+    if intent == "advice":
+        return intent, matcher.classify("advice_topic", prompt_lower)
+    return intent, None
+
+
+def build_regex(matcher):
+    """Overlapping alternation plus, per keyword, the keywords it contains"""
+    keywords = {k for rules in matcher.groups.values() for _, any_of, all_of in rules for k in any_of + all_of}
+    alternation = "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    implied = {k: {other for other in keywords if other in k} for k in keywords}
+    return re.compile(f"(?=({alternation}))"), implied
+
+
+def regex_classify(matcher, regex, prompt):
+    """One pass collecting every keyword present, then rule lookup on the set"""
+    pattern, implied = regex
+    hits = set()
+    for keyword in set(pattern.findall(prompt.lower())):
+        hits |= implied[keyword]
+
+    def first(group):
+        for intent, any_of, all_of in matcher.groups[group]:
+            if (not any_of or any(k in hits for k in any_of)) and all(k in hits for k in all_of):
+                return intent
+        return None
+
+    intent = first("response")
+    if intent == "study_plan":
+        return intent, [i for i, a, _ in matcher.groups["plan_subject"] if any(k in hits for k in a)]
+    if intent == "advice":
+        return intent, first("advice_topic")
+    return intent, None
+
+
+def sample_prompts():
+    from app import study_ai
+
+    filler = "I keep getting distracted when I revise organic reactions and mechanisms. " * 25
+    return {
+        "chat": study_ai.build_chat_prompt("how do I stay motivated to learn calculus?",
+                                           {"userName": "Sam", "totalSessions": 12,
+                                            "recentSubjects": ["Math", "Physics"]}),
+        "study-plan": study_ai.build_study_plan_prompt(["Math", "Physics", "Chemistry"], 12, "Pass finals"),
+        "quiz": study_ai.build_quiz_prompt("thermodynamics", "hard", 10),
+        "analyze": study_ai.build_analysis_prompt({"totalSessions": 40, "completionRate": 72}),
+        "chat-2kb": study_ai.build_chat_prompt(filler, {}),
+        "plain-8kb": ("notes about the history of the roman empire and its trade routes " * 120),
+    }
+
+
+def main():
+    matcher = IntentMatcher.from_file()
+    regex = build_regex(matcher)
+    prompts = sample_prompts()
+
+    print(f"\n{'prompt':<12}{'chars':>7}{'legacy µs':>12}{'matcher µs':>13}{'regex µs':>11}")
+    for name, prompt in prompts.items():
+        assert legacy_classify(prompt) == matcher_classify(matcher, prompt) == regex_classify(matcher, regex, prompt)
+        legacy = timeit.timeit(lambda: legacy_classify(prompt), number=NUMBER) / NUMBER * 1e6
+        compiled = timeit.timeit(lambda: matcher_classify(matcher, prompt), number=NUMBER) / NUMBER * 1e6
+        single_pass = timeit.timeit(lambda: regex_classify(matcher, regex, prompt), number=NUMBER) / NUMBER * 1e6
+        print(f"{name:<12}{len(prompt):>7}{legacy:>12.2f}{compiled:>13.2f}{single_pass:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
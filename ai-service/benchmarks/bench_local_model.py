@@ -0,0 +1,123 @@
+"""Benchmark: local-model throughput and latency versus micro-batch size.
+
+Runs ``--concurrency`` client threads against LocalModel for each maximum
+batch size and reports prompts per second, latency percentiles and the batch
+sizes actually formed.
+
+With ``--model`` a real transformers model is loaded (requirements-ml.txt),
+e.g. ``--model google/flan-t5-small --max-tokens 32``. Without it a numpy
+stand-in is used: every generated token is one ``tanh(x @ W)`` step over a
+``--hidden`` x ``--hidden`` float32 weight matrix, which, like real CPU
+decoding, is dominated by reading the weights. With some BLAS builds a batch
+of two is slower than one (the library switches from a matrix-vector to a
+matrix-matrix kernel), so the table shows from which size batching pays off
+on the machine at hand; use it to pick AI_LOCAL_BATCH_SIZE.
+
+    python benchmarks/bench_local_model.py [--batch-sizes 1,2,4,8,16,32] [--requests 64] [--concurrency 16]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import add_result_args, compare_results, latency_summary, write_results  # noqa: E402
+from local_model import LocalModel, transformers_generator  # noqa: E402
+
+PROMPTS = [
+    "Explain the chain rule in one sentence.",
+    "Give one tip for memorising the periodic table.",
+    "What is Newton's second law?",
+    "How long should a study session be?",
+]
+
+
+def numpy_generator(hidden, seed=3):
+    """``generate(prompts, max_tokens)`` doing one matrix step per token for the whole batch"""
+    weights = np.random.default_rng(seed).standard_normal((hidden, hidden), dtype=np.float32) / np.sqrt(hidden)
+
+    def generate(prompts, max_tokens):
+        state = np.full((len(prompts), hidden), 0.1, dtype=np.float32)
+        for _ in range(max(max_tokens)):
+            state = np.tanh(state @ weights)
+        return [f"{len(prompt)}:{float(row[0]):.3f}" for prompt, row in zip(prompts, state)]
+
+    return generate
+
+
+def run(model, requests, concurrency, max_tokens):
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client():
+        for i in iter(lambda: next(counter, None), None):
+            start = time.perf_counter()
+            model.generate(PROMPTS[i % len(PROMPTS)], max_tokens)
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", help="transformers model name or path (default: numpy stand-in)")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    parser.add_argument("--quantize", action="store_true", help="dynamic int8 quantization of Linear layers")
+    parser.add_argument("--hidden", type=int, default=2048, help="stand-in model width")
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16,32")
+    parser.add_argument("--max-wait-ms", type=float, default=20)
+    parser.add_argument("--max-tokens", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=64, help="prompts per batch size")
+    parser.add_argument("--concurrency", type=int, default=16)
+    add_result_args(parser)
+    args = parser.parse_args()
+
+    if args.model:
+        generate = transformers_generator(args.model, threads=args.threads, quantize=args.quantize, temperature=0)
+    else:
+        generate = numpy_generator(args.hidden)
+    generate(PROMPTS[:1], [args.max_tokens])  # warm up
+
+    print(f"\nLocal model {args.model or f'numpy stand-in ({args.hidden}x{args.hidden})'}: "
+          f"{args.requests} prompts, {args.concurrency} clients, {args.max_tokens} tokens each")
+    results = {}
+    baseline = None
+    for size in (int(n) for n in args.batch_sizes.split(',')):
+        model = LocalModel(lambda: generate, max_batch_size=size, max_wait=args.max_wait_ms / 1000,
+                           max_new_tokens=args.max_tokens, timeout=600)
+        elapsed, latencies = run(model, args.requests, args.concurrency, args.max_tokens)
+        stats = model.stats()
+        throughput = round(args.requests / elapsed, 2)
+        baseline = baseline or throughput
+        results[f"batch_{size}"] = {
+            "throughput_rps": throughput,
+            "speedup": round(throughput / baseline, 2),
+            "mean_batch_size": stats["mean_batch_size"],
+            "batch_sizes": stats["batch_sizes"],
+            "latency": latency_summary(latencies),
+        }
+        latency = results[f"batch_{size}"]["latency"]
+        print(f"  max batch {size:3}  {throughput:8.2f} prompts/s  x{throughput / baseline:<5.2f} "
+              f"mean batch {stats['mean_batch_size']:5.2f}  p50 {latency['p50_ms']:8.1f}  p99 {latency['p99_ms']:8.1f} ms")
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    write_results("local_model", config, results, args.output)
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark: study-plan allocation time by number of subjects and weeks.
+
+Builds random plans (weights 1-5, exam dates spread over the horizon, mixed
+session limits) and times planner.allocate, then a /study-plan/allocate/batch
+style loop over many users.
+
+    python benchmarks/bench_planner.py [--runs 50] [--users 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import latency_summary, time_calls  # noqa: E402
+from planner import allocate  # noqa: E402
+
+START = date(2024, 5, 6)
+
+
+def plan_body(rng, subjects, weeks):
+    return {
+        "subjects": [{
+            "name": f"Subject {i}",
+            "weight": rng.randint(1, 5),
+            "examDate": (START + timedelta(days=rng.randint(7, weeks * 7))).isoformat() if rng.random() < 0.7 else None,
+            "minSession": rng.choice([15, 30, 45]),
+            "maxSession": rng.choice([60, 90, 120]),
+        } for i in range(subjects)],
+        "startDate": START.isoformat(),
+        "weeks": weeks,
+        "availability": [rng.choice([1, 2, 3, 4]) for _ in range(7)],
+        "dateAvailability": {(START + timedelta(days=rng.randint(0, weeks * 7 - 1))).isoformat(): 0},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    print(f"\nplanner.allocate, {args.runs} runs per size")
+    for subjects, weeks in ((5, 1), (10, 4), (50, 4), (50, 12), (200, 26)):
+        body = plan_body(rng, subjects, weeks)
+        summary = latency_summary(time_calls(lambda: allocate(body), args.runs))
+        plan = allocate(body)
+        print(f"  {subjects:3} subjects x {weeks:2} weeks  p50 {summary['p50_ms']:7.2f} ms  "
+              f"p99 {summary['p99_ms']:7.2f} ms  scheduled {plan['scheduledMinutes'] / max(1, plan['capacityMinutes']):.0%}"
+              " of capacity")
+
+    bodies = [plan_body(rng, rng.randint(3, 12), 4) for _ in range(args.users)]
+    start = time.perf_counter()
+    for body in bodies:
+        allocate(body)
+    elapsed = time.perf_counter() - start
+    print(f"  batch of {args.users} users (3-12 subjects, 4 weeks): {elapsed * 1000:.0f} ms, "
+          f"{args.users / elapsed:,.0f} plans/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark: memory and sampling latency of a 100k-question bank.
+
+Builds a synthetic JSONL bank, loads it into QuestionBank, and compares
+per-request sampling against the original approach of rebuilding a subject's
+question dicts and slicing them on every /quiz call.
+
+    python benchmarks/bench_question_bank.py [--size 100000] [--subjects 4]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_bank import QuestionBank  # noqa: E402
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def synthetic_record(i, subjects):
+    return {
+        "subject": subjects[i % len(subjects)],
+        "topic": f"topic-{i % 50}",
+        "difficulty": DIFFICULTIES[i % 3],
+        "question": f"Synthetic question number {i} about concept {i % 977}?",
+        "options": [f"Answer {i}", f"Distractor {i + 1}", f"Distractor {i + 2}", f"Distractor {i + 3}"],
+        "correct": 0,
+        "explanation": f"Answer {i} is correct because of rule {i % 311}.",
+    }
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples), percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--subjects", type=int, default=4)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    subjects = [f"subject{n}" for n in range(args.subjects)]
+
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+        for i in range(args.size):
+            f.write(json.dumps(synthetic_record(i, subjects)) + "\n")
+        path = f.name
+
+    try:
+        start = time.perf_counter()
+        bank = QuestionBank()
+        bank.load(path)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        # Separate load for memory: tracemalloc slows allocation down heavily
+        tracemalloc.start()
+        measured = QuestionBank()
+        measured.load(path)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del measured
+    finally:
+        os.unlink(path)
+
+    print(f"\nQuestion bank: {args.size} questions, {args.subjects} subjects")
+    print(f"  load time:      {load_ms:.0f} ms")
+    print(f"  resident bank:  {current / 1e6:.1f} MB ({current / args.size:.0f} B/question)")
+
+    subject = subjects[0]
+    p50, p99 = timed(lambda: bank.sample(subject, args.k), 2000)
+    print(f"  sample k={args.k}:    p50 {p50:.1f} µs   p99 {p99:.1f} µs")
+    p50, p99 = timed(lambda: bank.sample(subject, args.k, difficulty="hard", topic="topic-3"), 2000)
+    print(f"  sample filtered: p50 {p50:.1f} µs   p99 {p99:.1f} µs")
+    p50, p99 = timed(lambda: [q.to_dict() for q in bank.sample(subject, args.k)], 2000)
+    print(f"  sample + dicts:  p50 {p50:.1f} µs   p99 {p99:.1f} µs")
+
+    # Original approach: build every question dict for the subject, then slice
+    per_subject = args.size // args.subjects
+
+    def rebuild_and_slice():
+        questions = [synthetic_record(i * args.subjects, subjects) for i in range(per_subject)]
+        return questions[:args.k]
+
+    p50, p99 = timed(rebuild_and_slice, 5)
+    print(f"  legacy rebuild:  p50 {p50 / 1000:.1f} ms   p99 {p99 / 1000:.1f} ms ({per_subject} dicts/request)")
+
+
+if __name__ == '__main__':
+    main()
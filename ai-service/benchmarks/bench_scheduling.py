@@ -0,0 +1,118 @@
+"""Benchmark: vectorized SM-2 rescheduling vs a per-item Python loop.
+
+Generates ``--items`` review histories (0-7 reviews each, ISO timestamps as
+the backend sends them) and times JSON decoding of the request body,
+scheduling and JSON encoding of the results, i.e. the whole /schedule/batch
+path minus the network, for both the per-item and the column-wise body
+format. The per-item loop runs on a slice and its results are checked
+against the vectorized ones.
+
+    python benchmarks/bench_scheduling.py [--items 1000000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import parse_timestamp  # noqa: E402
+from scheduling import (DEFAULT_EASE, FIRST_INTERVAL_DAYS, MIN_EASE, PASSING_GRADE,  # noqa: E402
+                        SECOND_INTERVAL_DAYS, schedule_columns, schedule_items, to_iso)
+
+
+def synthetic_items(count, seed=3):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(0, 8, count)
+    total = int(lengths.sum())
+    gaps = rng.integers(3_600_000, 30 * 86_400_000, total)
+    # Review times increase within each item, starting somewhere in 2024
+    starts = np.repeat(1_704_067_200_000 + rng.integers(0, 86_400_000 * 365, count), lengths)
+    elapsed = np.cumsum(gaps)
+    elapsed_before_item = np.repeat(np.concatenate(([0], elapsed))[np.cumsum(lengths) - lengths], lengths)
+    times = to_iso(starts + elapsed - elapsed_before_item).tolist()
+    grades = rng.integers(0, 6, total).tolist()
+
+    items, position = [], 0
+    for i, length in enumerate(lengths.tolist()):
+        reviews = [{"time": times[position + k], "grade": grades[position + k]} for k in range(length)]
+        items.append({"id": f"session-{i}", "reviews": reviews})
+        position += length
+    return items
+
+
+def as_columns(items):
+    return {
+        "id": [item["id"] for item in items],
+        "reviewCounts": [len(item["reviews"]) for item in items],
+        "reviewTimes": [review["time"] for item in items for review in item["reviews"]],
+        "reviewGrades": [review["grade"] for item in items for review in item["reviews"]],
+    }
+
+
+def schedule_one(item):
+    """Reference implementation: SM-2 for a single item in plain Python"""
+    ease, interval, repetitions = DEFAULT_EASE, 0, 0
+    last_review = None
+    for review in item["reviews"]:
+        grade = review["grade"]
+        if grade >= PASSING_GRADE:
+            interval = FIRST_INTERVAL_DAYS if repetitions == 0 else \
+                SECOND_INTERVAL_DAYS if repetitions == 1 else round(interval * ease)
+            repetitions += 1
+        else:
+            interval, repetitions = FIRST_INTERVAL_DAYS, 0
+        miss = 5 - grade
+        ease = max(MIN_EASE, ease + 0.1 - miss * (0.08 + miss * 0.02))
+        last_review = parse_timestamp(review["time"])
+    return round(ease, 4), interval, repetitions, last_review
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--reference", type=int, default=100_000)
+    args = parser.parse_args()
+
+    items = synthetic_items(args.items)
+    reviews = sum(len(item["reviews"]) for item in items)
+    print(f"\nSM-2 rescheduling, {args.items} items / {reviews} reviews")
+
+    for label, body, run, key in (
+        ("items", {"items": items}, lambda data: schedule_items(data["items"]), "results"),
+        ("columns", {"columns": as_columns(items)}, lambda data: schedule_columns(data["columns"]), "columns"),
+    ):
+        body = json.dumps(body)
+        data, decode_ms = timed(lambda: json.loads(body))
+        results, schedule_ms = timed(lambda: run(data))
+        encoded, encode_ms = timed(lambda: json.dumps({"success": True, key: results}))
+        total_ms = decode_ms + schedule_ms + encode_ms
+        print(f"  {label:8} decode {decode_ms:5.0f} ms + schedule {schedule_ms:5.0f} ms + encode {encode_ms:5.0f} ms"
+              f" = {total_ms / 1000:4.1f} s ({len(body) / 1e6:.0f} MB in, {len(encoded) / 1e6:.0f} MB out)")
+        if label == "items":
+            item_results = results
+        else:
+            assert [r["nextRevision"] for r in item_results] == results["nextRevision"]
+
+    subset = items[:args.reference]
+    reference, reference_ms = timed(lambda: [schedule_one(item) for item in subset])
+    for expected, result in zip(reference, item_results):
+        ease, interval, repetitions, last_review = expected
+        assert (result["easeFactor"], result["intervalDays"], result["repetitions"]) == (ease, interval, repetitions)
+        if last_review is not None:
+            assert parse_timestamp(result["lastReview"]) == last_review
+    print(f"  per-item loop: {reference_ms:.0f} ms for {len(subset)} items "
+          f"(~{reference_ms * args.items / len(subset) / 1000:.1f} s extrapolated, scheduling only)")
+
+
+if __name__ == '__main__':
+    main()
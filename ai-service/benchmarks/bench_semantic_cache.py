@@ -0,0 +1,101 @@
+"""Benchmark: semantic cache lookup latency at 100k cached entries.
+
+Fills a SemanticCache with random unit vectors (MiniLM-sized by default) and
+times lookups that hit (a slightly perturbed stored vector) and miss (a fresh
+random vector), inserts once the cache is full and evicting, and a save/load
+round trip. Embedding time is reported separately with --model, which needs
+sentence-transformers installed.
+
+    python benchmarks/bench_semantic_cache.py [--size 100000] [--dim 384] [--model all-MiniLM-L6-v2]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import SemanticCache, sentence_transformer_embedder  # noqa: E402
+
+
+def unit_vectors(rng, n, dim):
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed(fn, inputs):
+    samples = []
+    for value in inputs:
+        start = time.perf_counter()
+        fn(value)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    cache = SemanticCache(lambda: (None, args.dim), capacity=args.size, threshold=0.9)
+    cache.ensure_ready()
+    stored = unit_vectors(rng, args.size, args.dim)
+    start = time.perf_counter()
+    for i, vector in enumerate(stored):
+        cache.add(vector, [f"answer {i}", "openai"])
+    fill_s = time.perf_counter() - start
+
+    print(f"\nSemantic cache: {args.size} entries x {args.dim} dims "
+          f"({cache._vectors.nbytes / 1e6:.0f} MB index)")
+    print(f"  fill:           {fill_s:.1f} s ({fill_s / args.size * 1e6:.1f} µs/insert)")
+
+    picks = rng.integers(0, args.size, args.lookups)
+    noise = unit_vectors(rng, args.lookups, args.dim) * 0.05
+    near = stored[picks] + noise
+    near /= np.linalg.norm(near, axis=1, keepdims=True)
+    p50, p99 = timed(cache.lookup, near)
+    print(f"  lookup (hit):   p50 {p50:.2f} ms   p99 {p99:.2f} ms")
+    p50, p99 = timed(cache.lookup, unit_vectors(rng, args.lookups, args.dim))
+    print(f"  lookup (miss):  p50 {p50:.2f} ms   p99 {p99:.2f} ms")
+    print(f"  hit ratio:      {cache.stats()['hit_ratio']:.2f} (expected 0.50)")
+
+    fresh = unit_vectors(rng, args.lookups, args.dim)
+    p50, p99 = timed(lambda v: cache.add(v, ["new answer", "gemini"]), fresh)
+    print(f"  insert (evict): p50 {p50:.2f} ms   p99 {p99:.2f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache.path = os.path.join(tmp, "semantic.npz")
+        start = time.perf_counter()
+        cache.save()
+        save_ms = (time.perf_counter() - start) * 1000
+        reloaded = SemanticCache(lambda: (None, args.dim), capacity=args.size, path=cache.path)
+        start = time.perf_counter()
+        reloaded.ensure_ready()
+        load_ms = (time.perf_counter() - start) * 1000
+        size_mb = os.path.getsize(cache.path) / 1e6
+    assert reloaded.size == cache.size
+    print(f"  save / load:    {save_ms:.0f} ms / {load_ms:.0f} ms ({size_mb:.0f} MB file)")
+
+    if args.model:
+        embed, _ = sentence_transformer_embedder(args.model)
+        messages = [f"how can I focus better when studying topic {i}?" for i in range(50)]
+        p50, p99 = timed(embed, messages)
+        print(f"  embed ({args.model}): p50 {p50:.1f} ms   p99 {p99:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
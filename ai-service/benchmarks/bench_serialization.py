@@ -0,0 +1,105 @@
+"""Benchmark: encode/decode cost and bytes on the wire per serializer.
+
+Compares the stdlib json module (what Flask's jsonify and request.json used),
+orjson and MessagePack on representative payloads: a raw-session /analyze
+request body, its report, a /quiz/batch response and a /chat response. Each
+encoded body is also compressed with gzip and zstd at the levels the service
+uses. Codecs whose package is not installed are skipped.
+
+    python benchmarks/bench_serialization.py [--sessions 20000] [--quizzes 50] [--iterations 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization  # noqa: E402
+from bench_analytics import synthetic_sessions  # noqa: E402
+from harness import add_result_args, compare_results, latency_summary, time_calls, write_results  # noqa: E402
+from serialization import Serializer  # noqa: E402
+
+
+def codecs():
+    found = {
+        # Flask's default provider: sorted keys, compact separators
+        "stdlib_json": (lambda data: json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8"),
+                        json.loads),
+    }
+    if serialization.orjson is not None:
+        found["orjson"] = (serialization.dumps_json, serialization.loads_json)
+    if serialization.msgpack is not None:
+        msgpack = serialization.msgpack
+        found["msgpack"] = (lambda data: msgpack.packb(data, use_bin_type=True),
+                            lambda body: msgpack.unpackb(body, raw=False, strict_map_key=False))
+    return found
+
+
+def payloads(args):
+    from app import study_ai
+
+    sessions = synthetic_sessions(args.sessions)
+    subjects = ["calculus", "physics", "chemistry", "math", "biology"]
+    return {
+        "analyze_request": {"sessions": sessions},
+        "analyze_report": study_ai.analyze_sessions(sessions),
+        "quiz_batch": {"success": True, "results": [
+            study_ai.generate_quiz(subjects[i % len(subjects)], "medium", 10) for i in range(args.quizzes)]},
+        "chat": study_ai.chat_response("How should I revise for my calculus exam?", {}),
+    }
+
+
+def timed_ms(fn, iterations):
+    summary = latency_summary(time_calls(fn, iterations, warmup=3))
+    return summary["p50_ms"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20000, help="sessions in the /analyze payloads")
+    parser.add_argument("--quizzes", type=int, default=50, help="quizzes in the batch response")
+    parser.add_argument("--iterations", type=int, default=50)
+    add_result_args(parser)
+    args = parser.parse_args()
+
+    serializer = Serializer()
+    available = codecs()
+    results = {}
+    for name, data in payloads(args).items():
+        print(f"\n{name}")
+        print(f"  {'codec':12} {'encode ms':>10} {'decode ms':>10} {'bytes':>11} {'gzip':>10} {'zstd':>10}")
+        results[name] = {}
+        for codec, (encode, decode) in available.items():
+            body = encode(data)
+            row = {
+                "encode_ms": timed_ms(lambda: encode(data), args.iterations),
+                "decode_ms": timed_ms(lambda: decode(body), args.iterations),
+                "bytes": len(body),
+            }
+            start = time.perf_counter()
+            row["gzip_bytes"] = len(serializer.compress(body, "gzip"))
+            row["gzip_ms"] = round((time.perf_counter() - start) * 1000, 4)
+            if serialization.zstandard is not None:
+                start = time.perf_counter()
+                row["zstd_bytes"] = len(serializer.compress(body, "zstd"))
+                row["zstd_ms"] = round((time.perf_counter() - start) * 1000, 4)
+            results[name][codec] = row
+            print(f"  {codec:12} {row['encode_ms']:10.3f} {row['decode_ms']:10.3f} {row['bytes']:11,} "
+                  f"{row['gzip_bytes']:10,} {format(row['zstd_bytes'], ',') if 'zstd_bytes' in row else '-':>10}")
+        baseline = results[name]["stdlib_json"]
+        for codec, row in results[name].items():
+            if codec != "stdlib_json" and row["encode_ms"] and row["decode_ms"]:
+                row["encode_speedup"] = round(baseline["encode_ms"] / row["encode_ms"], 2)
+                row["decode_speedup"] = round(baseline["decode_ms"] / row["decode_ms"], 2)
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    config["codecs"] = list(available)
+    write_results("serialization", config, results, args.output)
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Benchmark: throughput scaling of the pre-fork server across worker counts.
+
+Starts ``gunicorn -c gunicorn.conf.py`` with 1, 2, 4, ... workers (up to the
+number of cores by default), drives it with the load_test.py request mix and
+reports throughput, speed-up over one worker and latency. Providers are off,
+so every request is local CPU work and the numbers show how well that work
+spreads over processes. Memory is read from /proc: PSS (proportional set
+size) counts each page shared copy-on-write with the master only
+fractionally, so total PSS growing much slower than workers x RSS shows the
+preloaded data being shared.
+
+    python benchmarks/bench_workers.py [--workers 1,2,4] [--duration 10] [--concurrency 32]
+
+Linux only (memory figures come from /proc/<pid>/smaps_rollup).
+"""
+import argparse
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from harness import add_result_args, compare_results, write_results  # noqa: E402
+from load_test import parse_mix, run_load  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_healthy(port, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited with status {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("gunicorn did not become healthy")
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name may contain spaces; ppid follows the closing parenthesis
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        found.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return found
+
+
+def memory_kb(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values
+
+
+def measure(workers, args, mix):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port), LOG_LEVEL='warning',
+               AI_PROVIDERS_ENABLED='false', AI_CACHE_SIZE='0', AI_MAX_REQUESTS='0')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}'],
+                               cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_healthy(port, process)
+        results = run_load(f"http://127.0.0.1:{port}", mix, args.duration, args.concurrency, args.seed, args.sessions)
+        pids = children(process.pid)
+        usage = [memory_kb(pid) for pid in pids]
+        results["workers"] = len(pids)
+        results["memory_mb"] = {
+            "master_rss": round(memory_kb(process.pid)['Rss'] / 1024, 1),
+            "workers_rss": round(sum(u['Rss'] for u in usage) / 1024, 1),
+            "workers_pss": round(sum(u['Pss'] for u in usage) / 1024, 1),
+            "workers_shared": round(sum(u.get('Shared_Clean', 0) + u.get('Shared_Dirty', 0) for u in usage) / 1024, 1),
+        }
+        return results
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    cores = os.cpu_count() or 1
+    default_workers = [n for n in (1, 2, 4, 8, 16, 32) if n <= cores] or [1]
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)))
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default="chat=2,study-plan=2,quiz=2,analyze=4")
+    parser.add_argument("--sessions", type=int, default=500, help="sessions per raw /analyze request")
+    parser.add_argument("--seed", type=int, default=1)
+    add_result_args(parser)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    print(f"\nPre-fork scaling on {cores} core(s): {args.concurrency} clients for {args.duration:g}s, mix {args.mix}")
+    results = {}
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(',')):
+        run = measure(workers, args, mix)
+        overall = run["overall"]
+        baseline = baseline or overall["throughput_rps"]
+        run["speedup"] = round(overall["throughput_rps"] / baseline, 2) if baseline else None
+        results[f"workers_{workers}"] = run
+        memory = run["memory_mb"]
+        print(f"  {workers:3} workers  {overall['throughput_rps']:8.1f} req/s  x{run['speedup']:<5}  "
+              f"p50 {overall['p50_ms']:7.1f}  p99 {overall['p99_ms']:7.1f} ms  errors {overall['errors']}  "
+              f"workers rss {memory['workers_rss']} MB, pss {memory['workers_pss']} MB")
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    config["cores"] = cores
+    write_results("workers", config, results, args.output)
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
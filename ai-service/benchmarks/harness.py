@@ -0,0 +1,105 @@
+"""Shared helpers for the benchmark and load-test scripts.
+
+Results are written as JSON so runs can be compared: every script accepts
+``--output`` (default ``benchmarks/results/<name>-<timestamp>.json``) and
+``--compare <earlier results file>``, which prints the change of every
+numeric metric next to the new value.
+"""
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def latency_summary(samples_ms):
+    """Count, mean and p50/p95/p99/max of latency samples in milliseconds"""
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 4)
+
+    return {"count": len(ordered), "mean_ms": round(statistics.fmean(ordered), 4),
+            "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99), "max_ms": round(ordered[-1], 4)}
+
+
+def time_calls(fn, iterations, warmup=10):
+    """Per-call latency samples (ms) for ``iterations`` calls of fn"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (Linux), else peak RSS"""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6, 1)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return round(peak / 1e6 if sys.platform == 'darwin' else peak * 1024 / 1e6, 1)
+
+
+def add_result_args(parser):
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<name>-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+
+
+def write_results(name, config, results, output=None):
+    document = {
+        "benchmark": name,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {output}")
+    return output
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}{key}.")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix[:-1], value
+
+
+def compare_results(results, baseline_path):
+    """Print every numeric metric with its change against a previous run"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = dict(_flatten(json.load(f)["results"]))
+    print(f"\nCompared with {baseline_path}:")
+    for key, value in _flatten(results):
+        before = baseline.get(key)
+        if before is None:
+            print(f"  {key:60} {value:>12}   (new)")
+        elif before == 0:
+            print(f"  {key:60} {value:>12}   (was 0)")
+        else:
+            print(f"  {key:60} {value:>12}   {100 * (value - before) / before:+7.1f}%")
@@ -0,0 +1,212 @@
+"""Load test: drive /chat, /study-plan, /quiz and /analyze over local HTTP.
+
+By default the Flask app is served in-process on a random localhost port with
+stub providers (see stubs.py) in place of OpenAI/Gemini, so the run is fully
+offline and repeatable. Worker threads send a weighted mix of requests for
+``--duration`` seconds; throughput, p50/p95/p99 latency per endpoint, error
+counts and process memory are printed and written to a results file.
+
+    python benchmarks/load_test.py [--duration 10] [--concurrency 16]
+        [--latency-ms 300] [--error-rate 0.05] [--mix chat=4,study-plan=2,quiz=2,analyze=2]
+        [--providers stub|fallback] [--cache] [--compare results/load_test-....json]
+
+``--providers fallback`` leaves external providers off and measures the
+rule-based paths. ``--url http://host:port`` targets an already running server
+instead (its own provider configuration then applies).
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import (add_result_args, compare_results, latency_summary, peak_rss_mb, rss_mb,  # noqa: E402
+                     write_results)
+
+CHAT_MESSAGES = [
+    "How do I focus better when studying?",
+    "Any tips to stay motivated before exams?",
+    "What is the best way to memorize formulas?",
+    "How should I manage my time with three subjects?",
+    "I keep procrastinating, what can I do?",
+    "Explain spaced repetition to me",
+]
+SUBJECT_SETS = ["Mathematics, Physics", "Chemistry, Biology, History", "Calculus", "Literature, Economics"]
+QUIZ_TOPICS = ["Calculus derivatives", "Newton's laws", "Chemical bonding", "World history", "Algebra"]
+
+
+def synthetic_sessions(rng, count):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    sessions = []
+    for i in range(count):
+        begin = start + timedelta(hours=rng.randint(0, 24 * 90))
+        end = begin + timedelta(minutes=rng.randint(10, 180))
+        sessions.append({"subject": rng.choice(["Mathematics", "Physics", "Chemistry"]),
+                         "startTime": begin.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                         "endTime": end.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                         "completed": rng.random() < 0.8})
+    return sessions
+
+
+def request_body(endpoint, rng, sessions):
+    if endpoint == "chat":
+        return {"message": rng.choice(CHAT_MESSAGES),
+                "context": {"totalSessions": rng.randint(0, 50), "recentSubjects": ["Mathematics"]}}
+    if endpoint == "study-plan":
+        return {"subjects": rng.choice(SUBJECT_SETS), "timeAvailable": rng.choice([5, 10, 20]),
+                "goals": "Pass my exams"}
+    if endpoint == "quiz":
+        return {"topic": rng.choice(QUIZ_TOPICS), "difficulty": rng.choice(["easy", "medium", "hard"]),
+                "questionCount": 5}
+    if rng.random() < 0.5:
+        return {"sessions": sessions}
+    return {"studyData": {"totalSessions": rng.randint(1, 100), "completedSessions": rng.randint(0, 50),
+                          "totalStudyTime": rng.randint(60, 6000), "subjects": ["Mathematics", "Physics"]}}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        endpoint, _, weight = part.partition('=')
+        mix[endpoint.strip()] = float(weight or 1)
+    unknown = set(mix) - {"chat", "study-plan", "quiz", "analyze"}
+    if unknown:
+        raise SystemExit(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def start_local_server(args):
+    """Import the app with the requested provider setup and serve it on a free port"""
+    os.environ['AI_PROVIDERS_ENABLED'] = 'true' if args.providers == 'stub' else 'false'
+    if not args.cache:
+        os.environ['AI_CACHE_SIZE'] = '0'
+    # Stub providers have no upstream limits; measure the service, not the rate limiter
+    for name in ('OPENAI', 'GEMINI'):
+        os.environ[f'{name}_RPM'] = os.environ[f'{name}_TPM'] = '0'
+    from werkzeug.serving import make_server
+
+    # Per-request access log lines would dominate the run's own output
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    import app as service
+    stubs = None
+    if args.providers == 'stub':
+        from stubs import StubProviders
+        stubs = StubProviders(args.latency_ms, args.jitter, args.error_rate, seed=args.seed).install(service.study_ai)
+
+    server = make_server('127.0.0.1', 0, service.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", stubs
+
+
+def run_load(base_url, mix, duration, concurrency, seed, sessions_per_request):
+    target = urlsplit(base_url)
+    endpoints, weights = zip(*mix.items())
+    samples = {endpoint: [] for endpoint in endpoints}
+    errors = {endpoint: 0 for endpoint in endpoints}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        sessions = synthetic_sessions(rng, sessions_per_request)
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            body = json.dumps(request_body(endpoint, rng, sessions))
+            start = time.perf_counter()
+            try:
+                connection.request('POST', f"/{endpoint}", body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+                if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                ok = False
+                connection.close()
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                samples[endpoint].append(elapsed)
+                errors[endpoint] += not ok
+        connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {"endpoints": {}}
+    all_samples = []
+    for endpoint in endpoints:
+        summary = latency_summary(samples[endpoint])
+        summary["errors"] = errors[endpoint]
+        summary["throughput_rps"] = round(len(samples[endpoint]) / elapsed, 2)
+        results["endpoints"][endpoint] = summary
+        all_samples.extend(samples[endpoint])
+    results["overall"] = latency_summary(all_samples)
+    results["overall"]["errors"] = sum(errors.values())
+    results["overall"]["throughput_rps"] = round(len(all_samples) / elapsed, 2)
+    results["elapsed_s"] = round(elapsed, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default="chat=4,study-plan=2,quiz=2,analyze=2")
+    parser.add_argument("--providers", choices=["stub", "fallback"], default="stub")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter", type=float, default=0.3, help="latency std-dev as a fraction of the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on")
+    parser.add_argument("--sessions", type=int, default=200, help="sessions per raw /analyze request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="load an already running server instead of an in-process one")
+    add_result_args(parser)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    server = stubs = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        server, base_url, stubs = start_local_server(args)
+    rss_before = rss_mb()
+
+    print(f"\nLoad test: {base_url}, {args.concurrency} workers for {args.duration:g}s, mix {args.mix}")
+    results = run_load(base_url, mix, args.duration, args.concurrency, args.seed, args.sessions)
+    if server is not None:
+        server.shutdown()
+        results["memory_mb"] = {"rss_before": rss_before, "rss_after": rss_mb(), "peak_rss": peak_rss_mb()}
+    if stubs is not None:
+        results["providers"] = stubs.stats()
+
+    for endpoint, summary in list(results["endpoints"].items()) + [("overall", results["overall"])]:
+        if summary["count"]:
+            print(f"  {endpoint:11} {summary['count']:6} req  {summary['throughput_rps']:8.1f} req/s  "
+                  f"p50 {summary['p50_ms']:8.1f}  p95 {summary['p95_ms']:8.1f}  p99 {summary['p99_ms']:8.1f} ms"
+                  f"  errors {summary['errors']}")
+    if "memory_mb" in results:
+        memory = results["memory_mb"]
+        print(f"  memory: rss {memory['rss_before']} -> {memory['rss_after']} MB, peak {memory['peak_rss']} MB")
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    write_results("load_test", config, results, args.output)
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
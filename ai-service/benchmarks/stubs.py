@@ -0,0 +1,81 @@
+"""Offline stand-ins for the OpenAI and Gemini calls used by the load tests.
+
+``StubProviders.install(study_ai)`` replaces the provider call methods of a
+RealStudyAI instance. Each call sleeps for a simulated upstream latency and
+fails (returns None, like the real methods do on an exception) at the
+configured error rate. A call given a timeout (the request's deadline) fails
+once it runs out, as the real calls do. Quiz prompts get a well-formed JSON
+quiz back so the normal parsing path is exercised.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+_QUESTION_COUNT = re.compile(r"Generate (\d+) multiple-choice")
+
+
+def stub_answer(prompt):
+    match = _QUESTION_COUNT.search(prompt)
+    if match:
+        questions = [{
+            "question": f"Stub question {i + 1}?",
+            "options": ["Option A", "Option B", "Option C", "Option D"],
+            "correct": i % 4,
+            "explanation": "Stub explanation.",
+        } for i in range(int(match.group(1)))]
+        return json.dumps({"questions": questions})
+    return ("Break the material into 25-minute focused blocks, test yourself with active recall "
+            "at the end of each one, and schedule a spaced review for tomorrow.")
+
+
+class StubProviders:
+    def __init__(self, latency_ms=300, jitter=0.3, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = {"openai": 0, "gemini": 0}
+        self.failures = {"openai": 0, "gemini": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _plan(self, name):
+        """(delay seconds, fail?) for one call"""
+        with self._lock:
+            self.calls[name] += 1
+            delay = max(0.0, self._random.gauss(self.latency_ms, self.latency_ms * self.jitter)) / 1000
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.failures[name] += 1
+        return delay, fail
+
+    def call(self, name, prompt, timeout=None):
+        delay, fail = self._plan(name)
+        if timeout is not None and delay > timeout:
+            time.sleep(max(timeout, 0))
+            return None
+        time.sleep(delay)
+        return None if fail else stub_answer(prompt)
+
+    async def call_async(self, name, prompt, timeout=None):
+        delay, fail = self._plan(name)
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(max(timeout, 0))
+            return None
+        await asyncio.sleep(delay)
+        return None if fail else stub_answer(prompt)
+
+    def install(self, study_ai):
+        study_ai.configured_providers = lambda: ["openai", "gemini"]
+        study_ai.call_openai = lambda prompt, max_tokens=500, timeout=None: self.call("openai", prompt, timeout)
+        study_ai.call_gemini = lambda prompt, timeout=None: self.call("gemini", prompt, timeout)
+        study_ai.call_openai_async = (lambda prompt, max_tokens=500, timeout=None:
+                                      self.call_async("openai", prompt, timeout))
+        study_ai.call_gemini_async = lambda prompt, timeout=None: self.call_async("gemini", prompt, timeout)
+        return self
+
+    def stats(self):
+        with self._lock:
+            return {"calls": dict(self.calls), "failures": dict(self.failures)}
@@ -0,0 +1,170 @@
+"""Prompt/response cache for provider answers.
+
+An in-memory LRU with per-entry TTL, optionally backed by a SQLite file so
+cached answers survive restarts. The file may be shared by several worker
+processes: it is opened in WAL mode with a busy timeout, and a database error
+is treated as a miss (or a skipped write) rather than failing the request.
+Every ``prune_every`` writes, expired rows are deleted and the table is
+trimmed to the ``max_disk_entries`` rows that expire last.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def make_key(prompt, provider, max_tokens):
+    """Stable cache key for a prompt sent to a provider/model with a token limit"""
+    raw = f"{provider}\x00{max_tokens}\x00{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=1024, ttl=3600, path=None, disabled_endpoints=(), max_disk_entries=100000,
+                 prune_every=500, busy_timeout=5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disabled_endpoints = set(disabled_endpoints)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_errors = 0
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = prune_every
+        self.busy_timeout = busy_timeout
+        self._writes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.path = path
+        self._db = None
+        if path:
+            self._db = self._connect()
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+            self._db.commit()
+            with self._lock:
+                self._prune()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        # WAL lets other workers read while one writes
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def reopen(self):
+        """Open a fresh SQLite connection; a connection must not be used across fork()"""
+        if self.path:
+            self._lock = threading.Lock()
+            self._db = self._connect()
+
+    def _disk_error(self, action, error):
+        self.disk_errors += 1
+        print(f"Response cache {action} failed: {error}")
+
+    def enabled_for(self, endpoint):
+        return self.max_entries > 0 and endpoint not in self.disabled_endpoints
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    self._disk_error("read", e)
+                    row = None
+                if row and row[1] > now:
+                    value = json.loads(row[0])
+                    self._store(key, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, expires_at, value)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), expires_at),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._db.rollback()
+                    self._disk_error("write", e)
+                    return
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._prune()
+
+    def _prune(self):
+        """Delete expired rows and all but the ``max_disk_entries`` rows that expire last"""
+        try:
+            self._db.execute(
+                "DELETE FROM responses WHERE expires_at < ? OR key IN "
+                "(SELECT key FROM responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (time.time(), self.max_disk_entries),
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            self._db.rollback()
+            self._disk_error("prune", e)
+
+    def _store(self, key, expires_at, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_errors": self.disk_errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
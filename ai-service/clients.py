@@ -0,0 +1,103 @@
+"""Long-lived provider clients shared by every request in the process.
+
+Building an OpenAI client or Gemini model per call repeats TLS handshakes and
+object setup on the hot path. The registry builds each client once, backs the
+OpenAI clients with a pooled keep-alive HTTP client, and rebuilds a client
+only when its API key changes.
+"""
+import inspect
+import os
+import threading
+
+from startup import startup_timer
+
+
+class ProviderClients:
+    def __init__(self, pool_size=100, keepalive=20, keepalive_expiry=30.0, timeout=60.0):
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        httpx = startup_timer.timed_import("httpx")
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def _get(self, name, api_key, build):
+        """Return the cached client for ``name``, rebuilding it if the key rotated"""
+        entry = self._clients.get(name)
+        if entry is not None and entry[0] == api_key:
+            return entry[1]
+        with self._lock:
+            entry = self._clients.get(name)
+            if entry is not None and entry[0] == api_key:
+                return entry[1]
+            client = build(api_key)
+            self._clients[name] = (api_key, client)
+        if entry is not None:
+            self._close(entry[1])
+        return client
+
+    def _close(self, client):
+        close = getattr(client, "close", None)
+        if close is None:
+            return
+        try:
+            result = close()
+            # AsyncOpenAI.close() is a coroutine and we may not be on its event
+            # loop; drop it and let the pool be released when it is collected.
+            if inspect.iscoroutine(result):
+                result.close()
+        except Exception as e:
+            print(f"Client close error: {e}")
+
+    def openai(self):
+        def build(api_key):
+            httpx = startup_timer.timed_import("httpx")
+            openai = startup_timer.timed_import("openai")
+
+            http_client = httpx.Client(limits=self._limits(), timeout=self.timeout)
+            return openai.OpenAI(api_key=api_key, http_client=http_client)
+
+        return self._get("openai", os.getenv('OPENAI_API_KEY'), build)
+
+    def openai_async(self):
+        def build(api_key):
+            httpx = startup_timer.timed_import("httpx")
+            openai = startup_timer.timed_import("openai")
+
+            http_client = httpx.AsyncClient(limits=self._limits(), timeout=self.timeout)
+            return openai.AsyncOpenAI(api_key=api_key, http_client=http_client)
+
+        return self._get("openai_async", os.getenv('OPENAI_API_KEY'), build)
+
+    def gemini(self, model_name):
+        def build(api_key):
+            genai = startup_timer.timed_import("google.generativeai")
+
+            # The Gemini SDK keeps one transport per configure() call
+            genai.configure(api_key=api_key)
+            return genai.GenerativeModel(model_name)
+
+        return self._get(f"gemini:{model_name}", os.getenv('GEMINI_API_KEY'), build)
+
+    def discard(self):
+        """Forget every client without closing it, for a freshly forked worker.
+
+        The pooled sockets belong to the parent process; closing them here
+        would shut down the parent's connections too.
+        """
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def reset(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for _, client in clients.values():
+            self._close(client)
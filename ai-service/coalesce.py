@@ -0,0 +1,112 @@
+"""Single-flight request coalescing for identical concurrent provider prompts.
+
+The first request for a key (the leader) runs the computation; requests for
+the same key that arrive while it is in flight (followers) wait for it and
+share its result or its exception instead of issuing their own upstream
+call. Followers give up with CoalesceTimeout after ``timeout`` seconds, or
+sooner if their own deadline leaves less. Once
+the computation finishes the key is released, so later requests start a new
+flight (and are normally answered by the response cache).
+"""
+import asyncio
+import threading
+
+
+class CoalesceTimeout(TimeoutError):
+    pass
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._flights = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """``(flight, is_leader)`` for a key, creating the flight if there is none"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            self.leaders += 1
+            return flight, True
+
+    def _timeout(self, timeout):
+        return self.timeout if timeout is None else max(min(self.timeout, timeout), 0)
+
+    def run(self, key, fn, timeout=None):
+        """``fn()``, or the result of an identical call already in flight (waiting at most ``timeout``)"""
+        flight, leader = self._join(key)
+        if not leader:
+            timeout = self._timeout(timeout)
+            if not flight.done.wait(timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise CoalesceTimeout(f"Waited {timeout:.2f}s for an identical request")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                self.errors += flight.error is not None
+            flight.done.set()
+        return flight.result
+
+    async def run_async(self, key, make_coroutine, timeout=None):
+        """Async variant of run; the shared computation runs as its own task"""
+        task = self._tasks.get(key)
+        if task is None:
+            self.leaders += 1
+            task = self._tasks[key] = asyncio.ensure_future(make_coroutine())
+            task.add_done_callback(lambda done: self._finish_task(key, done))
+            # shield: a leader whose client disconnects must not cancel the
+            # computation the followers are waiting on
+            return await asyncio.shield(task)
+
+        self.coalesced += 1
+        timeout = self._timeout(timeout)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise CoalesceTimeout(f"Waited {timeout:.2f}s for an identical request")
+
+    def _finish_task(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            "in_flight": len(self._flights) + len(self._tasks),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "timeout": self.timeout,
+        }
@@ -0,0 +1,164 @@
+"""Server-side conversation state for /chat.
+
+Requests that carry a ``conversationId`` get their earlier turns and their
+user context (name, session count, recent subjects) from here. The client
+only sends the new message and whatever context changed.
+
+Prompt size stays flat however long a conversation gets. Only the last
+``keep_turns`` turns are kept verbatim, each cut to ``turn_chars``. Older
+turns are compacted into a summary of the earlier questions, with the
+oldest questions dropped first once it would exceed ``summary_chars``.
+Compaction is extractive, so it costs no provider call.
+
+The store is an LRU bounded by ``max_conversations`` and ``max_bytes`` (an
+estimate of the text held). Conversations idle for ``ttl`` seconds expire.
+State is per process: with several workers a conversation should stick to
+one of them, otherwise it restarts from the client's context.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s")
+_WHITESPACE = re.compile(r"\s+")
+
+# Rough fixed cost of a conversation's objects beyond the text it holds
+_OVERHEAD_BYTES = 600
+PROFILE_KEYS = ("userName", "totalSessions", "recentSubjects")
+
+
+def _clip(text, limit):
+    text = _WHITESPACE.sub(" ", text or "").strip()
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def _gist(message, limit=80):
+    """First sentence of a message, clipped, for the summary"""
+    return _clip(_SENTENCE.split(_WHITESPACE.sub(" ", message).strip(), 1)[0], limit)
+
+
+class _Conversation:
+    __slots__ = ("profile", "summary", "turns", "compacted", "size", "used_at")
+
+    def __init__(self, now):
+        self.profile = {}
+        self.summary = []
+        self.turns = []
+        self.compacted = 0
+        self.size = _OVERHEAD_BYTES
+        self.used_at = now
+
+    def measure(self):
+        self.size = (_OVERHEAD_BYTES + sum(len(gist) for gist in self.summary)
+                     + sum(len(user) + len(reply) for user, reply in self.turns)
+                     + len(repr(self.profile)))
+        return self.size
+
+
+class ConversationStore:
+    def __init__(self, max_conversations=10000, max_bytes=64 * 1024 * 1024, ttl=1800.0, keep_turns=6,
+                 turn_chars=600, summary_chars=600):
+        self.max_conversations = max_conversations
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.keep_turns = keep_turns
+        self.turn_chars = turn_chars
+        self.summary_chars = summary_chars
+        self.bytes = 0
+        self.evictions = {"lru": 0, "memory": 0, "expired": 0}
+        self.compactions = 0
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        # Least recently used first, so expired conversations sit at the front
+        while self._conversations:
+            key, conversation = next(iter(self._conversations.items()))
+            if now - conversation.used_at < self.ttl:
+                break
+            self._drop(key, "expired")
+
+    def _drop(self, key, reason):
+        conversation = self._conversations.pop(key)
+        self.bytes -= conversation.size
+        self.evictions[reason] += 1
+
+    def _evict(self, keep):
+        while len(self._conversations) > self.max_conversations:
+            self._drop(next(iter(self._conversations)), "lru")
+        while self.bytes > self.max_bytes and len(self._conversations) > 1:
+            key = next(iter(self._conversations))
+            if key == keep:
+                break
+            self._drop(key, "memory")
+
+    def _conversation(self, key, now):
+        self._expire(now)
+        conversation = self._conversations.get(key)
+        if conversation is None:
+            conversation = self._conversations[key] = _Conversation(now)
+            self.bytes += conversation.size
+        else:
+            self._conversations.move_to_end(key)
+        conversation.used_at = now
+        return conversation
+
+    def _resize(self, key, conversation):
+        self.bytes -= conversation.size
+        self.bytes += conversation.measure()
+        self._evict(key)
+
+    def prepare(self, key, context=None):
+        """``(context, history)`` for a new message: the stored profile updated from ``context``,
+        and ``{"summary", "turns"}`` with the earlier conversation"""
+        with self._lock:
+            conversation = self._conversation(key, time.monotonic())
+            for name in PROFILE_KEYS:
+                if (context or {}).get(name):
+                    conversation.profile[name] = context[name]
+            self._resize(key, conversation)
+            merged = dict(context or {}, **conversation.profile)
+            summary = "; ".join(conversation.summary)
+            if conversation.compacted:
+                summary = f"{conversation.compacted} earlier messages, recently about: {summary}"
+            return merged, {"summary": summary, "turns": list(conversation.turns)}
+
+    def record(self, key, message, reply):
+        """Add a finished turn, compacting the oldest turns into the summary"""
+        with self._lock:
+            conversation = self._conversation(key, time.monotonic())
+            conversation.turns.append((_clip(message, self.turn_chars), _clip(reply, self.turn_chars)))
+            while len(conversation.turns) > self.keep_turns:
+                user, _ = conversation.turns.pop(0)
+                conversation.summary.append(_gist(user))
+                conversation.compacted += 1
+                self.compactions += 1
+            summary_chars = sum(len(gist) + 2 for gist in conversation.summary)
+            while len(conversation.summary) > 1 and summary_chars > self.summary_chars:
+                summary_chars -= len(conversation.summary.pop(0)) + 2
+            self._resize(key, conversation)
+            return conversation.size
+
+    def forget(self, key):
+        with self._lock:
+            if key in self._conversations:
+                conversation = self._conversations.pop(key)
+                self.bytes -= conversation.size
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            count = len(self._conversations)
+            sizes = [conversation.size for conversation in self._conversations.values()]
+            return {
+                "conversations": count,
+                "bytes": self.bytes,
+                "mean_bytes": round(self.bytes / count) if count else 0,
+                "max_bytes_per_conversation": max(sizes, default=0),
+                "max_conversations": self.max_conversations,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "compactions": self.compactions,
+                "evictions": dict(self.evictions),
+            }
@@ -0,0 +1,96 @@
+"""Per-request deadlines for the AI routes.
+
+Each request to an AI route (``/chat``, ``/quiz``, ... and their ``/stream``
+variants) gets a time budget. It comes from the caller's
+``X-Request-Timeout-Ms`` header, so a backend that gives up after 8 seconds
+can say so, or else from the route's default. It is capped at ``maximum``.
+Batch routes get a deadline only from the header, and it covers the whole
+batch.
+
+The Deadline is kept in a context variable for the request. Provider code
+reads it once, at the top of get_ai_response, and passes it on explicitly to
+rate-limit waits, coalesced waits, hedges and every provider call. Each of
+those gets only the time that is left. Provider work stops ``reserve``
+seconds before the deadline, so the rule-based fallback still answers
+within the caller's budget.
+"""
+import time
+from contextvars import ContextVar
+
+HEADER = "X-Request-Timeout-Ms"
+
+# Default budget in seconds per AI endpoint
+DEFAULT_BUDGETS = {"chat": 10.0, "study-plan": 20.0, "quiz": 25.0, "analyze": 10.0}
+
+_current = ContextVar("studyai_deadline", default=None)
+
+
+class Deadline:
+    __slots__ = ("endpoint", "budget", "expires_at")
+
+    def __init__(self, endpoint, budget):
+        self.endpoint = endpoint
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+
+def route_endpoint(path):
+    """``(endpoint, is_batch)`` for ``/<endpoint>``, ``/<endpoint>/stream`` and ``/<endpoint>/batch``"""
+    parts = path.strip("/").split("/")
+    if len(parts) == 1 or (len(parts) == 2 and parts[1] in ("stream", "batch")):
+        return parts[0], parts[-1] == "batch"
+    return None, False
+
+
+def parse_budgets(text):
+    """``"chat=8,quiz=20"`` (seconds) on top of DEFAULT_BUDGETS"""
+    budgets = dict(DEFAULT_BUDGETS)
+    for part in (text or "").split(","):
+        name, _, seconds = part.partition("=")
+        if name.strip() and seconds.strip():
+            budgets[name.strip()] = float(seconds)
+    return budgets
+
+
+class DeadlinePolicy:
+    def __init__(self, budgets=None, maximum=120.0, reserve=0.25):
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.maximum = maximum
+        self.reserve = reserve
+
+    def budget(self, path, header=None):
+        """``(endpoint, seconds)`` for a request; seconds is None when it gets no deadline"""
+        endpoint, batch = route_endpoint(path)
+        if endpoint not in self.budgets:
+            return endpoint, None
+        try:
+            requested = float(header) / 1000 if header else 0
+        except ValueError:
+            requested = 0
+        if requested > 0:
+            return endpoint, min(requested, self.maximum)
+        return endpoint, None if batch else min(self.budgets[endpoint], self.maximum)
+
+    def start(self, path, header=None):
+        """Make the request's deadline current; returns ``(deadline, token)``, both None without one"""
+        endpoint, budget = self.budget(path, header)
+        if budget is None:
+            return None, None
+        deadline = Deadline(endpoint, budget)
+        return deadline, _current.set(deadline)
+
+    def time_left(self, deadline):
+        """Seconds provider work may still take (<= 0 once it must stop), None without a deadline"""
+        return None if deadline is None else deadline.remaining() - self.reserve
+
+
+def current():
+    return _current.get()
+
+
+def finish(token):
+    if token is not None:
+        _current.reset(token)
@@ -0,0 +1,44 @@
+"""Pre-fork multi-process serving: ``gunicorn -c gunicorn.conf.py``.
+
+The master imports the ASGI app once (RealStudyAI, question banks, intents,
+prompt templates) and then forks the workers, so that read-only data is
+shared copy-on-write instead of being loaded again by every worker. Each
+worker runs its own event loop; CPU-bound work therefore spreads over cores
+instead of being serialized by one process's GIL.
+
+Workers are replaced after AI_MAX_REQUESTS requests (with jitter, so they
+do not all restart at once) and get AI_GRACEFUL_TIMEOUT seconds to finish
+in-flight requests on shutdown or recycle.
+"""
+import gc
+import multiprocessing
+import os
+
+wsgi_app = "asgi:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# The preloaded app splits the provider rate limits across the workers
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+# Import the app in the master, before forking
+preload_app = True
+
+max_requests = int(os.getenv('AI_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('AI_MAX_REQUESTS_JITTER', max_requests // 10))
+graceful_timeout = int(os.getenv('AI_GRACEFUL_TIMEOUT', '30'))
+# Provider calls and streams can legitimately take a while
+timeout = int(os.getenv('AI_WORKER_TIMEOUT', '120'))
+keepalive = 5
+
+loglevel = os.getenv('LOG_LEVEL', 'info')
+accesslog = '-' if os.getenv('ACCESS_LOG', 'false').lower() == 'true' else None
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's reach: a collection
+    # in a worker would otherwise write to the GC headers of the shared
+    # objects and copy their pages into every worker
+    gc.collect()
+    gc.freeze()
+    server.log.info("Preloaded app; %d objects frozen for copy-on-write sharing", gc.get_freeze_count())
@@ -0,0 +1,189 @@
+"""Offline provider: a small Hugging Face model run on CPU with micro-batching.
+
+A forward/generate call on CPU costs nearly the same for a handful of
+prompts as for one, so LocalModel does not run prompts one by one. Callers
+put their prompt on a queue and wait on a future. A single worker thread
+takes the oldest prompt, waits up to ``max_wait`` for more to arrive (or
+until ``max_batch_size`` are queued), runs them as one padded ``generate``
+call and hands each caller its own answer. Under load the queue fills while
+a batch runs, so the next batch goes out at once with as many prompts as fit.
+
+The model (requirements-ml.txt) is loaded on first use, or by warmup().
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from startup import startup_timer
+
+
+def transformers_generator(model_name, threads=0, quantize=False, temperature=0.7, max_input_tokens=1024):
+    """Build ``generate(prompts, max_tokens) -> texts`` for a local CPU transformers model"""
+    torch = startup_timer.timed_import("torch")
+    transformers = startup_timer.timed_import("transformers")
+    if threads > 0:
+        torch.set_num_threads(threads)
+    with startup_timer.phase(f"load {model_name}"):
+        tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+        seq2seq = transformers.AutoConfig.from_pretrained(model_name).is_encoder_decoder
+        model_class = transformers.AutoModelForSeq2SeqLM if seq2seq else transformers.AutoModelForCausalLM
+        model = model_class.from_pretrained(model_name, torch_dtype=torch.float32).eval()
+        if quantize:
+            # int8 weights for the Linear layers, activations quantized on the fly
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if not seq2seq:
+        # Decoder-only models continue from the end of the prompt, so pad on the left
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+    chat_template = getattr(tokenizer, "chat_template", None)
+    sampling = {"do_sample": True, "temperature": temperature} if temperature > 0 else {"do_sample": False}
+
+    def format_prompt(prompt):
+        if not chat_template:
+            return prompt
+        return tokenizer.apply_chat_template([{"role": "user", "content": prompt}], tokenize=False,
+                                             add_generation_prompt=True)
+
+    def generate(prompts, max_tokens):
+        inputs = tokenizer([format_prompt(prompt) for prompt in prompts], return_tensors="pt", padding=True,
+                           truncation=True, max_length=max_input_tokens)
+        with torch.inference_mode():
+            output = model.generate(**inputs, max_new_tokens=max(max_tokens), pad_token_id=tokenizer.pad_token_id,
+                                    **sampling)
+        if not seq2seq:
+            output = output[:, inputs["input_ids"].shape[1]:]
+        # The batch ran to the largest limit; each caller gets only its own
+        return [tokenizer.decode(row[:limit], skip_special_tokens=True).strip()
+                for row, limit in zip(output, max_tokens)]
+
+    return generate
+
+
+class _Request:
+    __slots__ = ("prompt", "max_tokens", "future", "queued_at")
+
+    def __init__(self, prompt, max_tokens):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+
+class LocalModel:
+    def __init__(self, generator_factory, max_batch_size=8, max_wait=0.02, max_queue=256, max_new_tokens=256,
+                 timeout=60.0):
+        self.generator_factory = generator_factory
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.max_new_tokens = max_new_tokens
+        self.timeout = timeout
+        self.requests = 0
+        self.batches = 0
+        self.rejected = 0
+        self.errors = 0
+        self.batch_sizes = {}
+        self.busy_seconds = 0.0
+        self._generate = None
+        self._load_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Fresh queue and no worker; a forked process must not share the parent's thread"""
+        self._queue = deque()
+        self._ready = threading.Condition()
+        self._worker = None
+
+    def ensure_ready(self):
+        # The model is loaded on first use so it never slows down startup
+        if self._generate is not None:
+            return
+        with self._load_lock:
+            if self._generate is None:
+                self._generate = self.generator_factory()
+
+    def submit(self, prompt, max_tokens):
+        """Queue a prompt; returns a Future for the generated text"""
+        request = _Request(prompt, max(1, min(max_tokens, self.max_new_tokens)))
+        with self._ready:
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise RuntimeError(f"local model queue is full ({self.max_queue} prompts)")
+            self._queue.append(request)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="local-model", daemon=True)
+                self._worker.start()
+            self._ready.notify()
+        return request.future
+
+    def _timeout(self, timeout):
+        return self.timeout if timeout is None else max(min(self.timeout, timeout), 0)
+
+    def generate(self, prompt, max_tokens, timeout=None):
+        """Generated text, waiting at most ``timeout`` (capped at the model's own timeout)"""
+        future = self.submit(prompt, max_tokens)
+        try:
+            return future.result(self._timeout(timeout))
+        except BaseException:
+            # A timed-out prompt still queued is dropped instead of run for nobody
+            future.cancel()
+            raise
+
+    async def generate_async(self, prompt, max_tokens, timeout=None):
+        # Cancelling the wrapper cancels the queued request, so it is skipped
+        return await asyncio.wait_for(asyncio.wrap_future(self.submit(prompt, max_tokens)), self._timeout(timeout))
+
+    def _next_batch(self):
+        with self._ready:
+            while not self._queue:
+                self._ready.wait()
+            # Prompts that queued up while the last batch ran go out immediately
+            deadline = self._queue[0].queued_at + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch_size))]
+
+    def _run(self):
+        while True:
+            batch = [request for request in self._next_batch() if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                self.ensure_ready()
+                texts = self._generate([request.prompt for request in batch],
+                                       [request.max_tokens for request in batch])
+            except Exception as e:
+                self.errors += 1
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            self.busy_seconds += time.perf_counter() - started
+            self.requests += len(batch)
+            self.batches += 1
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+            for request, text in zip(batch, texts):
+                request.future.set_result(text)
+
+    def stats(self):
+        with self._ready:
+            waiting = len(self._queue)
+        return {
+            "loaded": self._generate is not None,
+            "waiting": waiting,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "busy_seconds": round(self.busy_seconds, 3),
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
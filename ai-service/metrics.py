@@ -0,0 +1,195 @@
+"""Prometheus metrics for the /metrics endpoint.
+
+Counters, up/down gauges and histograms are recorded into a per-thread shard,
+so the hot path is a thread-local dict update with no lock. A scrape sums the
+shards. Shards of threads that have exited (the Flask development server
+starts a thread per request) are folded into a single retired shard, which
+keeps memory bounded by the number of live threads.
+
+Values that already live elsewhere (cache hit/miss counters, breaker states)
+are read at scrape time through registered collectors.
+"""
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUESTS_TOTAL = "studyai_requests_total"
+REQUEST_DURATION = "studyai_request_duration_seconds"
+REQUESTS_IN_FLIGHT = "studyai_requests_in_flight"
+RESPONSE_SIZE = "studyai_response_size_bytes"
+PROVIDER_CALLS_TOTAL = "studyai_provider_calls_total"
+PROVIDER_DURATION = "studyai_provider_call_duration_seconds"
+AI_RESPONSES_TOTAL = "studyai_ai_responses_total"
+QUIZ_QUESTIONS_TOTAL = "studyai_quiz_questions_total"
+ADMISSION_WAIT = "studyai_admission_wait_seconds"
+PROMPT_SIZE = "studyai_prompt_chars"
+CONVERSATION_SIZE = "studyai_conversation_size_bytes"
+DEADLINE_REMAINING = "studyai_deadline_remaining_seconds"
+DEADLINE_EXCEEDED = "studyai_deadline_exceeded_total"
+
+# name -> (type, help, label names, histogram buckets)
+DEFINITIONS = {
+    REQUESTS_TOTAL: ("counter", "HTTP requests by route, method and status.", ("route", "method", "status"), None),
+    REQUEST_DURATION: ("histogram", "Time to produce the response headers.", ("route",), LATENCY_BUCKETS),
+    REQUESTS_IN_FLIGHT: ("gauge", "Requests currently being handled.", ("route",), None),
+    RESPONSE_SIZE: ("histogram", "Response body size (streamed bodies excluded).", ("route",), SIZE_BUCKETS),
+    PROVIDER_CALLS_TOTAL: ("counter", "Provider calls by outcome (success, error, rejected by the breaker).",
+                           ("provider", "outcome"), None),
+    PROVIDER_DURATION: ("histogram", "Provider call latency, including failed calls.", ("provider",),
+                        LATENCY_BUCKETS),
+    AI_RESPONSES_TOTAL: ("counter", "AI answers by endpoint and source (provider, cache or intelligent_fallback).",
+                         ("endpoint", "source"), None),
+    QUIZ_QUESTIONS_TOTAL: ("counter", "Quiz questions parsed from provider output, dropped as malformed or repeated, "
+                           "and served from the question bank.", ("outcome",), None),
+    ADMISSION_WAIT: ("histogram", "Time admitted provider calls waited for their rate limiter.", ("provider",),
+                     LATENCY_BUCKETS),
+    PROMPT_SIZE: ("histogram", "Characters in each provider prompt, by endpoint.", ("endpoint",), SIZE_BUCKETS),
+    CONVERSATION_SIZE: ("histogram", "Estimated memory of a conversation after each recorded turn.", (),
+                        SIZE_BUCKETS),
+    DEADLINE_REMAINING: ("histogram", "Budget left when a request with a deadline finished (0 if it was late).",
+                         ("endpoint",), LATENCY_BUCKETS),
+    DEADLINE_EXCEEDED: ("counter", "Work cut short by a request deadline, by stage (admission, coalesce, provider, "
+                        "skipped, stream, request).", ("endpoint", "stage"), None),
+}
+
+
+class _Shard:
+    def __init__(self, thread=None):
+        self.thread = thread
+        # (name, labels) -> float for counters/gauges, [bucket counts..., +Inf, sum] for histograms
+        self.values = {}
+
+    def merge(self, other):
+        for key, value in other.values.items():
+            if isinstance(value, list):
+                mine = self.values.setdefault(key, [0] * len(value))
+                for i, v in enumerate(value):
+                    mine[i] += v
+            else:
+                self.values[key] = self.values.get(key, 0) + value
+
+
+def _snapshot_of(shard):
+    copy = _Shard()
+    # list() of a dict's items is atomic under the GIL; histogram lists are copied too
+    copy.values = {key: list(value) if isinstance(value, list) else value for key, value in list(shard.values.items())}
+    return copy
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    def __init__(self, definitions=DEFINITIONS):
+        self.definitions = definitions
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._registrations = 0
+
+    def _values(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+                self._registrations += 1
+                if self._registrations % 64 == 0:
+                    self._retire_dead()
+            self._local.values = shard.values
+            return shard.values
+
+    def _retire_dead(self):
+        # Callers hold the lock; a dead thread can no longer write to its shard
+        live = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                live.append(shard)
+            else:
+                self._retired.merge(shard)
+        self._shards = live
+
+    def inc(self, name, labels=(), value=1):
+        """Add to a counter, or move an up/down gauge by ``value``"""
+        values = self._values()
+        key = (name, labels)
+        values[key] = values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        values = self._values()
+        key = (name, labels)
+        buckets = self.definitions[name][3]
+        counts = values.get(key)
+        if counts is None:
+            counts = values[key] = [0] * (len(buckets) + 2)
+        # Per-bucket (non-cumulative) counts; +Inf is the slot after the last bound
+        counts[bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+    def register_collector(self, collect):
+        """``collect()`` returns ``[(name, type, help, [(labels dict, value), ...]), ...]`` at scrape time"""
+        self._collectors.append(collect)
+
+    def snapshot(self):
+        """Sum of all shards as one ``{(name, labels): value}`` dict"""
+        with self._lock:
+            self._retire_dead()
+            total = _Shard()
+            total.merge(self._retired)
+            for shard in self._shards:
+                # Copy first: the owning thread may add keys meanwhile
+                total.merge(_snapshot_of(shard))
+        return total.values
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        by_name = {}
+        for (name, labels), value in sorted(self.snapshot().items(), key=lambda item: item[0]):
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, help_text, label_names, buckets) in self.definitions.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in by_name.get(name, ()):
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(label_names, labels)} {_format_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    le = f'le="{_format_number(bound)}"'
+                    lines.append(f"{name}_bucket{_format_labels(label_names, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(label_names, labels)} {_format_number(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(label_names, labels)} {cumulative}")
+        for collect in self._collectors:
+            for name, kind, help_text, samples in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics = Metrics()
@@ -0,0 +1,239 @@
+"""Study-plan allocation for /study-plan/allocate and the template study plan.
+
+A plan request describes subjects and the time available to study them:
+
+    {"subjects": [{"name": "Calculus", "weight": 3, "examDate": "2024-06-10",
+                   "minSession": 30, "maxSession": 90}, ...],
+     "startDate": "2024-05-06", "weeks": 4,
+     "availability": [2, 2, 1.5, 2, 1, 4, 0],
+     "dateAvailability": {"2024-05-18": 0}}
+
+``subjects`` may also be a comma-separated string (equal weights, no exams).
+``availability`` is hours per weekday, Monday first, or an object keyed by
+weekday name; without it ``timeAvailable`` hours per week are spread over the
+week. ``dateAvailability`` overrides single dates. A subject is studied up to
+the day before its exam. Session lengths are in minutes and default to
+``minSession``/``maxSession`` at the top level, then 30 and 90.
+
+Allocation runs in two steps:
+
+1. Targets. Every subject gets minutes in proportion to its weight, subject to
+   two limits: subjects whose exams fall on or before a date cannot together
+   use more than the capacity before that date, and no subject can use more
+   than ``maxSession`` minutes on each day before its exam. The largest
+   proportional share that meets both is found by water-filling: raise all
+   shares together until a limit binds, fix the subjects behind it, repeat.
+2. Sessions. Days are filled in date order. Each day the subjects with the
+   most target left per minute of capacity left before their exam go first,
+   one session each of ``minSession`` to ``maxSession`` minutes. When only a
+   few subjects are left on a day, the per-day limit can leave time no
+   subject may use, so ``scheduledMinutes`` can fall short of the target.
+
+Times are whole multiples of SLOT_MINUTES. The cost is a sort of the active
+subjects per day, so multi-week plans for dozens of subjects take a few
+milliseconds.
+"""
+import os
+from datetime import date, datetime, timedelta, timezone
+
+AI_PLAN_MAX_SUBJECTS = int(os.getenv('AI_PLAN_MAX_SUBJECTS', '200'))
+AI_PLAN_MAX_WEEKS = int(os.getenv('AI_PLAN_MAX_WEEKS', '52'))
+
+SLOT_MINUTES = 15
+DEFAULT_MIN_SESSION = 30
+DEFAULT_MAX_SESSION = 90
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+class PlanError(ValueError):
+    pass
+
+
+def _number(value, name, minimum=0):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise PlanError(f"'{name}' must be a number.")
+    if not number >= minimum:
+        raise PlanError(f"'{name}' must be at least {minimum}.")
+    return number
+
+
+def _date(value, name):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        raise PlanError(f"'{name}' must be an ISO-8601 date.")
+
+
+def _slots(minutes):
+    return int(minutes // SLOT_MINUTES)
+
+
+def _weekly_hours(data):
+    """Hours per weekday, Monday first"""
+    availability = data.get('availability')
+    if availability is None:
+        total = _slots(_number(data.get('timeAvailable', 10), 'timeAvailable') * 60)
+        return [(total // 7 + (day < total % 7)) * SLOT_MINUTES / 60 for day in range(7)]
+    if isinstance(availability, dict):
+        hours = [0] * 7
+        for key, value in availability.items():
+            matches = [i for i, day in enumerate(WEEKDAYS) if day.startswith(str(key).lower()[:3])]
+            if not matches:
+                raise PlanError(f"Unknown weekday '{key}' in 'availability'.")
+            hours[matches[0]] = _number(value, 'availability')
+        return hours
+    if isinstance(availability, list) and len(availability) == 7:
+        return [_number(value, 'availability') for value in availability]
+    raise PlanError("'availability' must be 7 numbers (Monday first) or an object keyed by weekday.")
+
+
+def _subjects(data):
+    subjects = data.get('subjects')
+    if isinstance(subjects, str):
+        subjects = [s.strip() for s in subjects.split(',') if s.strip()]
+    if not isinstance(subjects, list) or not subjects:
+        raise PlanError("'subjects' must be a non-empty array or a comma-separated string.")
+    if len(subjects) > AI_PLAN_MAX_SUBJECTS:
+        raise PlanError(f"Plans are limited to {AI_PLAN_MAX_SUBJECTS} subjects.")
+
+    default_min = _number(data.get('minSession', DEFAULT_MIN_SESSION), 'minSession', SLOT_MINUTES)
+    default_max = _number(data.get('maxSession', DEFAULT_MAX_SESSION), 'maxSession', SLOT_MINUTES)
+    parsed = []
+    for subject in subjects:
+        if isinstance(subject, str):
+            subject = {"name": subject}
+        if not isinstance(subject, dict) or not str(subject.get('name') or '').strip():
+            raise PlanError("Each subject must be a name or an object with a 'name'.")
+        min_session = _slots(_number(subject.get('minSession', default_min), 'minSession', SLOT_MINUTES))
+        max_session = _slots(_number(subject.get('maxSession', default_max), 'maxSession', SLOT_MINUTES))
+        if min_session > max_session:
+            raise PlanError(f"'minSession' is longer than 'maxSession' for {subject['name']}.")
+        weight = _number(subject.get('weight', 1), 'weight')
+        exam = subject.get('examDate')
+        parsed.append({
+            "name": str(subject['name']).strip(),
+            "weight": weight,
+            "exam": _date(exam, 'examDate') if exam else None,
+            "min": min_session,
+            "max": max_session,
+        })
+    return parsed
+
+
+def _targets(subjects, capacity_before):
+    """Water-filling: slots per subject, proportional to weight within the deadline and per-day limits"""
+    targets = [0.0] * len(subjects)
+    open_ = [i for i, s in enumerate(subjects) if s["weight"] > 0 and s["deadline"] > 0]
+    # Deadlines in ascending order; a deadline's budget is shared by every subject due by then
+    deadlines = sorted({subjects[i]["deadline"] for i in open_})
+    budget = {d: float(capacity_before[d]) for d in deadlines}
+
+    while open_:
+        weight_by = {d: 0.0 for d in deadlines}
+        for i in open_:
+            weight_by[subjects[i]["deadline"]] += subjects[i]["weight"]
+        level, binding = float('inf'), None
+        due_weight = 0.0
+        for d in deadlines:
+            due_weight += weight_by[d]
+            if due_weight and budget[d] / due_weight < level:
+                level, binding = budget[d] / due_weight, ("deadline", d)
+        for i in open_:
+            cap = subjects[i]["cap"] / subjects[i]["weight"]
+            if cap < level:
+                level, binding = cap, ("subject", i)
+
+        if binding[0] == "deadline":
+            fixed = [i for i in open_ if subjects[i]["deadline"] <= binding[1]]
+        else:
+            fixed = [binding[1]]
+        for i in fixed:
+            targets[i] = level * subjects[i]["weight"]
+            for d in deadlines:
+                if d >= subjects[i]["deadline"]:
+                    budget[d] -= targets[i]
+        fixed = set(fixed)
+        open_ = [i for i in open_ if i not in fixed]
+    return [int(target + 1e-9) for target in targets]
+
+
+def allocate(data):
+    """Daily sessions and per-subject totals for a plan request"""
+    if not isinstance(data, dict):
+        raise PlanError("Plan body must be a JSON object.")
+    subjects = _subjects(data)
+    weekly_hours = _weekly_hours(data)
+    start = _date(data['startDate'], 'startDate') if data.get('startDate') else datetime.now(timezone.utc).date()
+
+    exams = [s["exam"] for s in subjects if s["exam"]]
+    if data.get('weeks') is not None:
+        weeks = int(_number(data['weeks'], 'weeks', 1))
+    elif exams:
+        weeks = max(1, -(-(max(exams) - start).days // 7))
+    else:
+        weeks = 1
+    if weeks > AI_PLAN_MAX_WEEKS:
+        raise PlanError(f"Plans are limited to {AI_PLAN_MAX_WEEKS} weeks.")
+    horizon = weeks * 7
+
+    overrides = {}
+    for key, value in (data.get('dateAvailability') or {}).items():
+        overrides[_date(key, 'dateAvailability')] = _number(value, 'dateAvailability')
+    dates = [start + timedelta(days=day) for day in range(horizon)]
+    capacity = [_slots(overrides.get(day, weekly_hours[day.weekday()]) * 60) for day in dates]
+    # capacity_before[d]: slots on days 0..d-1
+    capacity_before = [0]
+    for slots in capacity:
+        capacity_before.append(capacity_before[-1] + slots)
+
+    for s in subjects:
+        s["deadline"] = min(horizon, (s["exam"] - start).days) if s["exam"] else horizon
+        s["cap"] = sum(min(slots, s["max"]) for slots in capacity[:max(0, s["deadline"])])
+    targets = _targets(subjects, capacity_before)
+    remaining = list(targets)
+    scheduled = [0] * len(subjects)
+
+    days = []
+    for day, (today, slots) in enumerate(zip(dates, capacity)):
+        left = slots
+        active = [i for i, s in enumerate(subjects) if remaining[i] > 0 and day < s["deadline"]]
+        # Most target left per slot of capacity left before the exam goes first
+        active.sort(key=lambda i: -remaining[i] / max(1, capacity_before[subjects[i]["deadline"]] - capacity_before[day]))
+        sessions = []
+        for i in active:
+            s = subjects[i]
+            if left < s["min"]:
+                continue
+            # A final remainder shorter than a session is rounded up to one
+            length = max(s["min"], min(s["max"], remaining[i], left))
+            remaining[i] = max(0, remaining[i] - length)
+            scheduled[i] += length
+            left -= length
+            sessions.append({"subject": s["name"], "minutes": length * SLOT_MINUTES})
+        days.append({
+            "date": today.isoformat(),
+            "weekday": WEEKDAYS[today.weekday()].capitalize(),
+            "capacityMinutes": slots * SLOT_MINUTES,
+            "sessions": sessions,
+        })
+
+    total_capacity = capacity_before[-1] * SLOT_MINUTES
+    total_scheduled = sum(scheduled) * SLOT_MINUTES
+    return {
+        "startDate": start.isoformat(),
+        "weeks": weeks,
+        "days": days,
+        "subjects": [{
+            "name": s["name"],
+            "weight": s["weight"],
+            "examDate": s["exam"].isoformat() if s["exam"] else None,
+            "targetMinutes": target * SLOT_MINUTES,
+            "scheduledMinutes": minutes * SLOT_MINUTES,
+            "minutesPerWeek": round(minutes * SLOT_MINUTES / max(1, -(-s["deadline"] // 7)), 1),
+        } for s, target, minutes in zip(subjects, targets, scheduled)],
+        "capacityMinutes": total_capacity,
+        "scheduledMinutes": total_scheduled,
+        "unusedMinutes": max(0, total_capacity - total_scheduled),
+    }
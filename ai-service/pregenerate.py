@@ -0,0 +1,85 @@
+"""Fill the warm quiz pool ahead of time.
+
+    python pregenerate.py [--path quizzes.db] [--limit 100] [--concurrency 4]
+
+Picks the (topic, difficulty, question count) keys /quiz has been asked for
+most, then the question-bank subjects at the configured difficulties and
+counts, and generates quizzes for every key that has fewer than ``--depth``
+of them or whose quizzes are older than ``--max-age`` hours. Run it from
+cron (or a loop) against the same AI_QUIZ_POOL_PATH the servers use; they
+pick up the new quizzes within AI_QUIZ_POOL_RELOAD seconds.
+
+Quizzes are generated live with the normal provider settings, so
+AI_PROVIDERS_ENABLED and the API keys must be set. Answers that came only
+from the question bank are not stored: /quiz produces those cheaply anyway.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Every quiz for a key must be a separate provider answer, not a cached or
+# coalesced copy of the first one
+os.environ['AI_COALESCE'] = 'false'
+os.environ['AI_CACHE_DISABLED_ENDPOINTS'] = ','.join(
+    filter(None, [os.getenv('AI_CACHE_DISABLED_ENDPOINTS', ''), 'quiz']))
+
+from app import question_bank, study_ai  # noqa: E402
+from quiz_pool import QuizPool  # noqa: E402
+
+
+def fill(pool, key):
+    """Generate up to ``pool.depth`` distinct quizzes for a key and store them; returns how many"""
+    topic, difficulty, question_count = key
+    quizzes = []
+    seen = set()
+    for _ in range(pool.depth):
+        quiz = study_ai.generate_quiz_live(topic, difficulty, question_count)
+        if quiz["source"] == "intelligent_fallback":
+            continue
+        questions = quiz["quiz"]["questions"]
+        signature = tuple(q["question"].lower() for q in questions)
+        if signature not in seen:
+            seen.add(signature)
+            quizzes.append({"questions": questions, "source": quiz["source"]})
+    if quizzes:
+        pool.put(topic, difficulty, question_count, quizzes)
+    return len(quizzes)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=os.getenv('AI_QUIZ_POOL_PATH'), help="pool file (default AI_QUIZ_POOL_PATH)")
+    parser.add_argument("--depth", type=int, default=int(os.getenv('AI_QUIZ_POOL_DEPTH', '3')),
+                        help="quizzes kept per key")
+    parser.add_argument("--limit", type=int, default=100, help="most keys to generate in this run")
+    parser.add_argument("--concurrency", type=int, default=4, help="keys generated in parallel")
+    parser.add_argument("--difficulties", default="easy,medium,hard")
+    parser.add_argument("--counts", default="5,10")
+    parser.add_argument("--max-age", type=float, default=24, help="hours before a key is regenerated")
+    parser.add_argument("--decay", type=float, default=0.5,
+                        help="factor applied to request counts after the run, so old popularity fades")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("--path or AI_QUIZ_POOL_PATH is required")
+
+    pool = QuizPool(args.path, depth=args.depth)
+    seeds = [(subject, difficulty, int(count)) for subject in question_bank.subjects() if subject != "general"
+             for difficulty in args.difficulties.split(',') for count in args.counts.split(',')]
+    keys = pool.plan(seeds, limit=args.limit, max_age=args.max_age * 3600)
+    print(f"Generating {len(keys)} key(s), {args.depth} quizzes each, {args.concurrency} at a time")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        stored = list(executor.map(lambda key: fill(pool, key), keys))
+    for key, count in zip(keys, stored):
+        print(f"  {count}/{args.depth}  {key[0]!r} {key[1]} x{key[2]}")
+    pool.decay(args.decay)
+
+    filled = sum(1 for count in stored if count)
+    print(f"Stored {sum(stored)} quizzes for {filled}/{len(keys)} key(s) in {time.perf_counter() - started:.1f}s; "
+          f"pool now holds {pool.stats()['quizzes']} quizzes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Preloaded, indexed quiz question bank.
+
+Questions are loaded once from data/questions.json plus any extra JSON/JSONL
+files listed in AI_QUESTION_BANK_PATHS. Each question is stored as an
+immutable tuple and indexed by subject, (subject, difficulty) and
+(subject, topic) as compact integer arrays, so a quiz request samples k
+indices in O(k) instead of rebuilding and copying a whole subject list.
+
+Record format (one object per JSONL line, or a JSON list / {"questions": [...]}):
+
+    {"subject": "physics", "topic": "optics", "difficulty": "easy",
+     "question": "...", "options": ["A", "B", "C", "D"], "correct": 0,
+     "explanation": "..."}
+
+``topic`` and ``difficulty`` are optional.
+"""
+import json
+import os
+import random
+import sys
+from array import array
+from collections import namedtuple
+
+DEFAULT_BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'questions.json')
+
+ANY_DIFFICULTY = "any"
+
+
+class Question(namedtuple("Question", "subject topic difficulty question options correct explanation")):
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            "question": self.question,
+            "options": list(self.options),
+            "correct": self.correct,
+            "explanation": self.explanation,
+        }
+
+
+def read_records(path):
+    """Yield question records from a .json or .jsonl file"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            yield from data["questions"] if isinstance(data, dict) else data
+
+
+class QuestionBank:
+    def __init__(self):
+        self.questions = []
+        self._index = {}
+
+    def add(self, record):
+        subject = sys.intern(record["subject"].lower())
+        topic = sys.intern(record.get("topic", "").lower())
+        difficulty = sys.intern(record.get("difficulty", ANY_DIFFICULTY).lower())
+        question = Question(subject, topic, difficulty, record["question"], tuple(record["options"]),
+                            int(record["correct"]), record.get("explanation", ""))
+
+        position = len(self.questions)
+        self.questions.append(question)
+        for key in (subject, (subject, difficulty), (subject, topic) if topic else None):
+            if key is not None:
+                self._index.setdefault(key, array('I')).append(position)
+
+    def load(self, path):
+        count = 0
+        for record in read_records(path):
+            self.add(record)
+            count += 1
+        return count
+
+    def subjects(self):
+        return sorted(key for key in self._index if isinstance(key, str))
+
+    def size(self, subject):
+        return len(self._index.get(subject, ()))
+
+    def pool(self, subject, k, difficulty=None, topic=None):
+        """Most specific index for the request that can supply k questions"""
+        for key in ((subject, topic) if topic else None,
+                    (subject, difficulty) if difficulty else None):
+            positions = self._index.get(key) if key is not None else None
+            if positions and len(positions) >= k:
+                return positions
+        return self._index.get(subject, array('I'))
+
+    def sample(self, subject, k, difficulty=None, topic=None):
+        """Up to k distinct questions for the subject, without replacement"""
+        positions = self.pool(subject, k, difficulty and difficulty.lower(), topic and topic.lower())
+        k = max(0, min(k, len(positions)))
+        # random.sample over a range picks k indices in O(k) regardless of bank size
+        return [self.questions[positions[i]] for i in random.sample(range(len(positions)), k)]
+
+
+def load_question_bank(extra_paths=()):
+    bank = QuestionBank()
+    bank.load(DEFAULT_BANK_PATH)
+    for path in extra_paths:
+        count = bank.load(path)
+        print(f"📚 Loaded {count} questions from {path}")
+    return bank
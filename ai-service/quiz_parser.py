@@ -0,0 +1,153 @@
+"""Incremental, tolerant parsing of provider quiz output.
+
+Models are asked for ``{"questions": [{question, options, correct,
+explanation}, ...]}`` but often wrap it in markdown fences, add a sentence
+before or after, or stop mid-way at the token limit. Instead of
+``json.loads`` on the whole answer, QuizParser is fed the text as it arrives
+and returns each question object as soon as its closing brace is seen. Text
+outside braces is ignored, so fences and prose cost nothing, and a truncated
+answer still yields every question completed before the cut.
+
+Each object is checked with validate_question; malformed ones are counted in
+``dropped`` and skipped rather than failing the whole quiz.
+"""
+import json
+import re
+
+MIN_OPTIONS = 2
+MAX_OPTIONS = 6
+LETTERS = "ABCDEF"
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    # Trailing commas are the most common near-miss in model JSON
+    try:
+        return json.loads(_TRAILING_COMMA.sub(r"\1", text))
+    except ValueError:
+        return None
+
+
+def _correct_index(value, options):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        value = value.strip()
+        if value.isdigit():
+            return int(value)
+        # "B", "B)" or "B. ..." style answers
+        if value[:1].upper() in LETTERS and (len(value) == 1 or not value[1].isalnum()):
+            return LETTERS.index(value[0].upper())
+        for i, option in enumerate(options):
+            if option.strip().lower() == value.lower():
+                return i
+    return None
+
+
+def validate_question(data):
+    """A clean ``{question, options, correct, explanation}`` dict, or None if the object is unusable"""
+    if not isinstance(data, dict):
+        return None
+    question = data.get('question')
+    options = data.get('options')
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or not MIN_OPTIONS <= len(options) <= MAX_OPTIONS:
+        return None
+    if not all(isinstance(option, str) and option.strip() for option in options):
+        return None
+    options = [option.strip() for option in options]
+    if len({option.lower() for option in options}) != len(options):
+        return None
+    correct = _correct_index(data.get('correct', data.get('answer')), options)
+    if correct is None or not 0 <= correct < len(options):
+        return None
+    explanation = data.get('explanation')
+    return {
+        "question": question.strip(),
+        "options": options,
+        "correct": correct,
+        "explanation": explanation.strip() if isinstance(explanation, str) else "",
+    }
+
+
+class QuizParser:
+    def __init__(self):
+        self.parsed = 0
+        self.dropped = 0
+        self._buffer = ""
+        self._scanned = 0
+        # Start offsets of the objects currently open, and whether each one
+        # already contained a question (so wrappers are not parsed again)
+        self._open = []
+        self._in_string = False
+        self._escaped = False
+        self._seen = set()
+
+    def feed(self, text):
+        """Add a chunk of output; returns the questions completed by it"""
+        self._buffer += text
+        found = []
+        buffer = self._buffer
+        for position in range(self._scanned, len(buffer)):
+            char = buffer[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                # Quotes only delimit strings inside an object; prose outside is skipped
+                self._in_string = bool(self._open)
+            elif char == '{':
+                self._open.append([position, False])
+            elif char == '}' and self._open:
+                start, has_child = self._open.pop()
+                if has_child:
+                    continue
+                question = self._question(buffer[start:position + 1])
+                if question is not None and self._open:
+                    self._open[-1][1] = True
+                if question:
+                    found.append(question)
+        # Keep only the text of objects still open
+        keep = self._open[0][0] if self._open else len(buffer)
+        for entry in self._open:
+            entry[0] -= keep
+        self._buffer = buffer[keep:]
+        self._scanned = len(self._buffer)
+        return found
+
+    def _question(self, text):
+        """None if the object is not a question; False if it is one but invalid or a repeat"""
+        if '"question"' not in text:
+            return None
+        data = _loads(text)
+        if isinstance(data, dict) and 'question' not in data:
+            return None
+        question = validate_question(data)
+        key = question and question["question"].lower()
+        if question is None or key in self._seen:
+            self.dropped += 1
+            return False
+        self._seen.add(key)
+        self.parsed += 1
+        return question
+
+
+def parse_quiz(text):
+    """Every valid question in a complete answer, and the number dropped"""
+    parser = QuizParser()
+    questions = parser.feed(text or "")
+    return questions, parser.dropped
@@ -0,0 +1,200 @@
+"""Warm pool of pre-generated quizzes for /quiz.
+
+Quizzes are generated ahead of time by ``python pregenerate.py`` and stored in
+a SQLite file (AI_QUIZ_POOL_PATH) per (topic, difficulty, question count),
+up to ``depth`` quizzes per key. The server keeps the whole pool in memory:
+a request is one dict lookup, rotating through the key's quizzes, and only
+a miss goes to live generation.
+
+The server also counts requests per key and writes the counts to the same
+file. The pre-generation job uses them to decide which topics to fill and
+refresh first. The in-memory copy is reloaded when another process (the job)
+has committed changes, checked at most every ``reload_interval`` seconds.
+
+Requests only touch memory. The demand write and the reload run on a
+background thread, so a request never waits on the file while the job is
+writing it. The file is opened in WAL mode with a busy timeout, and a
+database error on that path skips the sync (demand counts are kept for the
+next one) rather than failing requests.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def pool_key(topic, difficulty, question_count):
+    return (_WHITESPACE.sub(" ", str(topic)).strip().lower(), str(difficulty).strip().lower(), int(question_count))
+
+
+class QuizPool:
+    def __init__(self, path, depth=3, reload_interval=5.0, busy_timeout=5.0):
+        self.path = path
+        self.depth = depth
+        self.reload_interval = reload_interval
+        self.busy_timeout = busy_timeout
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._quizzes = {}
+        self._turn = {}
+        self._demand = {}
+        self._data_version = None
+        self._checked_at = 0.0
+        self._syncing = None
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._connect()
+        self._sync()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        # WAL lets the server read while the pre-generation job writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS quizzes (topic TEXT NOT NULL, difficulty TEXT NOT NULL,"
+            " question_count INTEGER NOT NULL, slot INTEGER NOT NULL, payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL, PRIMARY KEY (topic, difficulty, question_count, slot));"
+            "CREATE TABLE IF NOT EXISTS demand (topic TEXT NOT NULL, difficulty TEXT NOT NULL,"
+            " question_count INTEGER NOT NULL, requests REAL NOT NULL, last_requested REAL NOT NULL,"
+            " PRIMARY KEY (topic, difficulty, question_count));"
+        )
+
+    def reopen(self):
+        """Open a fresh SQLite connection; a connection must not be used across fork()"""
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._syncing = None
+        self._connect()
+
+    def _sync(self):
+        """Write pending demand counts and reload the quizzes if the file changed; callers hold neither lock"""
+        with self._lock:
+            demand, self._demand = self._demand, {}
+        quizzes = version = None
+        with self._db_lock:
+            try:
+                if demand:
+                    now = time.time()
+                    self._db.executemany(
+                        "INSERT INTO demand VALUES (?, ?, ?, ?, ?) ON CONFLICT (topic, difficulty, question_count) "
+                        "DO UPDATE SET requests = requests + excluded.requests, "
+                        "last_requested = excluded.last_requested",
+                        [(*key, count, now) for key, count in demand.items()],
+                    )
+                    self._db.commit()
+                    demand = {}
+                # data_version only changes when another connection commits
+                version = self._db.execute("PRAGMA data_version").fetchone()[0]
+                if version != self._data_version:
+                    quizzes = {}
+                    for topic, difficulty, count, payload in self._db.execute(
+                            "SELECT topic, difficulty, question_count, payload FROM quizzes ORDER BY slot"):
+                        quizzes.setdefault((topic, difficulty, count), []).append(json.loads(payload))
+                failed = False
+            except sqlite3.Error as e:
+                self._db.rollback()
+                print(f"Quiz pool sync failed: {e}")
+                failed = True
+            with self._lock:
+                self._checked_at = time.monotonic()
+                if failed:
+                    self.errors += 1
+                    # Unwritten counts go out with the next sync
+                    for key, count in demand.items():
+                        self._demand[key] = self._demand.get(key, 0) + count
+                elif quizzes is not None:
+                    self._quizzes = quizzes
+                    self._data_version = version
+
+    def _sync_in_background(self):
+        try:
+            self._sync()
+        finally:
+            with self._lock:
+                self._syncing = None
+
+    def get(self, topic, difficulty, question_count):
+        """A stored quiz ``{"questions": [...], "source": ...}`` for the request, or None"""
+        key = pool_key(topic, difficulty, question_count)
+        with self._lock:
+            if self._syncing is None and time.monotonic() - self._checked_at >= self.reload_interval:
+                self._syncing = threading.Thread(target=self._sync_in_background, name="quiz-pool-sync",
+                                                 daemon=True)
+                self._syncing.start()
+            self._demand[key] = self._demand.get(key, 0) + 1
+            quizzes = self._quizzes.get(key)
+            if not quizzes:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # Rotate so consecutive users of a popular topic get different quizzes
+            turn = self._turn.get(key, 0)
+            self._turn[key] = turn + 1
+            return quizzes[turn % len(quizzes)]
+
+    def put(self, topic, difficulty, question_count, quizzes):
+        """Replace the stored quizzes for a key (at most ``depth`` of them)"""
+        key = pool_key(topic, difficulty, question_count)
+        now = time.time()
+        with self._db_lock:
+            self._db.execute("DELETE FROM quizzes WHERE topic = ? AND difficulty = ? AND question_count = ?", key)
+            self._db.executemany(
+                "INSERT INTO quizzes VALUES (?, ?, ?, ?, ?, ?)",
+                [(*key, slot, json.dumps(quiz), now) for slot, quiz in enumerate(quizzes[:self.depth])],
+            )
+            self._db.commit()
+            with self._lock:
+                self._quizzes[key] = list(quizzes[:self.depth])
+
+    def plan(self, seeds=(), limit=100, max_age=86400.0):
+        """Keys to (re)generate, most requested first, then ``seeds``.
+
+        A key needs work when it has fewer than ``depth`` quizzes or its
+        quizzes are older than ``max_age`` seconds.
+        """
+        now = time.time()
+        self._sync()
+        with self._db_lock:
+            stored = {
+                (topic, difficulty, count): (slots, oldest)
+                for topic, difficulty, count, slots, oldest in self._db.execute(
+                    "SELECT topic, difficulty, question_count, COUNT(*), MIN(created_at) FROM quizzes "
+                    "GROUP BY topic, difficulty, question_count")
+            }
+            demanded = [tuple(row) for row in self._db.execute(
+                "SELECT topic, difficulty, question_count FROM demand ORDER BY requests DESC, last_requested DESC")]
+
+        keys = []
+        for key in demanded + [pool_key(*seed) for seed in seeds]:
+            slots, oldest = stored.get(key, (0, now))
+            if key not in keys and (slots < self.depth or now - oldest > max_age):
+                keys.append(key)
+                if len(keys) >= limit:
+                    break
+        return keys
+
+    def decay(self, factor):
+        """Scale every demand count so old popularity fades; counts that reach ~0 are dropped"""
+        self._sync()
+        with self._db_lock:
+            self._db.execute("UPDATE demand SET requests = requests * ?", (factor,))
+            self._db.execute("DELETE FROM demand WHERE requests < 0.5")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "errors": self.errors,
+                "entries": len(self._quizzes),
+                "quizzes": sum(len(quizzes) for quizzes in self._quizzes.values()),
+                "depth": self.depth,
+                "path": self.path,
+            }
@@ -0,0 +1,195 @@
+"""Provider resilience helpers: circuit breakers, hedged provider races and call timeouts."""
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+
+class CircuitBreaker:
+    """Skip a provider after repeated failures until a cooldown has passed.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow()`` returns False. Once ``cooldown`` seconds have elapsed a single
+    trial call is let through (half-open); its outcome closes or re-opens the
+    breaker.
+    """
+
+    def __init__(self, name, failure_threshold=5, cooldown=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def release(self):
+        """Give back a half-open trial that ended without an outcome (e.g. a cancelled hedge)"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+# Shared pool for hedged provider calls in the sync (Flask) path
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=32):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="provider")
+        return _executor
+
+
+def call_with_timeout(fn, timeout):
+    """``fn()``, raising TimeoutError if it has not returned after ``timeout`` seconds.
+
+    For blocking SDK calls that take no timeout of their own. ``fn`` runs on
+    a daemon thread of its own rather than the shared executor, which the
+    caller may itself be running on. A call that times out is abandoned, not
+    stopped, because threads cannot be interrupted.
+    """
+    if timeout is None:
+        return fn()
+    future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="provider-call", daemon=True).start()
+    return future.result(max(timeout, 0))
+
+
+def _wait_time(hedge_delay, hedging, give_up):
+    """How long a race waits for a result before hedging or giving up (None = no limit)"""
+    wait_for = hedge_delay if hedging else None
+    if give_up is not None:
+        left = max(give_up - time.monotonic(), 0)
+        wait_for = left if wait_for is None else min(wait_for, left)
+    return wait_for
+
+
+def hedged_race(calls, hedge_delay, timeout=None):
+    """Race provider calls, returning ``(result, name)`` of the first good answer.
+
+    ``calls`` is an ordered list of ``(name, fn)``. The first call starts
+    immediately; each following call starts once ``hedge_delay`` seconds pass
+    without a good answer, or as soon as an earlier call fails. A delay of 0
+    starts every call at once. Calls still queued when a winner is found are
+    cancelled; calls already running finish in the background because threads
+    cannot be interrupted. Returns ``(None, None)`` if every call fails, or
+    if there is no good answer within ``timeout`` seconds.
+    """
+    executor = get_executor()
+    give_up = None if timeout is None else time.monotonic() + timeout
+    remaining = list(calls)
+    pending = {}
+
+    def launch():
+        name, fn = remaining.pop(0)
+        pending[executor.submit(fn)] = name
+
+    if not remaining:
+        return None, None
+    launch()
+    while hedge_delay <= 0 and remaining:
+        launch()
+
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=_wait_time(hedge_delay, remaining, give_up),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None
+                if result:
+                    return result, name
+            if give_up is not None and time.monotonic() >= give_up:
+                return None, None
+            if remaining:
+                launch()
+        return None, None
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def hedged_race_async(calls, hedge_delay, timeout=None):
+    """Async variant of hedged_race; ``calls`` holds ``(name, coroutine_fn)``.
+
+    Losing calls, and every call still running after ``timeout``, are
+    cancelled, which aborts their in-flight HTTP requests.
+    """
+    give_up = None if timeout is None else time.monotonic() + timeout
+    remaining = list(calls)
+    pending = {}
+
+    def launch():
+        name, fn = remaining.pop(0)
+        pending[asyncio.ensure_future(fn())] = name
+
+    if not remaining:
+        return None, None
+    launch()
+    while hedge_delay <= 0 and remaining:
+        launch()
+
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=_wait_time(hedge_delay, remaining, give_up),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception:
+                    result = None
+                if result:
+                    return result, name
+            if give_up is not None and time.monotonic() >= give_up:
+                return None, None
+            if remaining:
+                launch()
+        return None, None
+    finally:
+        for task in pending:
+            task.cancel()
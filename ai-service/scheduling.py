@@ -0,0 +1,202 @@
+"""Vectorized SM-2 spaced-repetition scheduling for /schedule/batch.
+
+Each item carries its current state and the reviews since that state was
+computed:
+
+    {"id": "...", "easeFactor": 2.5, "intervalDays": 6, "repetitions": 2,
+     "lastReview": "2024-05-01T09:00:00.000Z",
+     "reviews": [{"time": "2024-05-07T18:30:00.000Z", "grade": 4}, ...]}
+
+Everything except ``id`` is optional: a new item starts at ease 2.5 with no
+repetitions, and ``reviews`` may be empty. Grades are SM-2 quality scores
+0-5 (3 or more counts as recalled). The result per item is the new state
+plus ``nextRevision`` (``lastReview + intervalDays``, or null if the item has
+never been reviewed).
+
+For bulk rescheduling the same data can be sent column-wise, which avoids
+building a dict per item on both ends:
+
+    {"columns": {"id": [...], "easeFactor": [...], "intervalDays": [...],
+                 "repetitions": [...], "lastReview": [...],
+                 "reviewCounts": [2, 0, ...], "reviewTimes": [...], "reviewGrades": [...]}}
+
+``reviewTimes``/``reviewGrades`` hold every item's reviews back to back,
+``reviewCounts[i]`` of them for item i. The response is column-wise too.
+
+Items are not processed one by one. Reviews are flattened into arrays and the
+SM-2 recurrence is applied to all items at once for the 1st review, then the
+2nd, and so on, so the cost is a few NumPy operations per history position
+rather than Python code per item.
+"""
+import os
+
+import numpy as np
+
+from analytics import MS_PER_DAY, to_epoch_ms
+
+AI_SCHEDULE_MAX_ITEMS = int(os.getenv('AI_SCHEDULE_MAX_ITEMS', '2000000'))
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+PASSING_GRADE = 3
+FIRST_INTERVAL_DAYS = 1
+SECOND_INTERVAL_DAYS = 6
+
+RESULT_FIELDS = ("id", "easeFactor", "intervalDays", "repetitions", "lastReview", "nextRevision")
+
+
+class ScheduleError(ValueError):
+    pass
+
+
+def parse_schedule(data):
+    """Validate a /schedule/batch body, returning ``(items, columns)`` (one of them None)"""
+    data = data or {}
+    columns = data.get('columns')
+    if columns is not None:
+        if not isinstance(columns, dict) or not isinstance(columns.get('id'), list):
+            raise ScheduleError("'columns' must be an object with an 'id' array.")
+        count = len(columns['id'])
+        items = None
+    else:
+        items = data.get('items')
+        if not isinstance(items, list):
+            raise ScheduleError("Schedule body must contain an 'items' array or 'columns'.")
+        if not all(isinstance(item, dict) for item in items):
+            raise ScheduleError("Each schedule item must be a JSON object.")
+        count = len(items)
+    if count > AI_SCHEDULE_MAX_ITEMS:
+        raise ScheduleError(f"Schedule batch is limited to {AI_SCHEDULE_MAX_ITEMS} items.")
+    return items, columns
+
+
+def _column(columns, name, dtype, count, default):
+    values = columns.get(name)
+    if values is None:
+        return np.full(count, default, dtype=dtype)
+    try:
+        array = np.asarray(values, dtype=dtype)
+    except (TypeError, ValueError):
+        raise ScheduleError(f"'{name}' must contain numbers.")
+    if array.shape != (count,):
+        raise ScheduleError(f"'{name}' must have one value per item.")
+    return array
+
+
+def _timestamps(values, name):
+    try:
+        return to_epoch_ms(values)
+    except (TypeError, ValueError, AttributeError):
+        raise ScheduleError(f"'{name}' must contain ISO-8601 strings or epoch milliseconds.")
+
+
+def sm2(ease, interval, repetitions, last_review, offsets, lengths, times, grades):
+    """Apply each item's reviews in order; all state arrays are updated in place.
+
+    Item i's reviews are ``times[offsets[i]:offsets[i] + lengths[i]]`` (and the
+    same slice of ``grades``), sorted by time.
+    """
+    for position in range(int(lengths.max()) if len(lengths) else 0):
+        active = np.flatnonzero(lengths > position)
+        at = offsets[active] + position
+        grade = grades[at]
+        passed = grade >= PASSING_GRADE
+
+        reps = repetitions[active]
+        next_interval = np.where(reps == 0, FIRST_INTERVAL_DAYS,
+                                 np.where(reps == 1, SECOND_INTERVAL_DAYS,
+                                          np.rint(interval[active] * ease[active])))
+        interval[active] = np.where(passed, next_interval, FIRST_INTERVAL_DAYS)
+        repetitions[active] = np.where(passed, reps + 1, 0)
+
+        miss = 5 - grade
+        ease[active] = np.maximum(MIN_EASE, ease[active] + 0.1 - miss * (0.08 + miss * 0.02))
+        last_review[active] = times[at]
+
+
+def to_iso(epoch_ms):
+    """Date.toISOString()-style strings for an int64 epoch-ms array"""
+    return np.datetime_as_string(epoch_ms.astype('datetime64[ms]'), unit='ms', timezone='UTC')
+
+
+def _iso_or_none(epoch_ms, known):
+    values = np.full(len(epoch_ms), None, dtype=object)
+    values[known] = to_iso(epoch_ms[known])
+    return values.tolist()
+
+
+def schedule_columns(columns):
+    """New SM-2 state and next revision date for every item, column-wise"""
+    ids = columns['id']
+    n = len(ids)
+    ease = _column(columns, 'easeFactor', np.float64, n, DEFAULT_EASE)
+    interval = _column(columns, 'intervalDays', np.float64, n, 0)
+    repetitions = _column(columns, 'repetitions', np.int64, n, 0)
+    lengths = _column(columns, 'reviewCounts', np.int64, n, 0)
+    # null (NaN), Infinity and NaN would come back as NaN or garbage intervals
+    for name, values in (('easeFactor', ease), ('intervalDays', interval)):
+        if not np.isfinite(values).all():
+            raise ScheduleError(f"'{name}' must contain finite numbers.")
+
+    # -1 marks "never reviewed"; real timestamps are after the epoch
+    last_review = np.full(n, -1, dtype=np.int64)
+    last_values = columns.get('lastReview')
+    if last_values is not None:
+        if len(last_values) != n:
+            raise ScheduleError("'lastReview' must have one value per item.")
+        known = np.array([value is not None for value in last_values], dtype=bool)
+        last_review[known] = _timestamps([value for value in last_values if value is not None], 'lastReview')
+
+    times = _timestamps(columns.get('reviewTimes') or [], 'reviewTimes')
+    grades = _column(columns, 'reviewGrades', np.int64, len(times), 0)
+    if lengths.min(initial=0) < 0 or lengths.sum() != len(times):
+        raise ScheduleError("'reviewCounts' must add up to the number of reviews.")
+    if len(grades) and (grades.min() < 0 or grades.max() > 5):
+        raise ScheduleError("Review grades must be between 0 and 5.")
+
+    offsets = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    # Order each item's reviews by time (without crossing item boundaries)
+    # unless clients already sent them in order, which is the common case
+    owner = np.repeat(np.arange(n), lengths)
+    if ((np.diff(times) < 0) & (owner[1:] == owner[:-1])).any():
+        order = np.lexsort((times, owner))
+        times, grades = times[order], grades[order]
+    sm2(ease, interval, repetitions, last_review, offsets, lengths, times, grades)
+
+    reviewed = last_review >= 0
+    return {
+        "id": ids,
+        "easeFactor": np.round(ease, 4).tolist(),
+        "intervalDays": interval.astype(np.int64).tolist(),
+        "repetitions": repetitions.tolist(),
+        "lastReview": _iso_or_none(last_review, reviewed),
+        "nextRevision": _iso_or_none(last_review + (interval * MS_PER_DAY).astype(np.int64), reviewed),
+    }
+
+
+def _value(item, name, default):
+    """``item[name]``, with a missing or null value meaning ``default``"""
+    value = item.get(name)
+    return default if value is None else value
+
+
+def schedule_items(items):
+    """New SM-2 state and next revision date for every item, one dict per item"""
+    histories = [item.get('reviews') or [] for item in items]
+    reviews = [review for history in histories for review in history]
+    try:
+        columns = {
+            "id": [item.get('id') for item in items],
+            "easeFactor": [_value(item, 'easeFactor', DEFAULT_EASE) for item in items],
+            "intervalDays": [_value(item, 'intervalDays', 0) for item in items],
+            "repetitions": [_value(item, 'repetitions', 0) for item in items],
+            "lastReview": [item.get('lastReview') for item in items],
+            "reviewCounts": [len(history) for history in histories],
+            "reviewTimes": [review['time'] for review in reviews],
+            "reviewGrades": [review['grade'] for review in reviews],
+        }
+    except (KeyError, TypeError):
+        raise ScheduleError("Invalid review data: each review needs a 'time' and a numeric 'grade'.")
+    results = schedule_columns(columns)
+    return [dict(zip(RESULT_FIELDS, row)) for row in zip(*(results[field] for field in RESULT_FIELDS))]
@@ -0,0 +1,201 @@
+"""Semantic response cache for /chat.
+
+Chat messages are embedded on CPU with a local sentence-transformers model and
+compared against previously answered messages in a flat in-memory index
+(normalized float32 matrix, one dot product per lookup). A paraphrase scoring
+at or above the similarity threshold reuses the stored answer instead of
+calling a provider.
+
+The index holds at most ``capacity`` entries; when full, the least recently
+used slot is overwritten. With a ``path`` the index is saved to an .npz file
+every ``save_every`` inserts and on shutdown, and reloaded at start. Periodic
+saves copy the index under the lock and write it from a background thread, so
+lookups never wait on disk. Answers are stored as one UTF-8 JSON blob plus
+offsets rather than a fixed-width string array.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+from startup import startup_timer
+
+
+def sentence_transformer_embedder(model_name):
+    """Build ``(embed, dimension)`` for a local CPU sentence-transformers model"""
+    sentence_transformers = startup_timer.timed_import("sentence_transformers")
+    with startup_timer.phase(f"load {model_name}"):
+        model = sentence_transformers.SentenceTransformer(model_name, device="cpu")
+
+    def embed(text):
+        return model.encode(text, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+    return embed, model.get_sentence_embedding_dimension()
+
+
+class SemanticProbe:
+    """Result of embedding one message: the cache hit, if any, and a way to store the answer"""
+
+    def __init__(self, cache, vector, hit):
+        self.cache = cache
+        self.vector = vector
+        self.hit = hit
+
+    def store(self, value):
+        self.cache.add(self.vector, value)
+
+
+class SemanticCache:
+    def __init__(self, embedder_factory, capacity=10000, threshold=0.9, path=None, save_every=100):
+        self.embedder_factory = embedder_factory
+        self.capacity = capacity
+        self.threshold = threshold
+        self.path = path
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._embed = None
+        self._vectors = None
+        self._last_used = None
+        self._values = None
+        self._clock = 0
+        self._unsaved = 0
+        self._saving = False
+        self._written_clock = -1
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def ensure_ready(self):
+        # The model is loaded on first use so it never slows down startup
+        if self._embed is not None:
+            return
+        with self._lock:
+            if self._embed is not None:
+                return
+            embed, dimension = self.embedder_factory()
+            self._allocate(dimension)
+            if self.path and os.path.exists(self.path):
+                self._load()
+            self._embed = embed
+
+    def _allocate(self, dimension):
+        self._vectors = np.zeros((self.capacity, dimension), dtype=np.float32)
+        self._last_used = np.zeros(self.capacity, dtype=np.int64)
+        self._values = [None] * self.capacity
+        self.size = 0
+
+    def _tick(self, slot):
+        self._clock += 1
+        self._last_used[slot] = self._clock
+
+    def lookup(self, vector):
+        with self._lock:
+            if self.size:
+                scores = self._vectors[:self.size] @ vector
+                slot = int(scores.argmax())
+                if scores[slot] >= self.threshold:
+                    self._tick(slot)
+                    self.hits += 1
+                    return self._values[slot]
+            self.misses += 1
+            return None
+
+    def add(self, vector, value):
+        snapshot = None
+        with self._lock:
+            if self.size < self.capacity:
+                slot = self.size
+                self.size += 1
+            else:
+                slot = int(self._last_used.argmin())
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._values[slot] = value
+            self._tick(slot)
+            self._unsaved += 1
+            # One background save at a time; inserts made meanwhile go in the next one
+            if self.path and self._unsaved >= self.save_every and not self._saving:
+                snapshot = self._snapshot()
+                self._saving = True
+        if snapshot is not None:
+            threading.Thread(target=self._save_in_background, args=(snapshot,), name="semantic-cache-save",
+                             daemon=True).start()
+
+    def probe(self, text):
+        self.ensure_ready()
+        vector = self._embed(text)
+        return SemanticProbe(self, vector, self.lookup(vector))
+
+    def _snapshot(self):
+        """Copy of the index to write outside the lock; values are immutable, so a shallow copy will do"""
+        self._unsaved = 0
+        return (self._clock, self._vectors[:self.size].copy(), self._last_used[:self.size].copy(),
+                self._values[:self.size])
+
+    def _save_in_background(self, snapshot):
+        try:
+            self._write(*snapshot)
+        except Exception as e:
+            print(f"Semantic cache save failed: {e}")
+        finally:
+            with self._lock:
+                self._saving = False
+
+    def _write(self, clock, vectors, last_used, values):
+        encoded = [json.dumps(v).encode() for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        # Per-process name: several forked workers may save to the same path
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._write_lock:
+            # A background save that lost the race to a newer one must not overwrite it
+            if clock <= self._written_clock:
+                return
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, vectors=vectors, last_used=last_used, value_offsets=offsets,
+                         value_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8))
+            os.replace(tmp_path, self.path)
+            self._written_clock = clock
+
+    def save(self):
+        if self.path and self._vectors is not None:
+            with self._lock:
+                snapshot = self._snapshot()
+            self._write(*snapshot)
+
+    def _load(self):
+        # Each NpzFile item access re-reads the array, so read them once
+        with np.load(self.path, allow_pickle=False) as data:
+            vectors, last_used = data["vectors"], data["last_used"]
+            if "value_blob" in data.files:
+                blob, offsets = data["value_blob"].tobytes(), data["value_offsets"]
+                values = [blob[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+            else:
+                # Files written before the blob layout hold a fixed-width string array
+                values = data["values"]
+        if vectors.shape[1] != self._vectors.shape[1]:
+            print(f"Semantic cache at {self.path} has a different embedding size; ignoring it")
+            return
+        # Keep the most recently used entries if capacity shrank
+        keep = np.argsort(last_used)[-self.capacity:]
+        self.size = len(keep)
+        self._vectors[:self.size] = vectors[keep]
+        self._last_used[:self.size] = last_used[keep]
+        self._values[:self.size] = [json.loads(values[i]) for i in keep]
+        self._clock = int(self._last_used[:self.size].max()) if self.size else 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": bool(self.path),
+        }
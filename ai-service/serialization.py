@@ -0,0 +1,241 @@
+"""Response encoding and request decoding for every route.
+
+JSON is written with orjson when it is installed (several times faster than
+the stdlib encoder on the large /analyze and batch payloads) and with a
+compact stdlib encoder otherwise. Clients that send ``Accept:
+application/msgpack`` get MessagePack instead, and may send their bodies as
+MessagePack too; that needs the optional ``msgpack`` package.
+
+Responses of at least ``compress_min_bytes`` are compressed with zstd (if
+the client accepts it and ``zstandard`` is installed) or gzip. Request bodies
+may be sent gzip- or zstd-encoded; they are decompressed up to
+``max_body_bytes``.
+
+Newline-delimited JSON bodies (``application/x-ndjson``) are not read whole.
+NdjsonReader decodes them chunk by chunk as they arrive, holding only the
+unfinished last line, so they have no size limit beyond ``max_line_bytes``
+per record.
+"""
+import gzip
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+NDJSON = "application/x-ndjson"
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+_NDJSON_TYPES = (NDJSON, "application/ndjson", "application/jsonl", "application/x-jsonlines")
+# Decompressed bytes produced per step, so a small gzip body cannot expand all at once
+_INFLATE_STEP = 1024 * 1024
+
+
+def dumps_json(data):
+    if orjson is not None:
+        # NON_STR_KEYS: analytics payloads are keyed by ints in places
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def is_ndjson(content_type):
+    return (content_type or "").partition(";")[0].strip().lower() in _NDJSON_TYPES
+
+
+class NdjsonReader:
+    """Incremental decoder for a newline-delimited JSON body, optionally gzip/zstd encoded.
+
+    ``feed(chunk)`` returns the records completed by a chunk of the raw body
+    and ``close()`` the last one. Raises ValueError naming the line of a
+    record that is not valid JSON.
+    """
+
+    def __init__(self, content_encoding="", max_line_bytes=1024 * 1024):
+        encoding = (content_encoding or "identity").strip().lower()
+        if encoding == "gzip":
+            self._zlib = zlib.decompressobj(wbits=31)
+        elif encoding == "zstd" and zstandard is not None:
+            self._zstd = zstandard.ZstdDecompressor().decompressobj()
+        elif encoding != "identity":
+            raise ValueError(f"unsupported Content-Encoding: {encoding}")
+        self.encoding = encoding
+        self.max_line_bytes = max_line_bytes
+        self.lines = 0
+        self._partial = b""
+
+    def _inflate(self, chunk):
+        if self.encoding == "gzip":
+            try:
+                data = self._zlib.decompress(chunk, _INFLATE_STEP)
+                while data:
+                    yield data
+                    data = self._zlib.decompress(self._zlib.unconsumed_tail, _INFLATE_STEP)
+            except zlib.error as e:
+                raise ValueError(f"invalid gzip body: {e}")
+        elif self.encoding == "zstd":
+            try:
+                yield self._zstd.decompress(chunk)
+            except zstandard.ZstdError as e:
+                raise ValueError(f"invalid zstd body: {e}")
+        else:
+            yield chunk
+
+    def feed(self, chunk):
+        records = []
+        for data in self._inflate(chunk):
+            lines = (self._partial + data).split(b"\n")
+            self._partial = lines.pop()
+            if len(self._partial) > self.max_line_bytes:
+                raise ValueError(f"line {self.lines + len(lines) + 1} is longer than {self.max_line_bytes} bytes")
+            records.extend(self._decode(lines))
+        return records
+
+    def close(self):
+        if self.encoding == "gzip" and not self._zlib.eof:
+            raise ValueError("invalid gzip body: truncated")
+        lines, self._partial = [self._partial], b""
+        return self._decode(lines)
+
+    def _decode(self, lines):
+        records = []
+        for number, line in enumerate(lines, self.lines + 1):
+            if line.strip():
+                try:
+                    records.append(loads_json(line))
+                except ValueError as e:
+                    raise ValueError(f"line {number} is not valid JSON: {e}")
+        self.lines += len(lines)
+        return records
+
+
+def _preferences(header):
+    """``{value: q}`` for an Accept or Accept-Encoding header"""
+    preferences = {}
+    for part in (header or "").split(","):
+        value, _, params = part.partition(";")
+        value = value.strip().lower()
+        if not value:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, number = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        preferences[value] = q
+    return preferences
+
+
+def negotiate(accept):
+    """Media type for a response: MessagePack only when the client prefers it over JSON"""
+    if msgpack is None or not accept:
+        return JSON
+    preferences = _preferences(accept)
+    packed = max(preferences.get(media_type, 0.0) for media_type in _MSGPACK_TYPES)
+    plain = max(preferences.get(JSON, 0.0), preferences.get("application/*", 0.0), preferences.get("*/*", 0.0))
+    return MSGPACK if packed > plain else JSON
+
+
+def choose_encoding(accept_encoding):
+    preferences = _preferences(accept_encoding)
+    candidates = [("zstd", 2)] if zstandard is not None else []
+    candidates.append(("gzip", 1))
+    # Highest q wins; zstd on a tie since it is faster at a similar ratio
+    best = max(((preferences.get(name, preferences.get("*", 0.0)), rank, name) for name, rank in candidates))
+    return best[2] if best[0] > 0 else None
+
+
+class Serializer:
+    def __init__(self, compress_min_bytes=1024, gzip_level=5, zstd_level=3, max_body_bytes=64 * 1024 * 1024):
+        self.compress_min_bytes = compress_min_bytes
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.max_body_bytes = max_body_bytes
+        self._zstd = zstandard.ZstdCompressor(level=zstd_level) if zstandard is not None else None
+
+    def encode(self, data, accept="", accept_encoding=""):
+        """Response body and headers for ``data`` given the request's Accept headers"""
+        media_type = negotiate(accept)
+        body = msgpack.packb(data, use_bin_type=True) if media_type == MSGPACK else dumps_json(data)
+        headers = {"Content-Type": media_type, "Vary": "Accept, Accept-Encoding"}
+        encoding = choose_encoding(accept_encoding) \
+            if self.compress_min_bytes > 0 and len(body) >= self.compress_min_bytes else None
+        if encoding:
+            body = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+        return body, headers
+
+    def compress(self, body, encoding):
+        if encoding == "zstd":
+            return self._zstd.compress(body)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def decompress(self, body, encoding):
+        encoding = (encoding or "identity").strip().lower()
+        if encoding == "identity":
+            return body
+        if encoding == "gzip":
+            decompressor = zlib.decompressobj(wbits=31)
+            try:
+                data = decompressor.decompress(body, self.max_body_bytes + 1)
+            except zlib.error as e:
+                raise ValueError(f"invalid gzip body: {e}")
+        elif encoding == "zstd" and zstandard is not None:
+            # Read in pieces so a small body cannot expand without bound
+            chunks = []
+            size = 0
+            try:
+                with zstandard.ZstdDecompressor().stream_reader(body) as reader:
+                    while size <= self.max_body_bytes:
+                        chunk = reader.read(65536)
+                        if not chunk:
+                            break
+                        chunks.append(chunk)
+                        size += len(chunk)
+            except zstandard.ZstdError as e:
+                raise ValueError(f"invalid zstd body: {e}")
+            data = b"".join(chunks)
+        else:
+            raise ValueError(f"unsupported Content-Encoding: {encoding}")
+        if len(data) > self.max_body_bytes:
+            raise ValueError(f"request body is larger than {self.max_body_bytes} bytes")
+        return data
+
+    def decode(self, body, content_type="", content_encoding=""):
+        """The request payload; an empty body is ``{}``. Raises ValueError if it cannot be decoded"""
+        body = self.decompress(body, content_encoding)
+        if not body:
+            return {}
+        media_type = (content_type or "").partition(";")[0].strip().lower()
+        if media_type in _MSGPACK_TYPES:
+            if msgpack is None:
+                raise ValueError("MessagePack bodies need the msgpack package")
+            try:
+                return msgpack.unpackb(body, raw=False, strict_map_key=False)
+            except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as e:
+                raise ValueError(f"invalid MessagePack body: {e}")
+        try:
+            return loads_json(body)
+        except ValueError as e:
+            raise ValueError(f"invalid JSON body: {e}")
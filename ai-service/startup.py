@@ -0,0 +1,64 @@
+"""Cold-start timing: per-component import/init cost checked against a budget.
+
+Heavy libraries (provider SDKs, torch/transformers) are imported through
+``timed_import`` on first use, so they never sit on the path to a healthy
+``/health`` and their cost still shows up in the report.
+"""
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    def __init__(self, budget_ms):
+        self.started = time.perf_counter()
+        self.budget_ms = budget_ms
+        self.phases = {}
+        self.lazy = {}
+        self.ready_ms = None
+        self._imported = set()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            target = self.phases if self.ready_ms is None else self.lazy
+            target[name] = round(target.get(name, 0.0) + elapsed, 2)
+
+    def timed_import(self, module_name):
+        """Import a module, recording its cost the first time it is loaded"""
+        if module_name in self._imported:
+            return sys.modules[module_name]
+        # A module another thread is still importing is already in
+        # sys.modules; import_module waits for it to finish initializing
+        with self.phase(f"import {module_name}"):
+            module = importlib.import_module(module_name)
+        self._imported.add(module_name)
+        return module
+
+    def mark_ready(self):
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 2)
+
+    def report(self):
+        return {
+            "ready_ms": self.ready_ms,
+            "budget_ms": self.budget_ms,
+            "within_budget": self.ready_ms is not None and self.ready_ms <= self.budget_ms,
+            "phases_ms": dict(self.phases),
+            "lazy_loads_ms": dict(self.lazy),
+        }
+
+    def print_report(self):
+        print(f"⏱️  Startup: {self.ready_ms}ms (budget {self.budget_ms}ms)")
+        for name, elapsed in sorted(self.phases.items(), key=lambda item: -item[1]):
+            print(f"  - {name}: {elapsed}ms")
+        if self.ready_ms is not None and self.ready_ms > self.budget_ms:
+            print(f"⚠️  Startup exceeded budget by {round(self.ready_ms - self.budget_ms, 2)}ms")
+
+
+startup_timer = StartupTimer(budget_ms=float(os.getenv('AI_STARTUP_BUDGET_MS', '1000')))
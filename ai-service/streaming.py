@@ -0,0 +1,171 @@
+"""Server-sent event streaming for /chat/stream, /study-plan/stream and /quiz/stream.
+
+The stream is a series of ``data: {"delta": "..."}`` events, followed by an
+``event: done`` whose data is the normal response payload without
+``message`` (the message is the concatenation of the deltas). Failures
+after the stream has started are reported as an ``event: error``.
+
+/quiz/stream sends whole items instead of text deltas: one
+``data: {"question": {...}, "source": "..."}`` event per question, then
+``event: done``.
+"""
+import math
+import re
+import threading
+import time
+from collections import deque
+
+from serialization import dumps_json
+
+_LINES = re.compile(r"[^\n]*\n|[^\n]+")
+
+
+def chunk_text(text):
+    """Split a finished response into line-sized chunks for streaming"""
+    return _LINES.findall(text)
+
+
+def sse_event(data, event=None):
+    payload = dumps_json(data).decode('utf-8')
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
+class StreamStats:
+    """Time-to-first-byte samples and stream outcomes per route"""
+
+    def __init__(self, max_samples=1024):
+        self.max_samples = max_samples
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def _route(self, route):
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes.setdefault(route, {
+                "started": 0, "completed": 0, "disconnected": 0, "errors": 0,
+                "ttfb_ms": deque(maxlen=self.max_samples),
+            })
+        return stats
+
+    def record(self, route, outcome, ttfb_ms=None):
+        with self._lock:
+            stats = self._route(route)
+            stats[outcome] += 1
+            if ttfb_ms is not None:
+                stats["ttfb_ms"].append(ttfb_ms)
+
+    def summary(self):
+        with self._lock:
+            summary = {}
+            for route, stats in self._routes.items():
+                samples = sorted(stats["ttfb_ms"])
+                summary[route] = {key: value for key, value in stats.items() if key != "ttfb_ms"}
+                summary[route]["ttfb_ms"] = {
+                    f"p{pct}": round(samples[min(len(samples) - 1, len(samples) * pct // 100)], 2)
+                    for pct in (50, 95, 99)
+                } if samples else {}
+            return summary
+
+
+stream_stats = StreamStats()
+
+
+class _StreamState:
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.ttfb_ms = None
+        self.parts = []
+        self.source = None
+        self.outcome = "disconnected"
+        stream_stats.record(route, "started")
+
+    def add(self, source, text):
+        if self.ttfb_ms is None:
+            self.ttfb_ms = (time.perf_counter() - self.started) * 1000
+        self.source = source
+        self.parts.append(text)
+        return sse_event({"delta": text})
+
+    def add_item(self, source, key, item):
+        if self.ttfb_ms is None:
+            self.ttfb_ms = (time.perf_counter() - self.started) * 1000
+        self.parts.append((source, item))
+        return sse_event({key: item, "source": source})
+
+    def done(self, payload):
+        payload.pop("message", None)
+        self.outcome = "completed"
+        return sse_event(payload, event="done")
+
+    def error(self, e):
+        print(f"Stream Error ({self.route}): {e}")
+        self.outcome = "errors"
+        payload = {"success": False, "message": "Stream failed"}
+        # Shed by provider admission control: tell the client when to retry
+        if getattr(e, "retry_after", None) is not None:
+            payload["retryAfter"] = max(1, math.ceil(e.retry_after))
+        return sse_event(payload, event="error")
+
+    def close(self):
+        # Still "disconnected" here means the client went away mid-stream
+        stream_stats.record(self.route, self.outcome, self.ttfb_ms)
+
+
+def sse_events(route, chunks, finish):
+    """Turn ``(source, text)`` chunks into SSE strings; ``finish(text, source)`` builds the final payload"""
+    state = _StreamState(route)
+    try:
+        for source, text in chunks:
+            yield state.add(source, text)
+        yield state.done(finish("".join(state.parts), state.source))
+    except Exception as e:
+        yield state.error(e)
+    finally:
+        # Closing the chunk generator also closes any upstream provider stream
+        chunks.close()
+        state.close()
+
+
+def sse_items(route, key, items, finish):
+    """Turn ``(source, item)`` pairs into ``{key: item}`` events; ``finish(pairs)`` builds the final payload"""
+    state = _StreamState(route)
+    try:
+        for source, item in items:
+            yield state.add_item(source, key, item)
+        yield state.done(finish(state.parts))
+    except Exception as e:
+        yield state.error(e)
+    finally:
+        items.close()
+        state.close()
+
+
+async def sse_events_async(route, chunks, finish):
+    """Async variant of sse_events for the ASGI server"""
+    state = _StreamState(route)
+    try:
+        async for source, text in chunks:
+            yield state.add(source, text)
+        yield state.done(finish("".join(state.parts), state.source))
+    except Exception as e:
+        yield state.error(e)
+    finally:
+        await chunks.aclose()
+        state.close()
+
+
+async def sse_items_async(route, key, items, finish):
+    """Async variant of sse_items"""
+    state = _StreamState(route)
+    try:
+        async for source, item in items:
+            yield state.add_item(source, key, item)
+        yield state.done(finish(state.parts))
+    except Exception as e:
+        yield state.error(e)
+    finally:
+        await items.aclose()
+        state.close()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The service modules are flat files in ai-service/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep app.py's module-level setup offline and in memory
+os.environ.setdefault('AI_PROVIDERS_ENABLED', 'false')
+os.environ.pop('AI_CACHE_PATH', None)
+os.environ.pop('AI_QUIZ_POOL_PATH', None)
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from admission import Overloaded, RateLimiter
+
+
+def drained_limiter(requests_per_minute=600, **kwargs):
+    """A limiter whose request bucket is empty, so every call queues"""
+    limiter = RateLimiter("test", requests_per_minute=requests_per_minute, **kwargs)
+    limiter.buckets[0][0].level = 0
+    return limiter
+
+
+def wait_for_queue(limiter, length):
+    for _ in range(500):
+        if len(limiter._queue) == length:
+            return
+        time.sleep(0.002)
+    raise AssertionError(f"queue never reached {length}")
+
+
+def test_disabled_limiter_admits_immediately():
+    assert RateLimiter("test").acquire(0, 1000) == 0.0
+
+
+def test_queue_admits_by_priority_then_arrival():
+    limiter = drained_limiter(max_wait=5)
+    # Nothing is admitted for 0.3 s, so all four calls are queued first
+    limiter.buckets[0][0].level = -2
+    admitted = []
+
+    def call(name, priority):
+        limiter.acquire(priority, 1)
+        admitted.append(name)
+
+    threads = []
+    for length, (name, priority) in enumerate([("quiz", 2), ("plan-1", 1), ("chat", 0), ("plan-2", 1)], 1):
+        thread = threading.Thread(target=call, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        wait_for_queue(limiter, length)
+    for thread in threads:
+        thread.join(5)
+    assert admitted == ["chat", "plan-1", "plan-2", "quiz"]
+    assert limiter.queued == 4 and limiter.admitted == 4
+
+
+def test_full_queue_sheds_with_a_retry_estimate():
+    limiter = drained_limiter(max_queue=1, max_wait=1)
+    waiting = threading.Thread(target=limiter.acquire, args=(0, 1))
+    waiting.start()
+    wait_for_queue(limiter, 1)
+    with pytest.raises(Overloaded) as shed:
+        limiter.acquire(0, 1)
+    assert shed.value.retry_after > 0
+    assert limiter.shed == 1
+    waiting.join(5)
+
+
+def test_wait_longer_than_max_wait_times_out_and_leaves_the_queue():
+    limiter = drained_limiter(requests_per_minute=6, max_wait=5)
+    started = time.monotonic()
+    with pytest.raises(Overloaded, match="timed out"):
+        limiter.acquire(0, 1, max_wait=0.05)
+    assert time.monotonic() - started < 1
+    assert limiter.timeouts == 1 and not limiter._queue
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    limiter = drained_limiter(requests_per_minute=6, max_wait=5)
+
+    async def cancel_while_queued():
+        task = asyncio.ensure_future(limiter.acquire_async(0, 1))
+        await asyncio.sleep(0.05)
+        assert len(limiter._queue) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_while_queued())
+    assert not limiter._queue
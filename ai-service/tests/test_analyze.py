@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+from app import app, study_ai
+
+SESSIONS = [
+    {"subject": "Physics", "startTime": "2024-03-04T10:00:00.000Z", "endTime": "2024-03-04T11:00:00.000Z",
+     "completed": True},
+    {"subject": "Calculus", "startTime": "2024-03-05T18:30:00.000Z", "endTime": "2024-03-05T19:00:00.000Z",
+     "completed": False},
+]
+
+
+@pytest.fixture
+def flask_client():
+    return app.test_client()
+
+
+@pytest.fixture
+def asgi_client():
+    return TestClient(asgi.app, raise_server_exceptions=False)
+
+
+def test_asgi_sessions_use_the_async_provider_path(monkeypatch, asgi_client):
+    def blocking(*args, **kwargs):
+        raise AssertionError("sync provider call on the event loop")
+
+    monkeypatch.setattr(study_ai, "get_ai_response", blocking)
+    response = asgi_client.post("/analyze", json={"sessions": SESSIONS})
+    assert response.status_code == 200
+    assert response.json()["stats"]["totalSessions"] == 2
+
+
+def test_sessions_stats_match_between_servers(flask_client, asgi_client):
+    body = {"sessions": SESSIONS, "utcOffsetMinutes": 60}
+    flask_stats = flask_client.post("/analyze", json=body).get_json()["stats"]
+    asgi_stats = asgi_client.post("/analyze", json=body).json()["stats"]
+    assert flask_stats == asgi_stats
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_provider_errors_are_not_reported_as_bad_session_data(monkeypatch, flask_client, asgi_client, server):
+    def broken(*args, **kwargs):
+        raise ValueError("provider blew up")
+
+    monkeypatch.setattr(study_ai, "analyze_study_patterns", broken)
+    monkeypatch.setattr(study_ai, "analyze_study_patterns_async", broken)
+    if server == "flask":
+        status = flask_client.post("/analyze", json={"sessions": SESSIONS}).status_code
+    else:
+        status = asgi_client.post("/analyze", json={"sessions": SESSIONS}).status_code
+    assert status == 500
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_malformed_sessions_are_400(flask_client, asgi_client, server):
+    body = {"sessions": [{"subject": "Physics", "startTime": "yesterday", "endTime": "today"}]}
+    if server == "flask":
+        response = flask_client.post("/analyze", json=body)
+        status, payload = response.status_code, response.get_json()
+    else:
+        response = asgi_client.post("/analyze", json=body)
+        status, payload = response.status_code, response.json()
+    assert status == 400
+    assert payload["message"].startswith("Invalid session data")
+
+
+def post_ndjson(clients, server, body):
+    """``(status, body text)`` of an NDJSON /analyze request on either server"""
+    headers = {"Content-Type": "application/x-ndjson"}
+    if server == "flask":
+        response = clients["flask"].post("/analyze", data=body, headers=headers)
+        return response.status_code, response.get_data(as_text=True)
+    response = clients["asgi"].post("/analyze", content=body, headers=headers)
+    return response.status_code, response.text
+
+
+@pytest.fixture
+def clients(flask_client, asgi_client):
+    return {"flask": flask_client, "asgi": asgi_client}
+
+
+def ndjson(sessions):
+    return "\n".join(json.dumps(session) for session in sessions).encode()
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_ndjson_matches_json_body(clients, server):
+    _, streamed = post_ndjson(clients, server, ndjson(SESSIONS))
+    in_memory = clients["flask"].post("/analyze", json={"sessions": SESSIONS}).get_json()
+    assert json.loads(streamed)["stats"] == in_memory["stats"]
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_ndjson_malformed_line_is_400(clients, server):
+    status, body = post_ndjson(clients, server, ndjson(SESSIONS) + b"\n{not json")
+    assert status == 400
+    assert json.loads(body)["message"].startswith("Invalid session data")
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_ndjson_provider_errors_are_500(monkeypatch, clients, server):
+    def broken(*args, **kwargs):
+        raise ValueError("provider blew up")
+
+    monkeypatch.setattr(study_ai, "analyze_study_patterns", broken)
+    monkeypatch.setattr(study_ai, "analyze_study_patterns_async", broken)
+    status, _ = post_ndjson(clients, server, ndjson(SESSIONS))
+    assert status == 500
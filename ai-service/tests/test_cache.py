@@ -0,0 +1,53 @@
+import sqlite3
+import time
+
+from cache import ResponseCache
+
+
+def disk_rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def test_disk_table_is_pruned_to_its_cap(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(max_entries=10, path=path, max_disk_entries=20, prune_every=5)
+    for i in range(50):
+        cache.set(f"key-{i}", [f"answer {i}", "openai"])
+    assert disk_rows(path) <= 20 + 5
+    # The rows kept are the newest ones
+    assert ResponseCache(path=path).get("key-49") == ["answer 49", "openai"]
+    assert ResponseCache(path=path).get("key-0") is None
+
+
+def test_expired_rows_are_pruned(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(ttl=-1, path=path, prune_every=1)
+    cache.set("old", ["answer", "openai"])
+    assert disk_rows(path) == 0
+
+
+def test_locked_database_is_a_miss_not_an_error(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path=path, busy_timeout=0.05)
+    cache.set("kept", ["answer", "openai"])
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        started = time.monotonic()
+        cache.set("new", ["answer", "gemini"])
+        assert cache.get("kept") == ["answer", "openai"]
+        assert time.monotonic() - started < 2
+    finally:
+        other.rollback()
+        other.close()
+    assert cache.disk_errors >= 1
+    assert cache.stats()["disk_errors"] == cache.disk_errors
+
+
+def test_workers_share_the_file(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = ResponseCache(path=path), ResponseCache(path=path)
+    first.set("shared", ["answer", "openai"])
+    assert second.get("shared") == ["answer", "openai"]
+    assert second.disk_hits == 1
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from coalesce import CoalesceTimeout, SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.run("key", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.run("key", compute))) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    assert results == ["answer"] * 6 and len(calls) == 1
+    assert (flight.leaders, flight.coalesced) == (1, 5)
+    # The key is released once the flight lands
+    assert flight.run("key", lambda: "fresh") == "fresh"
+
+
+def test_followers_share_the_leaders_exception():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("provider down")
+
+    errors = []
+
+    def call():
+        try:
+            flight.run("key", fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["provider down"] * 2 and flight.errors == 1
+
+
+def test_follower_gives_up_after_its_own_timeout():
+    flight = SingleFlight(timeout=30)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "late"
+
+    leader = threading.Thread(target=flight.run, args=("key", slow))
+    leader.start()
+    started.wait(5)
+    with pytest.raises(CoalesceTimeout):
+        flight.run("key", slow, timeout=0.05)
+    release.set()
+    leader.join(5)
+    assert flight.timeouts == 1
+
+
+def test_async_followers_share_the_task_and_survive_a_cancelled_leader():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.run_async("key", compute))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flight.run_async("key", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        # The leader's client went away; the followers still get the answer
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(scenario()) == ["answer"] * 3
+    assert len(calls) == 1 and flight.coalesced == 3
+    assert flight.stats()["in_flight"] == 0
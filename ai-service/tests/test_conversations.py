@@ -0,0 +1,71 @@
+import time
+
+from conversations import ConversationStore
+
+
+def test_profile_is_kept_and_merged_with_new_context():
+    store = ConversationStore()
+    store.prepare("c1", {"userName": "Sam", "totalSessions": 3})
+    context, history = store.prepare("c1", {"totalSessions": 4, "mood": "tired"})
+    assert context == {"userName": "Sam", "totalSessions": 4, "mood": "tired"}
+    assert history == {"summary": "", "turns": []}
+
+
+def test_old_turns_are_compacted_into_a_bounded_summary():
+    store = ConversationStore(keep_turns=2, turn_chars=50, summary_chars=60)
+    for i in range(10):
+        store.record("c1", f"Question number {i}. More detail here.", "A reply " * 20)
+    _, history = store.prepare("c1")
+    assert [user for user, _ in history["turns"]] == ["Question number 8. More detail here.",
+                                                      "Question number 9. More detail here."]
+    assert all(len(reply) <= 50 for _, reply in history["turns"])
+    assert history["summary"].startswith("8 earlier messages, recently about: ")
+    # Only first sentences, newest kept, within summary_chars
+    assert "Question number 7." in history["summary"] and "More detail" not in history["summary"]
+    assert "Question number 0." not in history["summary"]
+    assert store.compactions == 8
+
+
+def test_size_stays_flat_as_a_conversation_grows():
+    store = ConversationStore(keep_turns=4)
+    sizes = [store.record("c1", f"Message {i} " + "x" * 200, "Reply " + "y" * 400) for i in range(200)]
+    assert max(sizes[20:]) - min(sizes[20:]) < 100
+
+
+def test_least_recently_used_conversation_is_evicted_first():
+    store = ConversationStore(max_conversations=2)
+    store.record("a", "hi", "hello")
+    store.record("b", "hi", "hello")
+    store.prepare("a")
+    store.record("c", "hi", "hello")
+    stats = store.stats()
+    assert stats["conversations"] == 2 and stats["evictions"]["lru"] == 1
+    assert store.prepare("a")[1]["turns"] == [("hi", "hello")]
+    assert store.prepare("b")[1]["turns"] == []
+
+
+def test_memory_cap_evicts_others_but_never_the_active_conversation():
+    store = ConversationStore(max_bytes=3000, turn_chars=1000)
+    for key in ("a", "b", "c"):
+        store.record(key, "q" * 500, "r" * 500)
+    store.record("c", "q" * 900, "r" * 900)
+    stats = store.stats()
+    assert stats["evictions"]["memory"] >= 1
+    assert store.prepare("c")[1]["turns"]
+    assert stats["bytes"] <= 3000 or stats["conversations"] == 1
+
+
+def test_idle_conversations_expire(monkeypatch):
+    store = ConversationStore(ttl=60)
+    store.record("a", "hi", "hello")
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert store.stats()["conversations"] == 0
+    assert store.evictions["expired"] == 1 and store.bytes == 0
+
+
+def test_forget_releases_the_bytes():
+    store = ConversationStore()
+    store.record("a", "hi", "hello")
+    store.forget("a")
+    assert store.bytes == 0 and store.stats()["conversations"] == 0
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import app
+import deadlines
+from deadlines import DeadlinePolicy
+from metrics import DEADLINE_EXCEEDED
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StallingGemini:
+    """Sends one chunk, then nothing until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def generate_content(self, prompt, stream=False):
+        def chunks():
+            yield Chunk("First tip. ")
+            self.release.wait(10)
+            yield Chunk("Too late.")
+        return chunks()
+
+    async def generate_content_async(self, prompt, stream=False):
+        async def chunks():
+            yield Chunk("First tip. ")
+            await asyncio.sleep(10)
+            yield Chunk("Too late.")
+        return chunks()
+
+
+@pytest.fixture
+def stalling_gemini(monkeypatch):
+    gemini = StallingGemini()
+    monkeypatch.setattr(app, "AI_PROVIDERS_ENABLED", True)
+    monkeypatch.setattr(app.provider_clients, "gemini", lambda model: gemini)
+    monkeypatch.setattr(app.study_ai, "provider_order", lambda: ["gemini"])
+    monkeypatch.setattr(app, "deadline_policy", DeadlinePolicy(reserve=0.05))
+    yield gemini
+    gemini.release.set()
+
+
+def stream_deadline_misses():
+    return app.metrics.snapshot().get((DEADLINE_EXCEEDED, ("chat", "stream")), 0)
+
+
+def test_budget_comes_from_the_header_and_is_capped():
+    policy = DeadlinePolicy(maximum=30)
+    assert policy.budget("/chat") == ("chat", 10.0)
+    assert policy.budget("/chat/stream", "2500") == ("chat", 2.5)
+    assert policy.budget("/quiz", "600000") == ("quiz", 30)
+    assert policy.budget("/chat/batch") == ("chat", None)
+    assert policy.budget("/health", "1000") == ("health", None)
+
+
+def test_deadline_is_current_until_finished():
+    deadline, token = DeadlinePolicy().start("/chat", "1000")
+    try:
+        assert deadlines.current() is deadline
+        assert 0 < deadline.remaining() <= 1
+    finally:
+        deadlines.finish(token)
+    assert deadlines.current() is None
+
+
+def test_stalled_gemini_stream_stops_at_the_deadline(stalling_gemini):
+    misses = stream_deadline_misses()
+    _, token = app.deadline_policy.start("/chat/stream", "400")
+    started = time.monotonic()
+    try:
+        chunks = list(app.study_ai.stream_ai_response("Give me a tip", endpoint="chat"))
+    finally:
+        deadlines.finish(token)
+    assert time.monotonic() - started < 2
+    assert chunks == [("gemini", "First tip. ")]
+    assert stream_deadline_misses() == misses + 1
+
+
+def test_stalled_async_gemini_stream_stops_at_the_deadline(stalling_gemini):
+    misses = stream_deadline_misses()
+
+    async def collect():
+        _, token = app.deadline_policy.start("/chat/stream", "400")
+        try:
+            return [chunk async for chunk in app.study_ai.stream_ai_response_async("Give me a tip", endpoint="chat")]
+        finally:
+            deadlines.finish(token)
+
+    started = time.monotonic()
+    assert asyncio.run(collect()) == [("gemini", "First tip. ")]
+    assert time.monotonic() - started < 2
+    assert stream_deadline_misses() == misses + 1
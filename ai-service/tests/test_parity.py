@@ -0,0 +1,107 @@
+import gzip
+
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+from admission import Overloaded
+from app import app, study_ai
+from metrics import REQUESTS_TOTAL, metrics
+
+
+@pytest.fixture
+def clients():
+    return {"flask": app.test_client(), "asgi": TestClient(asgi.app, raise_server_exceptions=False)}
+
+
+def post(clients, server, path, body, headers):
+    if server == "flask":
+        return clients["flask"].post(path, data=body, headers=headers).status_code
+    return clients["asgi"].post(path, content=body, headers=headers).status_code
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+@pytest.mark.parametrize("path", ["/chat", "/study-plan", "/quiz", "/study-plan/allocate", "/chat/batch"])
+@pytest.mark.parametrize("body, headers", [
+    (b"{bad", {"Content-Type": "application/json"}),
+    (b'{"message": "hi"}', {"Content-Type": "application/json", "Content-Encoding": "br"}),
+    (b"not gzip", {"Content-Type": "application/json", "Content-Encoding": "gzip"}),
+], ids=["malformed-json", "unsupported-encoding", "corrupt-gzip"])
+def test_undecodable_bodies_are_400(clients, server, path, body, headers):
+    assert post(clients, server, path, body, headers) == 400
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_oversized_decompressed_bodies_are_400(monkeypatch, clients, server):
+    monkeypatch.setattr(asgi.serializer, "max_body_bytes", 16)
+    body = gzip.compress(b'{"message": "' + b"x" * 64 + b'"}')
+    headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    assert post(clients, server, "/chat", body, headers) == 400
+
+
+def post_json(clients, server, path, body):
+    response = clients[server].post(path, json=body)
+    return response.status_code, response.headers
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+@pytest.mark.parametrize("path, body", [
+    ("/chat/batch", {"items": "not a list"}),
+    ("/quiz/batch", {"requests": [], "parallelism": "many"}),
+    ("/study-plan/allocate", {"subjects": "Physics", "timeAvailable": -1}),
+    ("/study-plan/allocate", ["not", "an", "object"]),
+    ("/schedule/batch", {"items": "not a list"}),
+    ("/analyze", {"sessions": "not a list"}),
+], ids=["batch-shape", "batch-parallelism", "allocate-hours", "allocate-body", "schedule", "analyze"])
+def test_invalid_requests_are_400(clients, server, path, body):
+    assert post_json(clients, server, path, body)[0] == 400
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_invalid_batch_items_fail_alone(clients, server):
+    response = clients[server].post("/study-plan/allocate/batch",
+                                    json={"requests": [1, {"subjects": "Physics", "timeAvailable": 3}]})
+    results = response.json() if server == "asgi" else response.get_json()
+    assert response.status_code == 200
+    assert [result["ok"] for result in results["results"]] == [False, True]
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_overloaded_providers_are_503_with_retry_after(monkeypatch, clients, server):
+    def overloaded(*args, **kwargs):
+        raise Overloaded("openai queue is full", 2.2)
+
+    async def overloaded_async(*args, **kwargs):
+        overloaded()
+
+    monkeypatch.setattr(study_ai, "chat_response", overloaded)
+    monkeypatch.setattr(study_ai, "chat_response_async", overloaded_async)
+    status, headers = post_json(clients, server, "/chat", {"message": "hi"})
+    assert status == 503
+    assert headers["Retry-After"] == "3"
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_wrong_method_is_405(clients, server):
+    assert clients[server].get("/chat").status_code == 405
+
+
+def request_count(route, method, status):
+    return metrics.snapshot().get((REQUESTS_TOTAL, (route, method, status)), 0)
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+@pytest.mark.parametrize("method, path, route, status", [
+    ("DELETE", "/chat/conversations/abc-123", "/chat/conversations/<conversation_id>", "200"),
+    ("GET", "/chat/conversations/stats", "/chat/conversations/stats", "200"),
+    ("GET", "/health", "/health", "200"),
+    ("GET", "/no/such/route", "unmatched", "404"),
+])
+def test_metrics_route_labels_match(clients, server, method, path, route, status):
+    before = request_count(route, method, status)
+    if server == "flask":
+        response = clients["flask"].open(path, method=method)
+    else:
+        response = clients["asgi"].request(method, path)
+    assert response.status_code == int(status)
+    assert request_count(route, method, status) == before + 1
@@ -0,0 +1,117 @@
+import json
+import random
+import re
+
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+from app import app, study_ai
+from planner import SLOT_MINUTES, PlanError, allocate
+
+
+def plan_hours(message):
+    return {name: float(hours) for name, hours in re.findall(r"\*\*(\w+)\*\*: ([\d.]+)h/week", message)}
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_provider_failure_serves_the_allocated_template_plan(server):
+    body = {"subjects": "Physics, Calculus, History", "timeAvailable": 9}
+    if server == "flask":
+        payload = app.test_client().post("/study-plan", json=body).get_json()
+    else:
+        payload = TestClient(asgi.app).post("/study-plan", json=body).json()
+    assert payload["success"] and payload["source"] == "fallback"
+    hours = plan_hours(payload["message"])
+    assert set(hours) == {"Physics", "Calculus", "History"}
+    assert all(h > 0 for h in hours.values()) and sum(hours.values()) <= 9
+
+
+def response_text(response):
+    """Body text of a Flask or Starlette test response"""
+    return response.get_data(as_text=True) if hasattr(response, "get_data") else response.text
+
+
+def sse_events(text):
+    """``[(event, data)]`` from an SSE body"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.parametrize("server", ["flask", "asgi"])
+def test_streamed_fallback_plan_matches_study_plan(monkeypatch, server):
+    # The template picks its techniques at random
+    monkeypatch.setattr(random, "sample", lambda items, k: items[:k])
+    body = {"subjects": "Physics, Calculus", "timeAvailable": 6, "goals": "Pass finals"}
+    client = app.test_client() if server == "flask" else TestClient(asgi.app)
+    plan = json.loads(response_text(client.post("/study-plan", json=body)))
+    events = sse_events(response_text(client.post("/study-plan/stream", json=body)))
+    deltas = [data for event, data in events if event == "message"]
+    assert "".join(delta["delta"] for delta in deltas) == plan["message"]
+    assert "AI-Generated" not in plan["message"]
+    event, done = events[-1]
+    assert event == "done" and done["source"] == plan["source"] == "fallback"
+
+
+def test_provider_plans_are_served_as_is():
+    response = study_ai.finish_study_plan(["Physics"], 5, "Pass", "Study physics daily.", "openai")
+    assert response["message"] == "Study physics daily." and response["source"] == "openai"
+
+
+def random_plan_request(rng):
+    subjects = [{"name": f"S{i}", "weight": rng.choice([1, 2, 3]),
+                 "examDate": f"2024-05-{rng.randint(7, 31):02d}" if rng.random() < 0.5 else None,
+                 "minSession": rng.choice([15, 30, 45]), "maxSession": rng.choice([60, 90, 120])}
+                for i in range(rng.randint(1, 12))]
+    return {"subjects": subjects, "startDate": "2024-05-06", "weeks": rng.randint(1, 4),
+            "availability": [rng.choice([0, 0.5, 1, 2, 3.5, 6]) for _ in range(7)],
+            "dateAvailability": {"2024-05-11": rng.choice([0, 8])}}
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_allocation_respects_capacity_session_limits_and_exams(seed):
+    rng = random.Random(seed)
+    request = random_plan_request(rng)
+    plan = allocate(request)
+    limits = {s["name"]: s for s in request["subjects"]}
+    per_subject = {}
+    for day in plan["days"]:
+        minutes = [session["minutes"] for session in day["sessions"]]
+        assert sum(minutes) <= day["capacityMinutes"]
+        names = [session["subject"] for session in day["sessions"]]
+        assert len(names) == len(set(names)), "one session per subject per day"
+        for session in day["sessions"]:
+            subject = limits[session["subject"]]
+            assert subject["minSession"] <= session["minutes"] <= subject["maxSession"]
+            assert session["minutes"] % SLOT_MINUTES == 0
+            if subject["examDate"]:
+                assert day["date"] < subject["examDate"]
+            per_subject[session["subject"]] = per_subject.get(session["subject"], 0) + session["minutes"]
+    for subject in plan["subjects"]:
+        assert subject["scheduledMinutes"] == per_subject.get(subject["name"], 0)
+    assert plan["scheduledMinutes"] == sum(per_subject.values()) <= plan["capacityMinutes"]
+    assert plan["unusedMinutes"] == plan["capacityMinutes"] - plan["scheduledMinutes"]
+    assert plan["capacityMinutes"] == sum(day["capacityMinutes"] for day in plan["days"])
+
+
+def test_weights_split_unconstrained_time_proportionally():
+    plan = allocate({"subjects": [{"name": "A", "weight": 1}, {"name": "B", "weight": 3}],
+                     "startDate": "2024-05-06", "timeAvailable": 14, "maxSession": 120})
+    targets = {s["name"]: s["targetMinutes"] for s in plan["subjects"]}
+    assert targets["B"] == 3 * targets["A"]
+    assert sum(targets.values()) <= plan["capacityMinutes"]
+
+
+@pytest.mark.parametrize("body", [
+    [],
+    {"subjects": ""},
+    {"subjects": "Physics", "timeAvailable": -1},
+    {"subjects": "Physics", "timeAvailable": 5, "weeks": 1000},
+    {"subjects": [{"name": "Physics", "examDate": "soon"}], "timeAvailable": 5},
+])
+def test_invalid_plan_requests_raise_plan_error(body):
+    with pytest.raises(PlanError):
+        allocate(body)
@@ -0,0 +1,68 @@
+import json
+
+from quiz_parser import QuizParser, parse_quiz
+
+
+def question(text, correct=1):
+    return {"question": text, "options": ["A1", "B1", "C1", "D1"], "correct": correct, "explanation": "Because."}
+
+
+def test_fences_prose_and_trailing_commas_are_tolerated():
+    body = json.dumps({"questions": [question("What is 2+2?")]})
+    text = f"Sure! Here is your quiz:\n```json\n{body[:-2]},]}}\n```\nGood luck!"
+    questions, dropped = parse_quiz(text)
+    assert [q["question"] for q in questions] == ["What is 2+2?"] and dropped == 0
+
+
+def test_truncated_answer_keeps_the_completed_questions():
+    text = json.dumps({"questions": [question("First?"), question("Second?")]})
+    questions, dropped = parse_quiz(text[:text.index("Second?") + 10])
+    assert [q["question"] for q in questions] == ["First?"] and dropped == 0
+
+
+def test_malformed_questions_are_dropped_not_fatal():
+    bad = [
+        {"question": "", "options": ["a", "b"], "correct": 0},
+        {"question": "Too few options?", "options": ["only"], "correct": 0},
+        {"question": "Duplicate options?", "options": ["Yes", "yes"], "correct": 0},
+        {"question": "Out of range?", "options": ["a", "b"], "correct": 5},
+        {"question": "Boolean answer?", "options": ["a", "b"], "correct": True},
+        {"question": "Non-string option?", "options": ["a", 2], "correct": 0},
+        question("Good?"),
+        question("good?"),
+    ]
+    questions, dropped = parse_quiz(json.dumps({"questions": bad}) + '{"question": "Broken", "options": [}')
+    assert [q["question"] for q in questions] == ["Good?"]
+    assert dropped == 8
+
+
+def test_answer_letters_and_option_text_are_normalized():
+    items = [
+        {"question": "Letter?", "options": ["x", "y", "z"], "answer": "C)"},
+        {"question": "Text?", "options": ["Paris", "Rome"], "correct": "rome"},
+        {"question": "Digit?", "options": ["x", "y"], "correct": "1"},
+    ]
+    questions, _ = parse_quiz(json.dumps(items))
+    assert [q["correct"] for q in questions] == [2, 1, 1]
+
+
+def test_no_json_at_all():
+    assert parse_quiz("I cannot make a quiz about that.") == ([], 0)
+    assert parse_quiz(None) == ([], 0)
+    assert parse_quiz("} stray { braces \" and quotes") == ([], 0)
+
+
+def test_braces_inside_strings_do_not_split_objects():
+    item = {"question": "What does {} mean in JSON?", "options": ["object }", "array {"], "correct": 0}
+    questions, _ = parse_quiz(json.dumps([item]))
+    assert questions[0]["options"] == ["object }", "array {"]
+
+
+def test_incremental_feed_matches_whole_parse():
+    text = "```json\n" + json.dumps({"questions": [question(f"Q{i}?", i % 4) for i in range(5)]}) + "\n```"
+    parser = QuizParser()
+    streamed = []
+    for i in range(0, len(text), 7):
+        streamed += parser.feed(text[i:i + 7])
+    assert streamed == parse_quiz(text)[0]
+    assert parser.parsed == 5
@@ -0,0 +1,63 @@
+import sqlite3
+import time
+
+from quiz_pool import QuizPool
+
+
+def quiz(name):
+    return {"questions": [{"question": name}], "source": "openai"}
+
+
+def finish_sync(pool):
+    thread = pool._syncing
+    if thread is not None:
+        thread.join(5)
+
+
+def demand(path):
+    with sqlite3.connect(path) as db:
+        return dict(((topic, count), requests) for topic, _, count, requests, _ in db.execute("SELECT * FROM demand"))
+
+
+def test_hits_rotate_and_misses_return_none(tmp_path):
+    pool = QuizPool(str(tmp_path / "pool.db"))
+    pool.put("Physics", "medium", 5, [quiz("a"), quiz("b")])
+    assert [pool.get(" physics ", "Medium", 5)["questions"][0]["question"] for _ in range(3)] == ["a", "b", "a"]
+    assert pool.get("History", "medium", 5) is None
+    assert (pool.hits, pool.misses) == (3, 1)
+
+
+def test_quizzes_written_by_the_job_are_picked_up_in_the_background(tmp_path):
+    path = str(tmp_path / "pool.db")
+    server = QuizPool(path, reload_interval=0)
+    QuizPool(path).put("Physics", "medium", 5, [quiz("fresh")])
+    assert server.get("Physics", "medium", 5) is None
+    finish_sync(server)
+    assert server.get("Physics", "medium", 5)["questions"][0]["question"] == "fresh"
+    finish_sync(server)
+    server._sync()
+    assert demand(path)[("physics", 5)] == 2
+
+
+def test_locked_file_skips_the_sync_without_failing_requests(tmp_path):
+    path = str(tmp_path / "pool.db")
+    pool = QuizPool(path, reload_interval=0, busy_timeout=0.05)
+    pool.put("Physics", "medium", 5, [quiz("a")])
+    job = sqlite3.connect(path)
+    job.execute("BEGIN EXCLUSIVE")
+    try:
+        started = time.monotonic()
+        for _ in range(3):
+            assert pool.get("Physics", "medium", 5) is not None
+            finish_sync(pool)
+        assert time.monotonic() - started < 2
+        assert pool.errors >= 1
+    finally:
+        job.rollback()
+        job.close()
+    # The counts that could not be written go out with the next sync
+    pool.get("Physics", "medium", 5)
+    finish_sync(pool)
+    pool._sync()
+    assert demand(path)[("physics", 5)] == 4
+    assert pool.stats()["errors"] == pool.errors
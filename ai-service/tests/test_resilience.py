@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+
+from app import study_ai
+from resilience import CircuitBreaker, hedged_race, hedged_race_async
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, cooldown=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_breaker_opens_after_threshold_and_recovers():
+    breaker = CircuitBreaker("test", failure_threshold=2, cooldown=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    breaker.opened_at -= 60
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one trial call at a time while half-open
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_release_returns_the_half_open_trial():
+    breaker = half_open_breaker()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_cancelled_hedge_releases_half_open_trial(monkeypatch):
+    breaker = half_open_breaker()
+    monkeypatch.setitem(study_ai.breakers, "openai", breaker)
+
+    async def slow_openai(prompt, max_tokens=500, timeout=None):
+        await asyncio.sleep(5)
+        return "slow"
+
+    async def fast_gemini(prompt, timeout=None):
+        await asyncio.sleep(0.01)
+        return "fast"
+
+    monkeypatch.setattr(study_ai, "call_openai_async", slow_openai)
+    monkeypatch.setattr(study_ai, "call_gemini_async", fast_gemini)
+    calls = [(name, study_ai.provider_call_async(name, "prompt", 50, "chat", [])) for name in ("openai", "gemini")]
+
+    result = asyncio.run(hedged_race_async(calls, 0))
+
+    assert result == ("fast", "gemini")
+    assert breaker.state == "half_open"
+    assert not breaker.trial_in_flight
+    assert breaker.allow()
+
+
+def test_hedged_race_prefers_first_good_answer():
+    def slow():
+        time.sleep(0.3)
+        return "slow"
+
+    assert hedged_race([("a", slow), ("b", lambda: "fast")], 0.05) == ("fast", "b")
+    assert hedged_race([("a", lambda: None), ("b", lambda: "ok")], 10) == ("ok", "b")
+    assert hedged_race([("a", lambda: None)], 0) == (None, None)
+
+
+def test_hedged_race_gives_up_at_timeout():
+    def hang():
+        time.sleep(1)
+        return "late"
+
+    started = time.monotonic()
+    assert hedged_race([("a", hang)], 0.05, timeout=0.1) == (None, None)
+    assert time.monotonic() - started < 0.5
+
+
+@pytest.mark.parametrize("hedge_delay", [0, 0.05])
+def test_hedged_race_async_cancels_losers(hedge_delay):
+    cancelled = []
+
+    async def hang():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def fast():
+        await asyncio.sleep(0.1)
+        return "fast"
+
+    async def race():
+        result = await hedged_race_async([("a", hang), ("b", fast)], hedge_delay)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(race()) == ("fast", "b")
+    assert cancelled == [True]
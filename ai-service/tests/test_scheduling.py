@@ -0,0 +1,117 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from analytics import parse_timestamp
+from scheduling import (DEFAULT_EASE, FIRST_INTERVAL_DAYS, MIN_EASE, PASSING_GRADE, SECOND_INTERVAL_DAYS,
+                        ScheduleError, schedule_columns, schedule_items, to_iso)
+
+DAY_MS = 86_400_000
+
+
+def schedule_one(item):
+    """Reference SM-2 for a single item in plain Python"""
+    ease = item.get("easeFactor") or DEFAULT_EASE
+    interval = item.get("intervalDays") or 0
+    repetitions = item.get("repetitions") or 0
+    last_review = parse_timestamp(item["lastReview"]) if item.get("lastReview") else None
+    for review in sorted(item.get("reviews") or [], key=lambda review: parse_timestamp(review["time"])):
+        grade = review["grade"]
+        if grade >= PASSING_GRADE:
+            interval = FIRST_INTERVAL_DAYS if repetitions == 0 else \
+                SECOND_INTERVAL_DAYS if repetitions == 1 else round(interval * ease)
+            repetitions += 1
+        else:
+            interval, repetitions = FIRST_INTERVAL_DAYS, 0
+        miss = 5 - grade
+        ease = max(MIN_EASE, ease + 0.1 - miss * (0.08 + miss * 0.02))
+        last_review = parse_timestamp(review["time"])
+    return round(ease, 4), int(interval), repetitions, last_review
+
+
+def iso(epoch_ms):
+    return str(to_iso(np.array([epoch_ms], dtype=np.int64))[0])
+
+
+def random_items(count, seed=7):
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        start = 1_704_067_200_000 + rng.randrange(365) * DAY_MS
+        times = sorted(start + rng.randrange(60 * DAY_MS) for _ in range(rng.randrange(8)))
+        reviews = [{"time": iso(t), "grade": rng.randrange(6)} for t in times]
+        # Some histories arrive out of order
+        if rng.random() < 0.2:
+            rng.shuffle(reviews)
+        item = {"id": f"item-{i}", "reviews": reviews}
+        if rng.random() < 0.5:
+            item.update(easeFactor=rng.choice([1.3, 2.1, 2.5, 2.9]), intervalDays=rng.choice([1, 6, 15]),
+                        repetitions=rng.randrange(4), lastReview=iso(start - DAY_MS))
+        items.append(item)
+    return items
+
+
+def test_vectorized_results_match_the_per_item_loop():
+    items = random_items(500)
+    for item, result in zip(items, schedule_items(items)):
+        ease, interval, repetitions, last_review = schedule_one(item)
+        assert result["id"] == item["id"]
+        assert (result["easeFactor"], result["intervalDays"], result["repetitions"]) == \
+            (ease, interval, repetitions)
+        if last_review is None:
+            assert result["lastReview"] is None and result["nextRevision"] is None
+        else:
+            assert result["lastReview"] == iso(last_review)
+            assert result["nextRevision"] == iso(last_review + interval * DAY_MS)
+
+
+def test_columns_and_items_agree():
+    items = random_items(200, seed=11)
+    columns = {
+        "id": [item["id"] for item in items],
+        "easeFactor": [item.get("easeFactor", DEFAULT_EASE) for item in items],
+        "intervalDays": [item.get("intervalDays", 0) for item in items],
+        "repetitions": [item.get("repetitions", 0) for item in items],
+        "lastReview": [item.get("lastReview") for item in items],
+        "reviewCounts": [len(item["reviews"]) for item in items],
+        "reviewTimes": [review["time"] for item in items for review in item["reviews"]],
+        "reviewGrades": [review["grade"] for item in items for review in item["reviews"]],
+    }
+    results = schedule_columns(columns)
+    by_item = schedule_items(items)
+    assert [row["easeFactor"] for row in by_item] == results["easeFactor"]
+    assert [row["nextRevision"] for row in by_item] == results["nextRevision"]
+
+
+def test_null_state_fields_mean_defaults():
+    review = {"time": "2024-05-01T09:00:00.000Z", "grade": 4}
+    explicit_null = {"id": "a", "easeFactor": None, "intervalDays": None, "repetitions": None,
+                     "lastReview": None, "reviews": [review]}
+    [result] = schedule_items([explicit_null])
+    [default] = schedule_items([{"id": "a", "reviews": [review]}])
+    assert result == default
+    # The result must be valid JSON (no NaN)
+    json.loads(json.dumps(result, allow_nan=False))
+
+
+@pytest.mark.parametrize("name, values", [
+    ("easeFactor", [2.5, None]),
+    ("intervalDays", [float("nan"), 1]),
+    ("easeFactor", [float("inf"), 2.5]),
+])
+def test_non_finite_columns_are_rejected(name, values):
+    columns = {"id": ["a", "b"], name: values}
+    with pytest.raises(ScheduleError, match=name):
+        schedule_columns(columns)
+
+
+@pytest.mark.parametrize("body", [
+    {"items": [{"id": "a", "reviews": [{"time": "2024-05-01T09:00:00.000Z"}]}]},
+    {"items": [{"id": "a", "reviews": [{"time": "2024-05-01T09:00:00.000Z", "grade": 9}]}]},
+    {"items": [{"id": "a", "reviews": [{"time": "last tuesday", "grade": 3}]}]},
+])
+def test_invalid_reviews_are_rejected(body):
+    with pytest.raises(ScheduleError):
+        schedule_items(body["items"])
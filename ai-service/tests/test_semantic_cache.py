@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+
+from semantic_cache import SemanticCache
+
+DIMENSION = 8
+
+
+def unit(i):
+    vector = np.zeros(DIMENSION, dtype=np.float32)
+    vector[i % DIMENSION] = 1
+    return vector
+
+
+def ready_cache(path, **kwargs):
+    cache = SemanticCache(lambda: (None, DIMENSION), path=path, **kwargs)
+    cache.ensure_ready()
+    return cache
+
+
+def wait_for_saves():
+    for thread in threading.enumerate():
+        if thread.name == "semantic-cache-save":
+            thread.join()
+
+
+def test_periodic_save_does_not_hold_the_lock_while_writing(tmp_path, monkeypatch):
+    cache = ready_cache(str(tmp_path / "semantic.npz"), save_every=2)
+    writing, release = threading.Event(), threading.Event()
+    original = cache._write
+
+    def slow_write(*args):
+        writing.set()
+        release.wait(5)
+        original(*args)
+
+    monkeypatch.setattr(cache, "_write", slow_write)
+    cache.add(unit(0), ["zero", "openai"])
+    cache.add(unit(1), ["one", "openai"])
+    assert writing.wait(5)
+    # The save is still writing; lookups and inserts must not wait for it
+    assert cache.lookup(unit(1)) == ["one", "openai"]
+    cache.add(unit(2), ["two", "openai"])
+    release.set()
+    wait_for_saves()
+
+
+def test_save_and_reload_round_trip(tmp_path):
+    path = str(tmp_path / "semantic.npz")
+    cache = ready_cache(path, save_every=1000)
+    answers = [["short", "openai"], ["a much longer answer " * 50, "gemini"], ["ünïcødé ✓", "openai"]]
+    for i, answer in enumerate(answers):
+        cache.add(unit(i), answer)
+    cache.save()
+    with np.load(path) as data:
+        assert "values" not in data.files
+        assert data["value_blob"].dtype == np.uint8
+    reloaded = ready_cache(path)
+    assert [reloaded.lookup(unit(i)) for i in range(len(answers))] == answers
+
+
+def test_loads_the_fixed_width_string_layout(tmp_path):
+    path = str(tmp_path / "semantic.npz")
+    np.savez(path, vectors=np.stack([unit(0), unit(1)]), last_used=np.array([1, 2]),
+             values=np.array(['["zero", "openai"]', '["one", "gemini"]']))
+    cache = ready_cache(path)
+    assert cache.lookup(unit(1)) == ["one", "gemini"]
+
+
+def chat_cache(monkeypatch):
+    import app
+
+    cache = SemanticCache(lambda: (lambda text: unit(len(text)), DIMENSION))
+    calls = []
+
+    def answer(prompt, **kwargs):
+        calls.append(prompt)
+        return f"answer {len(calls)}", "openai"
+
+    monkeypatch.setattr(app, "semantic_cache", cache)
+    monkeypatch.setattr(app, "AI_PROVIDERS_ENABLED", True)
+    monkeypatch.setattr(app.study_ai, "get_ai_response", answer)
+    return app.study_ai, cache, calls
+
+
+def test_chat_reuses_answers_for_anonymous_requests(monkeypatch):
+    study_ai, cache, calls = chat_cache(monkeypatch)
+    first = study_ai.chat_response("How do I focus?")
+    second = study_ai.chat_response("How do I focus?")
+    assert len(calls) == 1 and second["message"] == first["message"]
+    assert cache.hits == 1
+
+
+def test_chat_with_profile_context_skips_the_semantic_cache(monkeypatch):
+    study_ai, cache, calls = chat_cache(monkeypatch)
+    study_ai.chat_response("How do I focus?")
+    personalized = study_ai.chat_response("How do I focus?", {"totalSessions": 40, "recentSubjects": ["Physics"]})
+    assert len(calls) == 2 and personalized["message"] == "answer 2"
+    assert cache.size == 1
@@ -0,0 +1,111 @@
+import gzip
+import json
+
+import pytest
+
+import serialization
+from serialization import NdjsonReader, Serializer, choose_encoding, is_ndjson, negotiate
+
+
+def ndjson(records):
+    return b"\n".join(json.dumps(record).encode() for record in records)
+
+
+def read_all(reader, body, chunk_size):
+    records = []
+    for i in range(0, len(body), chunk_size):
+        records += reader.feed(body[i:i + chunk_size])
+    return records + reader.close()
+
+
+def test_decode_round_trips_and_empty_body_is_an_empty_object():
+    serializer = Serializer()
+    assert serializer.decode(b"") == {}
+    assert serializer.decode(gzip.compress(b'{"a": [1, 2]}'), "application/json", "gzip") == {"a": [1, 2]}
+
+
+def test_decompressed_size_is_capped():
+    serializer = Serializer(max_body_bytes=1024)
+    small_but_expanding = gzip.compress(b"[" + b"0," * 10000 + b"0]")
+    assert len(small_but_expanding) < 1024
+    with pytest.raises(ValueError, match="larger than 1024 bytes"):
+        serializer.decode(small_but_expanding, "application/json", "gzip")
+
+
+def test_zstd_decompressed_size_is_capped():
+    zstandard = pytest.importorskip("zstandard")
+    body = zstandard.ZstdCompressor().compress(b" " * 100000)
+    with pytest.raises(ValueError, match="larger than"):
+        Serializer(max_body_bytes=1024).decode(body, "application/json", "zstd")
+
+
+@pytest.mark.parametrize("body, content_type, encoding, message", [
+    (b"{bad", "application/json", "", "invalid JSON body"),
+    (b"{}", "application/json", "br", "unsupported Content-Encoding"),
+    (b"not gzip", "application/json", "gzip", "invalid gzip body"),
+])
+def test_undecodable_bodies_raise_value_error(body, content_type, encoding, message):
+    with pytest.raises(ValueError, match=message):
+        Serializer().decode(body, content_type, encoding)
+
+
+def test_small_responses_are_not_compressed_and_large_ones_are():
+    serializer = Serializer(compress_min_bytes=100)
+    body, headers = serializer.encode({"ok": True}, accept_encoding="gzip")
+    assert "Content-Encoding" not in headers and json.loads(body) == {"ok": True}
+    body, headers = serializer.encode({"text": "x" * 1000}, accept_encoding="gzip")
+    assert headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == {"text": "x" * 1000}
+
+
+def test_negotiation():
+    assert choose_encoding("") is None
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert negotiate("application/json") == "application/json"
+    if serialization.msgpack is not None:
+        assert negotiate("application/msgpack, application/json;q=0.5") == "application/msgpack"
+        assert negotiate("application/msgpack;q=0.5, application/json") == "application/json"
+    if serialization.zstandard is not None:
+        assert choose_encoding("gzip, zstd") == "zstd"
+        assert choose_encoding("gzip, zstd;q=0.5") == "gzip"
+
+
+def test_ndjson_content_types():
+    assert is_ndjson("application/x-ndjson; charset=utf-8")
+    assert is_ndjson("application/jsonl")
+    assert not is_ndjson("application/json")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_ndjson_reader_reassembles_records_split_across_chunks(chunk_size):
+    records = [{"subject": f"S{i}", "note": "ünïcødé"} for i in range(50)]
+    body = ndjson(records) + b"\n\n"
+    assert read_all(NdjsonReader(), body, chunk_size) == records
+
+
+def test_ndjson_reader_inflates_gzip_in_steps():
+    records = [{"i": i} for i in range(20000)]
+    assert read_all(NdjsonReader("gzip"), gzip.compress(ndjson(records)), 997) == records
+
+
+def test_ndjson_reader_names_the_bad_line():
+    reader = NdjsonReader()
+    reader.feed(b'{"a": 1}\n{"a": 2}\n')
+    with pytest.raises(ValueError, match="line 3 is not valid JSON"):
+        reader.feed(b'{oops}\n')
+
+
+def test_ndjson_reader_limits_line_length():
+    reader = NdjsonReader(max_line_bytes=16)
+    with pytest.raises(ValueError, match="longer than 16 bytes"):
+        reader.feed(b'{"note": "' + b"x" * 32)
+
+
+def test_ndjson_reader_rejects_truncated_gzip_and_unknown_encodings():
+    reader = NdjsonReader("gzip")
+    reader.feed(gzip.compress(ndjson([{"a": 1}] * 100))[:-8])
+    with pytest.raises(ValueError, match="truncated"):
+        reader.close()
+    with pytest.raises(ValueError, match="unsupported Content-Encoding"):
+        NdjsonReader("br")